@@ -1,5 +1,7 @@
 from flask import Flask
 from flask_restx import Api
+from config import Config
+from app.services import facade
 from app.api.v1.users import api as users_ns
 from app.api.v1.amenities import api as amenities_ns
 from app.api.v1.places import api as places_ns
@@ -23,7 +25,20 @@ def init_api(app):
     return api
 
 
-def create_app():
+def init_persistence(app):
+    """Keep the in-memory data on disk when DATA_DIR is set"""
+    if app.config.get('DATA_DIR'):
+        facade.enable_persistence(
+            app.config['DATA_DIR'],
+            sync=app.config['WAL_SYNC'],
+            snapshot_interval=app.config['SNAPSHOT_INTERVAL'],
+            snapshot_min_records=app.config['SNAPSHOT_MIN_RECORDS'],
+        )
+
+
+def create_app(config_class=Config):
     app = Flask(__name__)
+    app.config.from_object(config_class)
     init_api(app)
+    init_persistence(app)
     return app
@@ -1,6 +1,8 @@
 from app.models.base_model import BaseModel
 
 class Amenity(BaseModel):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         super().__init__()
 
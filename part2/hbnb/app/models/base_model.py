@@ -1,11 +1,90 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_timestamp(value):
+    return (value - _EPOCH) // _MICROSECOND
+
 
 class BaseModel:
+    # Slots instead of a per-instance __dict__ keep millions of objects small.
+    # Timestamps are kept as microseconds since the epoch and only turned
+    # into datetime objects when read.
+    __slots__ = ('id', 'created_ts', 'updated_ts', '_watchers')
+
     def __init__(self):
+        object.__setattr__(self, '_watchers', None)
         self.id = str(uuid.uuid4())
         self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self.updated_ts = self.created_ts
+
+    def __setattr__(self, name, value):
+        # Repositories indexing this object are told about the change first
+        watchers = self._watchers
+        if watchers is None:
+            object.__setattr__(self, name, value)
+            return
+        moves = []
+        try:
+            for repository in watchers if type(watchers) is tuple else (watchers,):
+                if name in repository.watched:
+                    moves.append(repository.attribute_changing(self, name, value))
+            object.__setattr__(self, name, value)
+        except BaseException:
+            for move in moves:
+                move(False)
+            raise
+        for move in moves:
+            move(True)
+
+    @classmethod
+    def stored_attributes(cls):
+        """Names of the slots holding the data of an instance"""
+        names = cls.__dict__.get('_stored_attributes')
+        if names is None:
+            names = tuple(
+                name for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get('__slots__', ()) if name != '_watchers'
+            )
+            cls._stored_attributes = names
+        return names
+
+    @property
+    def created_at(self):
+        return _EPOCH + self.created_ts * _MICROSECOND
+
+    @created_at.setter
+    def created_at(self, value):
+        self.created_ts = _to_timestamp(value)
+
+    @property
+    def updated_at(self):
+        return _EPOCH + self.updated_ts * _MICROSECOND
+
+    @updated_at.setter
+    def updated_at(self, value):
+        self.updated_ts = _to_timestamp(value)
+
+    def _other_watchers(self, repository):
+        watchers = self._watchers
+        if watchers is None:
+            return ()
+        if type(watchers) is not tuple:
+            watchers = (watchers,)
+        return tuple(watcher for watcher in watchers if watcher is not repository)
+
+    def watch_attributes(self, repository):
+        """Have ``repository`` notified before any attribute in its ``watched`` set changes"""
+        others = self._other_watchers(repository)
+        # A lone watcher is stored as is, sparing a tuple per object
+        object.__setattr__(self, '_watchers', others + (repository,) if others else repository)
+
+    def unwatch_attributes(self, repository):
+        others = self._other_watchers(repository)
+        object.__setattr__(self, '_watchers', others if len(others) > 1 else (others[0] if others else None))
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified"""
@@ -1,6 +1,9 @@
 from app.models.base_model import BaseModel
 
 class Place(BaseModel):
+    __slots__ = ('title', 'description', '_price', '_latitude', '_longitude', 'owner',
+                 '_reviews', '_amenities')
+
     def __init__(self, title, description, price, latitude, longitude, owner):
         super().__init__()
 
@@ -24,8 +27,29 @@ class Place(BaseModel):
         self.latitude = latitude
         self.longitude = longitude
         self.owner = owner
-        self.reviews = []    # List to store related Review instances
-        self.amenities = []  # List to store related Amenity instances
+        # Lists of related Review and Amenity instances, created on first use
+        self._reviews = None
+        self._amenities = None
+
+    @property
+    def reviews(self):
+        if self._reviews is None:
+            object.__setattr__(self, '_reviews', [])
+        return self._reviews
+
+    @reviews.setter
+    def reviews(self, value):
+        self._reviews = value
+
+    @property
+    def amenities(self):
+        if self._amenities is None:
+            object.__setattr__(self, '_amenities', [])
+        return self._amenities
+
+    @amenities.setter
+    def amenities(self, value):
+        self._amenities = value
 
     @property
     def price(self):
@@ -2,6 +2,8 @@ import re
 from app.models.base_model import BaseModel
 
 class User(BaseModel):
+    __slots__ = ('first_name', 'last_name', 'email', 'is_admin')
+
     def __init__(self, first_name, last_name, email, is_admin=False):
         super().__init__()
 
@@ -0,0 +1,394 @@
+"""Optional durability for the in-memory repositories.
+
+Every change to a stored object is appended to a write-ahead log: the
+full state of added objects, single attribute assignments and deletions.
+A background thread writes and fsyncs whatever accumulated since its last
+fsync in one go (group commit), and ``sync()`` blocks the calling thread
+until its own changes are on disk.
+
+Now and then the log is rotated and a compact snapshot of every
+repository is written next to it, after which older logs and snapshots
+are removed. On startup the newest snapshot is read through mmap and
+the logs written after it are replayed.
+
+Files in the data directory, ``n`` being an increasing segment number:
+
+    wal.<n>        records appended after snapshot.<n> was started
+    snapshot.<n>   every object as of the start of wal.<n>
+"""
+import gc
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+from app.models.base_model import BaseModel
+
+SNAPSHOT_MAGIC = b'HBNBSNP1'
+_RECORD_HEADER = struct.Struct('<II')  # payload length, crc32
+
+PUT, SET, DELETE = 1, 2, 3
+
+# Kinds of reference kept in a stored value
+_REF, _REF_LIST = 1, 2
+
+
+def _encode(value):
+    """A stored value with models replaced by their id, and its ref kind"""
+    if isinstance(value, BaseModel):
+        return value.id, _REF
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        return [item.id for item in value], _REF_LIST
+    return value, None
+
+
+def _resolve(value, kind, objects):
+    if kind == _REF:
+        return objects.get(value)
+    return [objects[item] for item in value if item in objects]
+
+
+def _blank(cls):
+    """An instance of a model class whose slots are still to be filled"""
+    obj = cls.__new__(cls)
+    object.__setattr__(obj, '_watchers', None)
+    return obj
+
+
+class RepositoryJournal:
+    """What one repository reports to its DurableStore"""
+
+    def __init__(self, store, name, cls, transient):
+        self.store = store
+        self.name = name
+        self.attributes = tuple(
+            attribute for attribute in cls.stored_attributes() if attribute not in transient
+        )
+        self._logged = frozenset(self.attributes)
+
+    def state(self, obj):
+        """(keys, values, refs) of an object, ``refs`` holding (position, kind)"""
+        keys, values, refs = [], [], []
+        for key in self.attributes:
+            try:
+                value, kind = _encode(getattr(obj, key))
+            except AttributeError:
+                continue
+            if kind is not None:
+                refs.append((len(keys), kind))
+            keys.append(key)
+            values.append(value)
+        return tuple(keys), values, tuple(refs)
+
+    def put(self, obj):
+        self.store.append(lambda: (PUT, self.name) + self.state(obj))
+
+    def set(self, obj, name):
+        # Properties keep their value in a slot of another name, logged on its own
+        if name not in self._logged:
+            return
+        self.store.append(lambda: (SET, self.name, obj.id, name) + _encode(getattr(obj, name)))
+
+    def delete(self, obj_id):
+        self.store.append(lambda: (DELETE, self.name, obj_id))
+
+
+class DurableStore:
+    """Write-ahead log and snapshots for a set of named repositories.
+
+    ``register()`` every repository, then ``open()`` once: it restores
+    their content from disk and starts logging their changes.
+    """
+
+    def __init__(self, directory, sync=True, snapshot_interval=60.0, snapshot_min_records=10000):
+        self.directory = directory
+        self.sync_writes = sync
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_min_records = snapshot_min_records
+        self._repositories = {}
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = []
+        self._seq = 0
+        self._flushed = 0
+        self._since_snapshot = 0
+        self._segment = 0
+        self._file = None
+        self._closing = False
+        self._threads = []
+
+    def register(self, name, repository, cls, transient=()):
+        """Persist ``repository`` as ``name``; its objects are ``cls`` instances.
+
+        ``transient`` attributes are not stored; they must be rebuilt by
+        the caller after ``open()``.
+        """
+        self._repositories[name] = (repository, cls, RepositoryJournal(self, name, cls, frozenset(transient)))
+
+    # ─── WRITING ──────────────────────────────────────────────
+
+    def append(self, make_record):
+        """Log the record built by ``make_record()``.
+
+        The record is built under the log lock so that records of one
+        object are logged in the order their values were assigned.
+        """
+        with self._cond:
+            payload = pickle.dumps(make_record(), pickle.HIGHEST_PROTOCOL)
+            self._pending.append(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._seq += 1
+            self._since_snapshot += 1
+            self._local.seq = self._seq
+            self._cond.notify_all()
+
+    def sync(self):
+        """Wait until every change made by this thread is on disk"""
+        seq = getattr(self._local, 'seq', 0)
+        if not self.sync_writes or seq <= self._flushed:
+            return
+        with self._cond:
+            while self._flushed < seq and self._file is not None:
+                self._cond.wait()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            with self._io_lock:
+                with self._cond:
+                    chunk, self._pending = b''.join(self._pending), []
+                    upto = self._seq
+                self._file.write(chunk)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            with self._cond:
+                self._flushed = max(self._flushed, upto)
+                self._cond.notify_all()
+
+    def _path(self, kind, segment):
+        return os.path.join(self.directory, '{}.{:08d}'.format(kind, segment))
+
+    def _segments(self, kind):
+        prefix = kind + '.'
+        return sorted(
+            int(name[len(prefix):]) for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+
+    def _rotate(self):
+        """Start a new log segment and return its number"""
+        with self._io_lock:
+            with self._cond:
+                chunk, self._pending = b''.join(self._pending), []
+                upto = self._seq
+                old = self._file
+                self._segment += 1
+                self._file = open(self._path('wal', self._segment), 'ab')
+                self._since_snapshot = 0
+            if old is not None:
+                old.write(chunk)
+                old.flush()
+                os.fsync(old.fileno())
+                old.close()
+            self._fsync_directory()
+        with self._cond:
+            self._flushed = max(self._flushed, upto)
+            self._cond.notify_all()
+        return self._segment
+
+    def _fsync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # ─── SNAPSHOTS ────────────────────────────────────────────
+
+    def snapshot(self):
+        """Write a snapshot and drop the logs and snapshots it replaces"""
+        with self._snapshot_lock:
+            segment = self._rotate()
+            repositories = {}
+            for name, (repository, _, journal) in self._repositories.items():
+                # Objects sharing the same keys and refs are stored as one shape
+                shapes = {}
+                for obj in repository.get_all():
+                    keys, values, refs = journal.state(obj)
+                    shapes.setdefault((keys, refs), []).append(tuple(values))
+                repositories[name] = [(keys, refs, rows) for (keys, refs), rows in shapes.items()]
+
+            path = self._path('snapshot', segment)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(SNAPSHOT_MAGIC)
+                pickle.dump(repositories, f, pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+            self._fsync_directory()
+
+            for kind in ('snapshot', 'wal'):
+                for old in self._segments(kind):
+                    if old < segment:
+                        os.remove(self._path(kind, old))
+            return path
+
+    def _snapshotter(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing, timeout=self.snapshot_interval)
+                if self._closing:
+                    return
+                due = self._since_snapshot >= self.snapshot_min_records
+            if due:
+                self.snapshot()
+
+    # ─── RESTORING ────────────────────────────────────────────
+
+    def _read_snapshot(self, segment, objects, by_id):
+        with open(self._path('snapshot', segment), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    raise ValueError('Not a snapshot: {}'.format(f.name))
+                with memoryview(mapped) as view:
+                    repositories = pickle.loads(view[len(SNAPSHOT_MAGIC):])
+
+        fill = object.__setattr__
+        unresolved = []
+        for name, shapes in repositories.items():
+            if name not in self._repositories:
+                continue
+            cls = self._repositories[name][1]
+            stored = objects[name]
+            for keys, refs, rows in shapes:
+                id_position = keys.index('id')
+                for values in rows:
+                    obj = _blank(cls)
+                    for key, value in zip(keys, values):
+                        fill(obj, key, value)
+                    stored[values[id_position]] = obj
+                if refs:
+                    unresolved.append((stored, keys, refs, id_position, rows))
+            by_id.update(stored)
+
+        # Every object exists now, references can point at them
+        for stored, keys, refs, id_position, rows in unresolved:
+            for position, kind in refs:
+                key = keys[position]
+                if kind == _REF:
+                    for values in rows:
+                        fill(stored[values[id_position]], key, by_id.get(values[position]))
+                else:
+                    for values in rows:
+                        fill(stored[values[id_position]], key, _resolve(values[position], kind, by_id))
+
+    def _replay(self, segment, objects, by_id):
+        """Apply one log segment; a torn record at its end is cut off"""
+        path = self._path('wal', segment)
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            self._apply(pickle.loads(payload), objects, by_id)
+            offset = start + length
+        if offset < len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+
+    def _apply(self, record, objects, by_id):
+        op, name = record[0], record[1]
+        if name not in objects:
+            return
+        if op == PUT:
+            _, _, keys, values, refs = record
+            values = list(values)
+            for position, kind in refs:
+                values[position] = _resolve(values[position], kind, by_id)
+            obj = _blank(self._repositories[name][1])
+            for key, value in zip(keys, values):
+                object.__setattr__(obj, key, value)
+            objects[name][obj.id] = by_id[obj.id] = obj
+        elif op == SET:
+            _, _, obj_id, attribute, value, kind = record
+            obj = objects[name].get(obj_id)
+            if obj is not None:
+                object.__setattr__(obj, attribute, value if kind is None else _resolve(value, kind, by_id))
+        elif op == DELETE:
+            objects[name].pop(record[2], None)
+            by_id.pop(record[2], None)
+
+    def open(self, rebuild=None):
+        """Restore every registered repository, then log their changes.
+
+        ``rebuild()``, if given, runs once the repositories are loaded,
+        to restore what is not stored such as transient attributes.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for leftover in os.listdir(self.directory):
+            if leftover.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, leftover))
+
+        objects = {name: {} for name in self._repositories}
+        by_id = {}
+        snapshots = self._segments('snapshot')
+        wals = []
+        # Restoring only allocates objects that stay alive, collections would
+        # walk them over and over for nothing
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            first = 0
+            if snapshots:
+                first = snapshots[-1]
+                self._read_snapshot(first, objects, by_id)
+            wals = [segment for segment in self._segments('wal') if segment >= first]
+            for segment in wals:
+                self._replay(segment, objects, by_id)
+
+            for name, (repository, _, journal) in self._repositories.items():
+                repository.attach_journal(journal)
+                repository.load(objects[name].values())
+            if rebuild is not None:
+                rebuild()
+        finally:
+            if collecting:
+                gc.enable()
+
+        self._segment = max(wals + snapshots + [0])
+        self._rotate()
+        for target in (self._writer, self._snapshotter):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        """Flush the log and stop the background threads"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until everything logged so far is on disk"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._flushed >= self._seq, timeout)
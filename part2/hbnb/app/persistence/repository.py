@@ -1,4 +1,8 @@
+import itertools
+import threading
 from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+from operator import attrgetter
 
 class Repository(ABC):
     @abstractmethod
@@ -26,12 +30,108 @@ class Repository(ABC):
         pass
 
 
+class _Index:
+    """Hash index of stored objects by one attribute, e.g. 'email' or 'place.id'"""
+
+    def __init__(self, attribute, unique):
+        self.attribute = attribute
+        self.unique = unique
+        # Assigning the first attribute of the path is what moves an object
+        self.root, _, rest = attribute.partition('.')
+        self._rest = attrgetter(rest) if rest else None
+        self.entries = {}
+
+    def key_for(self, root_value):
+        """Index key of an object whose root attribute holds ``root_value``"""
+        if self._rest is None or root_value is None:
+            return root_value
+        try:
+            return self._rest(root_value)
+        except AttributeError:
+            return None
+
+    def key(self, obj):
+        return self.key_for(getattr(obj, self.root, None))
+
+    def check(self, obj, key):
+        if self.unique and self.entries.get(key, obj) is not obj:
+            raise ValueError("{} must be unique: {!r} already exists".format(self.attribute, key))
+
+    def insert(self, obj, key):
+        if self.unique:
+            self.entries[key] = obj
+        else:
+            self.entries.setdefault(key, {})[obj.id] = obj
+
+    def remove(self, obj, key):
+        if self.unique:
+            if self.entries.get(key) is obj:
+                del self.entries[key]
+            return
+        bucket = self.entries.get(key)
+        if bucket is not None:
+            bucket.pop(obj.id, None)
+            if not bucket:
+                del self.entries[key]
+
+    def find(self, key):
+        if self.unique:
+            obj = self.entries.get(key)
+            return [obj] if obj is not None else []
+        return list(self.entries.get(key, {}).values())
+
+
+class _AllAttributes:
+    """Watch set matching every attribute name"""
+
+    def __contains__(self, name):
+        return True
+
+
+ALL_ATTRIBUTES = _AllAttributes()
+
+
 class InMemoryRepository(Repository):
-    def __init__(self):
+    """Dict storage keyed by id, with optional secondary hash indexes.
+
+    ``indexes`` and ``unique_indexes`` name attributes (or dotted paths
+    such as 'place.id') to index. Stored objects report assignments to
+    indexed attributes, through ``obj.update()`` or directly, so the
+    indexes never go stale; a unique index rejects a duplicate value with
+    a ValueError and leaves the object unchanged.
+    """
+
+    def __init__(self, indexes=(), unique_indexes=()):
         self._storage = {}
+        self._indexes = {}
+        for attribute in unique_indexes:
+            self._indexes[attribute] = _Index(attribute, unique=True)
+        for attribute in indexes:
+            self._indexes[attribute] = _Index(attribute, unique=False)
+        self.watched = frozenset(index.root for index in self._indexes.values())
+        self._journal = None
+
+    def attach_journal(self, journal):
+        """Report every later change of the stored objects to ``journal``"""
+        self._journal = journal
+        self.watched = ALL_ATTRIBUTES
+        for obj in self.get_all():
+            obj.watch_attributes(self)
+
+    def load(self, objects):
+        """Store trusted objects in bulk, e.g. restored from disk"""
+        for obj in objects:
+            self._storage[obj.id] = obj
+        self._index_all(self._storage.values())
 
     def add(self, obj):
+        if self.watched:
+            if obj.id in self._storage:
+                self.delete(obj.id)
+            self._index(obj)
         self._storage[obj.id] = obj
+        if self._journal is not None:
+            self._journal.put(obj)
 
     def get(self, obj_id):
         return self._storage.get(obj_id)
@@ -39,6 +139,9 @@ class InMemoryRepository(Repository):
     def get_all(self):
         return list(self._storage.values())
 
+    def _objects(self):
+        return self._storage.values()
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
@@ -46,7 +149,186 @@ class InMemoryRepository(Repository):
 
     def delete(self, obj_id):
         if obj_id in self._storage:
-            del self._storage[obj_id]
+            obj = self._storage.pop(obj_id)
+            if self.watched:
+                self._unindex(obj)
+            if self._journal is not None:
+                self._journal.delete(obj_id)
+
+    def _index(self, obj):
+        keys = [(index, index.key(obj)) for index in self._indexes.values()]
+        for index, key in keys:
+            index.check(obj, key)
+        for index, key in keys:
+            index.insert(obj, key)
+        obj.watch_attributes(self)
+
+    def _index_all(self, objects):
+        for index in self._indexes.values():
+            for obj in objects:
+                index.insert(obj, index.key(obj))
+        if self.watched:
+            for obj in objects:
+                obj.watch_attributes(self)
+
+    def _unindex(self, obj):
+        for index in self._indexes.values():
+            index.remove(obj, index.key(obj))
+        obj.unwatch_attributes(self)
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next((obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value), None)
+        index = self._indexes.get(attr_name)
+        if index is not None:
+            found = index.find(attr_value)
+            return found[0] if found else None
+        return next((obj for obj in self._objects() if getattr(obj, attr_name) == attr_value), None)
+
+    def find_all_by_attribute(self, attr_name, attr_value):
+        """Every stored object whose attribute (or dotted path) equals the value"""
+        index = self._indexes.get(attr_name)
+        if index is not None:
+            return index.find(attr_value)
+        getter = attrgetter(attr_name)
+        return [obj for obj in self._objects() if getter(obj) == attr_value]
+
+    def attribute_changing(self, obj, name, value):
+        """Called by a stored object before ``obj.<name> = value``.
+
+        Validates unique indexes and returns a callback, called with
+        whether the assignment went through, that moves the object to its
+        new index keys.
+        """
+        moves = []
+        for index in self._indexes.values():
+            if index.root != name:
+                continue
+            old_key, new_key = index.key(obj), index.key_for(value)
+            if old_key != new_key:
+                index.check(obj, new_key)
+                moves.append((index, old_key, new_key))
+
+        def apply(assigned):
+            if not assigned:
+                return
+            for index, old_key, new_key in moves:
+                index.remove(obj, old_key)
+                index.insert(obj, new_key)
+            if self._journal is not None:
+                self._journal.set(obj, name)
+        return apply
+
+
+class ConcurrentInMemoryRepository(InMemoryRepository):
+    """InMemoryRepository that request threads can share.
+
+    Objects are spread over ``stripes`` dicts by a hash of their id, each
+    with its own lock, so writes to different ids rarely wait on each
+    other; the secondary indexes share one lock. get_all() hands out a
+    snapshot, in creation order, that is rebuilt only after a write, so
+    readers never lock.
+    ``locked()`` holds several ids at once for changes that must be
+    atomic across objects.
+    """
+
+    def __init__(self, indexes=(), unique_indexes=(), stripes=16):
+        super().__init__(indexes, unique_indexes)
+        self._stripes = [{} for _ in range(stripes)]
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        self._index_lock = threading.RLock()
+        self._index_roots = frozenset(index.root for index in self._indexes.values())
+        # Every write takes a new version; a snapshot of an older one is stale
+        self._writes = itertools.count(1)
+        self._version = 0
+        self._cached = (None, ())
+
+    def _stripe(self, obj_id):
+        return hash(obj_id) % len(self._stripes)
+
+    @contextmanager
+    def locked(self, *obj_ids):
+        """Hold the stripes of ``obj_ids`` until the block exits.
+
+        Stripes are always taken in the same order, so two threads
+        locking overlapping ids cannot deadlock.
+        """
+        stripes = sorted({self._stripe(obj_id) for obj_id in obj_ids})
+        if len(stripes) == 1:
+            with self._locks[stripes[0]]:
+                yield
+            return
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+            yield
+
+    def load(self, objects):
+        loaded = []
+        for obj in objects:
+            self._stripes[self._stripe(obj.id)][obj.id] = obj
+            loaded.append(obj)
+        with self._index_lock:
+            self._index_all(loaded)
+        self._version = next(self._writes)
+
+    def add(self, obj):
+        stripe = self._stripe(obj.id)
+        with self._locks[stripe]:
+            storage = self._stripes[stripe]
+            if self.watched:
+                with self._index_lock:
+                    if obj.id in storage:
+                        self._unindex(storage.pop(obj.id))
+                    self._index(obj)
+            storage[obj.id] = obj
+            self._version = next(self._writes)
+            if self._journal is not None:
+                self._journal.put(obj)
+
+    def get(self, obj_id):
+        return self._stripes[hash(obj_id) % len(self._stripes)].get(obj_id)
+
+    def get_all(self):
+        return list(self._objects())
+
+    def _objects(self):
+        version, objects = self._cached
+        current = self._version
+        if version != current:
+            objects = []
+            for lock, storage in zip(self._locks, self._stripes):
+                with lock:
+                    objects.extend(storage.values())
+            objects = tuple(sorted(objects, key=attrgetter('created_ts')))
+            self._cached = (current, objects)
+        return objects
+
+    def delete(self, obj_id):
+        stripe = self._stripe(obj_id)
+        with self._locks[stripe]:
+            obj = self._stripes[stripe].pop(obj_id, None)
+            if obj is None:
+                return
+            if self.watched:
+                with self._index_lock:
+                    self._unindex(obj)
+            self._version = next(self._writes)
+            if self._journal is not None:
+                self._journal.delete(obj_id)
+
+    def attribute_changing(self, obj, name, value):
+        if name not in self._index_roots:
+            return super().attribute_changing(obj, name, value)
+        # The index lock is held from the unique check until the move
+        self._index_lock.acquire()
+        try:
+            apply = super().attribute_changing(obj, name, value)
+        except BaseException:
+            self._index_lock.release()
+            raise
+
+        def apply_and_release(assigned):
+            try:
+                apply(assigned)
+            finally:
+                self._index_lock.release()
+        return apply_and_release
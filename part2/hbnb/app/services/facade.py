@@ -1,18 +1,62 @@
-from app.persistence.repository import InMemoryRepository
+from contextlib import contextmanager
+from functools import wraps
+
+from app.persistence.durable import DurableStore
+from app.persistence.repository import ConcurrentInMemoryRepository
 from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.place import Place
 from app.models.review import Review
 
+
+def durable(method):
+    """Return from a write only once its changes are on disk, when persisted"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.store is not None:
+                self.store.sync()
+    return wrapper
+
+
 class HBnBFacade:
     def __init__(self):
-        self.user_repo = InMemoryRepository()
-        self.place_repo = InMemoryRepository()
-        self.review_repo = InMemoryRepository()
-        self.amenity_repo = InMemoryRepository()
+        self.user_repo = ConcurrentInMemoryRepository(unique_indexes=('email',))
+        self.place_repo = ConcurrentInMemoryRepository()
+        self.review_repo = ConcurrentInMemoryRepository(indexes=('place.id',))
+        self.amenity_repo = ConcurrentInMemoryRepository()
+        self.store = None
+
+    def enable_persistence(self, directory, **options):
+        """Restore the repositories from ``directory`` and log changes there.
+
+        ``options`` are passed to DurableStore. Call it once, before
+        serving requests.
+        """
+        if self.store is not None:
+            return self.store
+        store = DurableStore(directory, **options)
+        store.register('users', self.user_repo, User)
+        store.register('amenities', self.amenity_repo, Amenity)
+        # place.reviews mirrors review.place and is rebuilt below
+        store.register('places', self.place_repo, Place, transient=('_reviews',))
+        store.register('reviews', self.review_repo, Review)
+        store.open(rebuild=self._link_reviews)
+        self.store = store
+        return store
+
+    def _link_reviews(self):
+        for place in self.place_repo.get_all():
+            place.reviews = []
+        for review in self.review_repo.get_all():
+            if review.place is not None:
+                review.place.reviews.append(review)
 
     # ─── USER METHODS ─────────────────────────────────────────
 
+    @durable
     def create_user(self, user_data):
         user = User(**user_data)
         self.user_repo.add(user)
@@ -27,6 +71,7 @@ class HBnBFacade:
     def get_all_users(self):
         return self.user_repo.get_all()
 
+    @durable
     def update_user(self, user_id, user_data):
         user = self.user_repo.get(user_id)
         if not user:
@@ -36,6 +81,7 @@ class HBnBFacade:
 
     # ─── AMENITY METHODS ──────────────────────────────────────
 
+    @durable
     def create_amenity(self, amenity_data):
         amenity = Amenity(**amenity_data)
         self.amenity_repo.add(amenity)
@@ -47,6 +93,7 @@ class HBnBFacade:
     def get_all_amenities(self):
         return self.amenity_repo.get_all()
 
+    @durable
     def update_amenity(self, amenity_id, amenity_data):
         amenity = self.amenity_repo.get(amenity_id)
         if not amenity:
@@ -56,6 +103,7 @@ class HBnBFacade:
 
     # ─── PLACE METHODS ────────────────────────────────────────
 
+    @durable
     def create_place(self, place_data):
         owner_id = place_data.get('owner_id')
         owner = self.get_user(owner_id)
@@ -92,6 +140,7 @@ class HBnBFacade:
     def get_all_places(self):
         return self.place_repo.get_all()
 
+    @durable
     def update_place(self, place_id, place_data):
         place = self.place_repo.get(place_id)
         if not place:
@@ -124,6 +173,7 @@ class HBnBFacade:
 
     # ─── REVIEW METHODS ───────────────────────────────────────
 
+    @durable
     def create_review(self, review_data):
         user_id = review_data.get('user_id')
         place_id = review_data.get('place_id')
@@ -143,8 +193,9 @@ class HBnBFacade:
             'user': user,
         }
         review = Review(**review_payload)
-        self.review_repo.add(review)
-        place.add_review(review)
+        with self.place_repo.locked(place.id):
+            self.review_repo.add(review)
+            place.add_review(review)
         return review
 
     def get_review(self, review_id):
@@ -157,8 +208,9 @@ class HBnBFacade:
         place = self.get_place(place_id)
         if not place:
             return None
-        return place.reviews
+        return self.review_repo.find_all_by_attribute('place.id', place_id)
 
+    @durable
     def update_review(self, review_id, review_data):
         review = self.review_repo.get(review_id)
         if not review:
@@ -174,10 +226,13 @@ class HBnBFacade:
             place = self.get_place(review_data['place_id'])
             if not place:
                 raise ValueError('Place not found')
-            if review in review.place.reviews:
-                review.place.reviews.remove(review)
-            place.add_review(review)
-            review.place = place
+            with self._review_place_locked(review, place.id) as current:
+                if self.review_repo.get(review_id) is not review:
+                    return None
+                if review in current.reviews:
+                    current.reviews.remove(review)
+                place.add_review(review)
+                review.place = place
 
         updatable_fields = ['text', 'rating']
         data_to_update = {
@@ -188,13 +243,30 @@ class HBnBFacade:
 
         return review
 
+    @durable
     def delete_review(self, review_id):
         review = self.review_repo.get(review_id)
         if not review:
             return False
 
-        if review in review.place.reviews:
-            review.place.reviews.remove(review)
-
-        self.review_repo.delete(review_id)
+        with self._review_place_locked(review) as place:
+            if self.review_repo.get(review_id) is not review:
+                return False
+            if review in place.reviews:
+                place.reviews.remove(review)
+            self.review_repo.delete(review_id)
         return True
+
+    @contextmanager
+    def _review_place_locked(self, review, *place_ids):
+        """Lock the place a review belongs to, plus ``place_ids``.
+
+        Yields that place; retries if another request moved the review
+        while the locks were being taken.
+        """
+        while True:
+            place = review.place
+            with self.place_repo.locked(place.id, *place_ids):
+                if review.place is place:
+                    yield place
+                    return
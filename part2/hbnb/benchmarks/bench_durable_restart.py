@@ -0,0 +1,89 @@
+"""Restart time of a persisted facade holding millions of objects.
+
+Fills a facade with users, places and reviews (one user and one place
+per four reviews), writes a snapshot, then makes ``tail`` more changes
+that only reach the log. Times how long a new facade takes to restore
+everything from the snapshot and the log tail, and how long the snapshot
+took to write. Writes are logged with sync=False while filling, the
+group-commit writer still fsyncs them in the background.
+
+    python benchmarks/bench_durable_restart.py [objects] [tail]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.facade import HBnBFacade  # noqa: E402
+
+
+def size_of(directory, prefix):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for name in os.listdir(directory) if name.startswith(prefix)
+    ) / 1e6
+
+
+def fill(facade, objects, tail):
+    users, places = [], []
+    for i in range(objects // 6):
+        user = facade.create_user({
+            'first_name': 'User', 'last_name': str(i), 'email': 'user{}@example.com'.format(i),
+        })
+        users.append(user.id)
+        places.append(facade.create_place({
+            'title': 'Place {}'.format(i), 'price': 50 + i % 200, 'latitude': 40.0,
+            'longitude': 2.0, 'owner_id': user.id,
+        }).id)
+    reviews = []
+    for i in range(objects - 2 * len(users)):
+        reviews.append(facade.create_review({
+            'text': 'Review {}'.format(i), 'rating': 1 + i % 5,
+            'user_id': users[i % len(users)], 'place_id': places[i % len(places)],
+        }).id)
+
+    start = time.perf_counter()
+    facade.store.snapshot()
+    snapshot_time = time.perf_counter() - start
+
+    for i in range(tail):
+        if i % 2:
+            facade.update_review(reviews[i], {'place_id': places[-1 - i % len(places)]})
+        else:
+            facade.update_place(places[i % len(places)], {'price': 99})
+    facade.store.close()
+    return snapshot_time
+
+
+def main():
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    tail = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    directory = tempfile.mkdtemp(prefix='hbnb-durable-')
+    try:
+        facade = HBnBFacade()
+        facade.enable_persistence(directory, sync=False, snapshot_interval=3600)
+        start = time.perf_counter()
+        snapshot_time = fill(facade, objects, tail)
+        print('filled {:,} objects and {:,} logged changes in {:.1f}s'.format(
+            objects, tail, time.perf_counter() - start))
+        print('snapshot {:.1f} MB written in {:.2f}s, log tail {:.1f} MB'.format(
+            size_of(directory, 'snapshot.'), snapshot_time, size_of(directory, 'wal.')))
+        del facade
+
+        start = time.perf_counter()
+        restarted = HBnBFacade()
+        restarted.enable_persistence(directory, snapshot_interval=3600)
+        elapsed = time.perf_counter() - start
+        counts = [len(repo.get_all()) for repo in (
+            restarted.user_repo, restarted.place_repo, restarted.review_repo)]
+        print('restart: {:.2f}s for {:,} users, {:,} places, {:,} reviews'.format(elapsed, *counts))
+        restarted.store.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
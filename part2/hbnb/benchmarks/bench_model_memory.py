@@ -0,0 +1,50 @@
+"""Memory used per model object, as stored by the facade.
+
+Creates ``count`` users, amenities, places (with two amenities each) and
+reviews through the facade and reports the bytes traced by tracemalloc
+per object of each kind, repository and index entries included.
+
+    python benchmarks/bench_model_memory.py [count]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.facade import HBnBFacade  # noqa: E402
+
+
+def measure(label, count, make):
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make(i) for i in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    # The list holding the results is not part of the objects
+    used -= sys.getsizeof(kept)
+    print('{:<10} {:>9.0f} bytes/object'.format(label, used / count))
+    return kept
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    facade = HBnBFacade()
+    tracemalloc.start()
+    users = measure('user', count, lambda i: facade.create_user({
+        'first_name': 'User', 'last_name': 'Number', 'email': 'user{}@example.com'.format(i),
+    }))
+    amenities = measure('amenity', count, lambda i: facade.create_amenity({'name': 'Amenity {}'.format(i)}))
+    places = measure('place', count, lambda i: facade.create_place({
+        'title': 'Place', 'price': 100, 'latitude': 10.5, 'longitude': 20.5,
+        'owner_id': users[i].id, 'amenities': [amenities[i].id, amenities[i - 1].id],
+    }))
+    measure('review', count, lambda i: facade.create_review({
+        'text': 'Lovely stay', 'rating': 5, 'user_id': users[i].id, 'place_id': places[i].id,
+    }))
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
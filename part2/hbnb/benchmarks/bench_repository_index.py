@@ -0,0 +1,61 @@
+"""Email lookups in InMemoryRepository, linear scan vs unique hash index.
+
+For each size, fills a plain repository and one with a unique 'email'
+index with the same users, then times get_by_attribute('email', ...) on
+random existing emails, which is what every registration does to reject
+duplicates. Scans are sampled less often on large sizes.
+
+    python benchmarks/bench_repository_index.py [max_size]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.user import User  # noqa: E402
+from app.persistence.repository import InMemoryRepository  # noqa: E402
+
+
+def fill(repo, users):
+    start = time.perf_counter()
+    for user in users:
+        repo.add(user)
+    return time.perf_counter() - start
+
+
+def lookups(repo, emails):
+    start = time.perf_counter()
+    for email in emails:
+        assert repo.get_by_attribute('email', email) is not None
+    return (time.perf_counter() - start) / len(emails)
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    sizes = [size for size in (1000, 10000, 100000, 1000000) if size <= max_size]
+    users = [
+        User(first_name='Bench', last_name='User', email='user{}@example.com'.format(i))
+        for i in range(sizes[-1])
+    ]
+    print('{:>9}  {:>11}  {:>11}  {:>12}  {:>12}'.format(
+        'users', 'add plain', 'add indexed', 'scan lookup', 'index lookup'))
+    for size in sizes:
+        subset = users[:size]
+        plain = InMemoryRepository()
+        indexed = InMemoryRepository(unique_indexes=('email',))
+        add_plain = fill(plain, subset)
+        add_indexed = fill(indexed, subset)
+        emails = [user.email for user in random.sample(subset, 1000)]
+        scan = lookups(plain, emails[:max(5, 1000000 // (size * 10))])
+        index = lookups(indexed, emails)
+        print('{:>9}  {:>9.1f}ms  {:>9.1f}ms  {:>10.1f}us  {:>10.2f}us'.format(
+            size, add_plain * 1000, add_indexed * 1000, scan * 1e6, index * 1e6))
+        # Drop the index entries and watchers before the next size reuses users
+        for user in subset:
+            indexed.delete(user.id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Throughput of the facade's review flows under many threads.
+
+Each thread runs a read-mostly mix against one shared facade: 60% place
+lookups, 15% reviews-by-place, 10% review creations, 10% moves to another
+place and 5% deletions. The run is repeated for 1, 2, 4, ... threads, up
+to twice the core count, with the lock-striped repository and with a
+baseline that serializes every write behind one global lock. Place and
+review lists are checked for consistency after each run.
+
+On a CPython build with the GIL, threads never run Python code in
+parallel, so expect flat numbers there; the striped locks pay off on
+free-threaded builds (python3.13t) with more than one core.
+
+    python benchmarks/stress_concurrent_repository.py [seconds_per_run]
+"""
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.persistence.repository import ConcurrentInMemoryRepository, InMemoryRepository  # noqa: E402
+from app.services.facade import HBnBFacade  # noqa: E402
+
+PLACES = 200
+REVIEWS = 5000
+
+
+class GlobalLockRepository(InMemoryRepository):
+    """Baseline: every write and every multi-object change takes one lock"""
+
+    lock = threading.RLock()
+
+    def __init__(self, indexes=(), unique_indexes=()):
+        super().__init__(indexes, unique_indexes)
+
+    @contextmanager
+    def locked(self, *obj_ids):
+        with self.lock:
+            yield
+
+    def add(self, obj):
+        with self.lock:
+            super().add(obj)
+
+    def delete(self, obj_id):
+        with self.lock:
+            super().delete(obj_id)
+
+    def get_all(self):
+        with self.lock:
+            return super().get_all()
+
+    def attribute_changing(self, obj, name, value):
+        with self.lock:
+            return super().attribute_changing(obj, name, value)
+
+
+def make_facade(repository_class):
+    facade = HBnBFacade()
+    facade.user_repo = repository_class(unique_indexes=('email',))
+    facade.place_repo = repository_class()
+    facade.review_repo = repository_class(indexes=('place.id',))
+    facade.amenity_repo = repository_class()
+    user = facade.create_user({'first_name': 'Bench', 'last_name': 'User', 'email': 'bench@example.com'})
+    places = [facade.create_place({
+        'title': 'Place {}'.format(i), 'price': 80, 'latitude': 10.0, 'longitude': 20.0, 'owner_id': user.id,
+    }) for i in range(PLACES)]
+    for i in range(REVIEWS):
+        facade.create_review({'text': 'Fine', 'rating': 4, 'user_id': user.id, 'place_id': places[i % PLACES].id})
+    return facade, user, [place.id for place in places]
+
+
+def worker(facade, user, place_ids, seed, deadline, counts):
+    rng = random.Random(seed)
+    review_ids = [review.id for review in rng.sample(facade.get_all_reviews(), 200)]
+    done = 0
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            roll = rng.random()
+            if roll < 0.60:
+                facade.get_place(rng.choice(place_ids))
+            elif roll < 0.75:
+                facade.get_reviews_by_place(rng.choice(place_ids))
+            elif roll < 0.85:
+                review = facade.create_review({
+                    'text': 'New', 'rating': 5, 'user_id': user.id, 'place_id': rng.choice(place_ids),
+                })
+                review_ids.append(review.id)
+            elif roll < 0.95:
+                facade.update_review(rng.choice(review_ids), {'place_id': rng.choice(place_ids)})
+            elif review_ids:
+                facade.delete_review(review_ids.pop(rng.randrange(len(review_ids))))
+        done += 100
+    counts[seed] = done
+
+
+def check(facade, place_ids):
+    reviews = facade.get_all_reviews()
+    for place_id in place_ids:
+        place = facade.get_place(place_id)
+        listed = sorted(review.id for review in place.reviews)
+        assert listed == sorted(review.id for review in reviews if review.place is place), place_id
+        assert listed == sorted(review.id for review in facade.get_reviews_by_place(place_id)), place_id
+
+
+def run(repository_class, threads, seconds):
+    facade, user, place_ids = make_facade(repository_class)
+    counts = {}
+    deadline = time.perf_counter() + seconds
+    pool = [
+        threading.Thread(target=worker, args=(facade, user, place_ids, seed, deadline, counts))
+        for seed in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    check(facade, place_ids)
+    return sum(counts.values()) / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    cores = os.cpu_count() or 1
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('{} cores, GIL {}'.format(cores, 'enabled' if gil else 'disabled'))
+    counts = [1]
+    while counts[-1] < max(2 * cores, 8):
+        counts.append(counts[-1] * 2)
+
+    print('{:>7}  {:>13}  {:>8}  {:>13}  {:>8}'.format('threads', 'striped op/s', 'scaling', 'global op/s', 'scaling'))
+    base = {}
+    for threads in counts:
+        row = [threads]
+        for repository_class in (ConcurrentInMemoryRepository, GlobalLockRepository):
+            rate = run(repository_class, threads, seconds)
+            base.setdefault(repository_class, rate)
+            row += [rate, rate / base[repository_class]]
+        print('{:>7}  {:>13,.0f}  {:>7.2f}x  {:>13,.0f}  {:>7.2f}x'.format(*row))
+
+
+if __name__ == '__main__':
+    main()
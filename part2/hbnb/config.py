@@ -3,6 +3,12 @@ import os
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    # Directory holding the write-ahead log and snapshots; unset keeps data in memory only
+    DATA_DIR = os.getenv('HBNB_DATA_DIR')
+    # Wait for fsync before answering a write
+    WAL_SYNC = os.getenv('HBNB_WAL_SYNC', '1') != '0'
+    SNAPSHOT_INTERVAL = float(os.getenv('HBNB_SNAPSHOT_INTERVAL', '60'))
+    SNAPSHOT_MIN_RECORDS = int(os.getenv('HBNB_SNAPSHOT_MIN_RECORDS', '10000'))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -4,6 +4,8 @@ from app.models.user import User
 from app.models.place import Place
 from app.models.review import Review
 from app.models.amenity import Amenity
+from app.persistence.repository import InMemoryRepository
+from datetime import datetime
 
 
 # ─── USER TESTS ───────────────────────────────────────────────
@@ -137,6 +139,70 @@ def test_review_invalid_place():
         print(f"✅ test_review_invalid_place passed — caught: {e}")
 
 
+# ─── BASE MODEL TESTS ─────────────────────────────────────────
+
+def test_timestamps_round_trip():
+    user = User(first_name="Tim", last_name="Stamp", email="tim@example.com")
+    assert user.updated_at == user.created_at
+    moment = datetime(2024, 2, 29, 13, 45, 7, 123456)
+    user.created_at = moment
+    user.updated_at = moment
+    assert user.created_at == moment and user.updated_at == moment
+    # Before the epoch too
+    user.created_at = datetime(1900, 1, 1, 0, 0, 0, 1)
+    assert user.created_at == datetime(1900, 1, 1, 0, 0, 0, 1)
+
+    before = datetime.now()
+    user.save()
+    assert before <= user.updated_at <= datetime.now()
+    assert user.created_at == datetime(1900, 1, 1, 0, 0, 0, 1)
+    user.updated_at = moment
+    user.update({"first_name": "Timothy"})
+    assert user.first_name == "Timothy" and user.updated_at > moment
+    print("✅ test_timestamps_round_trip passed")
+
+def test_watch_and_unwatch_two_repositories():
+    by_email = InMemoryRepository(unique_indexes=("email",))
+    by_name = InMemoryRepository(indexes=("last_name",))
+    user = User(first_name="Wat", last_name="Cher", email="wat@example.com")
+    other = User(first_name="Oth", last_name="Er", email="other@example.com")
+    for repository in (by_email, by_name):
+        repository.add(user)
+    by_email.add(other)
+    assert user._watchers == (by_email, by_name) and other._watchers is by_email
+
+    user.update({"email": "new@example.com", "last_name": "Changed"})
+    assert by_email.get_by_attribute("email", "new@example.com") is user
+    assert by_email.get_by_attribute("email", "wat@example.com") is None
+    assert by_name.find_all_by_attribute("last_name", "Changed") == [user]
+    assert by_name.find_all_by_attribute("last_name", "Cher") == []
+
+    # A duplicate in one repository leaves the other one untouched
+    try:
+        user.email = "other@example.com"
+        print("❌ test_watch_and_unwatch_two_repositories FAILED — no error raised")
+    except ValueError:
+        pass
+    assert user.email == "new@example.com"
+    assert by_email.get_by_attribute("email", "new@example.com") is user
+
+    # The remaining repository still follows changes
+    by_email.delete(user.id)
+    assert user._watchers is by_name
+    user.last_name = "Again"
+    assert by_name.find_all_by_attribute("last_name", "Again") == [user]
+    assert by_email.get_by_attribute("email", "new@example.com") is None
+    user.email = "other@example.com"
+
+    by_name.delete(user.id)
+    assert user._watchers is None
+    user.last_name = "Free"
+    assert by_name.find_all_by_attribute("last_name", "Free") == []
+    by_name.add(user)
+    assert by_name.find_all_by_attribute("last_name", "Free") == [user]
+    print("✅ test_watch_and_unwatch_two_repositories passed")
+
+
 # ─── RUN ALL ──────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -160,4 +226,8 @@ if __name__ == "__main__":
     test_review_invalid_rating()
     test_review_invalid_place()
 
+    print("\n── Base Model Tests ──")
+    test_timestamps_round_trip()
+    test_watch_and_unwatch_two_repositories()
+
     print("\n✅ All tests completed.")
@@ -0,0 +1,255 @@
+# test_repository.py
+
+from app.models.user import User
+from app.models.place import Place
+from app.models.review import Review
+import random
+import threading
+
+from app.persistence.repository import ConcurrentInMemoryRepository, InMemoryRepository
+from app.services.facade import HBnBFacade
+
+
+def make_place(owner, title="Cozy Apartment"):
+    return Place(title=title, description="", price=100, latitude=10.0,
+                 longitude=20.0, owner=owner)
+
+
+# ─── UNIQUE INDEX TESTS ───────────────────────────────────────
+
+def test_unique_index_lookup():
+    repo = InMemoryRepository(unique_indexes=('email',))
+    john = User(first_name="John", last_name="Doe", email="john@example.com")
+    jane = User(first_name="Jane", last_name="Doe", email="jane@example.com")
+    repo.add(john)
+    repo.add(jane)
+    assert repo.get_by_attribute('email', "jane@example.com") is jane
+    assert repo.get_by_attribute('email', "nobody@example.com") is None
+    assert repo.find_all_by_attribute('email', "john@example.com") == [john]
+    print("✅ test_unique_index_lookup passed")
+
+def test_unique_index_rejects_duplicate():
+    repo = InMemoryRepository(unique_indexes=('email',))
+    repo.add(User(first_name="John", last_name="Doe", email="john@example.com"))
+    try:
+        repo.add(User(first_name="Other", last_name="Doe", email="john@example.com"))
+        assert False, "duplicate email accepted"
+    except ValueError as e:
+        print(f"✅ test_unique_index_rejects_duplicate passed — caught: {e}")
+    assert len(repo.get_all()) == 1
+
+def test_unique_index_follows_update():
+    repo = InMemoryRepository(unique_indexes=('email',))
+    john = User(first_name="John", last_name="Doe", email="john@example.com")
+    repo.add(john)
+    john.update({'email': "johnny@example.com"})
+    assert repo.get_by_attribute('email', "john@example.com") is None
+    assert repo.get_by_attribute('email', "johnny@example.com") is john
+    john.email = "j@example.com"
+    assert repo.get_by_attribute('email', "j@example.com") is john
+    print("✅ test_unique_index_follows_update passed")
+
+def test_unique_index_update_conflict_keeps_value():
+    repo = InMemoryRepository(unique_indexes=('email',))
+    john = User(first_name="John", last_name="Doe", email="john@example.com")
+    jane = User(first_name="Jane", last_name="Doe", email="jane@example.com")
+    repo.add(john)
+    repo.add(jane)
+    try:
+        jane.update({'email': "john@example.com"})
+        assert False, "duplicate email accepted"
+    except ValueError:
+        pass
+    assert jane.email == "jane@example.com"
+    assert repo.get_by_attribute('email', "jane@example.com") is jane
+    assert repo.get_by_attribute('email', "john@example.com") is john
+    print("✅ test_unique_index_update_conflict_keeps_value passed")
+
+def test_index_entry_removed_on_delete():
+    repo = InMemoryRepository(unique_indexes=('email',))
+    john = User(first_name="John", last_name="Doe", email="john@example.com")
+    repo.add(john)
+    repo.delete(john.id)
+    assert repo.get_by_attribute('email', "john@example.com") is None
+    # A deleted object no longer reserves its value nor reports changes
+    john.email = "changed@example.com"
+    repo.add(User(first_name="New", last_name="Doe", email="john@example.com"))
+    print("✅ test_index_entry_removed_on_delete passed")
+
+
+# ─── NON-UNIQUE INDEX TESTS ───────────────────────────────────
+
+def test_non_unique_dotted_index():
+    repo = InMemoryRepository(indexes=('place.id',))
+    owner = User(first_name="Alice", last_name="Smith", email="alice@example.com")
+    guest = User(first_name="Bob", last_name="Lee", email="bob@example.com")
+    first, second = make_place(owner, "First"), make_place(owner, "Second")
+    reviews = [Review(text="Nice", rating=5, place=first, user=guest),
+               Review(text="Okay", rating=3, place=first, user=guest),
+               Review(text="Good", rating=4, place=second, user=guest)]
+    for review in reviews:
+        repo.add(review)
+    assert repo.find_all_by_attribute('place.id', first.id) == reviews[:2]
+    assert repo.find_all_by_attribute('place.id', second.id) == reviews[2:]
+
+    reviews[0].place = second
+    assert repo.find_all_by_attribute('place.id', first.id) == [reviews[1]]
+    assert repo.find_all_by_attribute('place.id', second.id) == [reviews[2], reviews[0]]
+
+    repo.delete(reviews[1].id)
+    assert repo.find_all_by_attribute('place.id', first.id) == []
+    print("✅ test_non_unique_dotted_index passed")
+
+def test_find_all_without_index_scans():
+    repo = InMemoryRepository()
+    users = [User(first_name="Sam", last_name=name, email=f"{name}@example.com")
+             for name in ("One", "Two")]
+    for user in users:
+        repo.add(user)
+    assert repo.find_all_by_attribute('first_name', "Sam") == users
+    assert repo.get_by_attribute('last_name', "Two") is users[1]
+    print("✅ test_find_all_without_index_scans passed")
+
+
+# ─── CONCURRENT REPOSITORY TESTS ──────────────────────────────
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_adds_keep_unique_index():
+    repo = ConcurrentInMemoryRepository(unique_indexes=('email',), stripes=4)
+    winners = []
+
+    def register(worker):
+        for i in range(200):
+            repo.add(User(first_name="W", last_name="Doe", email=f"w{worker}-{i}@example.com"))
+        try:
+            repo.add(User(first_name="Dup", last_name="Doe", email="dup@example.com"))
+            winners.append(worker)
+        except ValueError:
+            pass
+
+    run_threads(8, register)
+    assert len(winners) == 1
+    assert len(repo.get_all()) == 8 * 200 + 1
+    assert repo.get_by_attribute('email', "w3-150@example.com").email == "w3-150@example.com"
+    print("✅ test_concurrent_adds_keep_unique_index passed")
+
+def test_concurrent_snapshot_refreshes_after_write():
+    repo = ConcurrentInMemoryRepository()
+    users = [User(first_name="Sam", last_name=name, email=f"{name}@example.com")
+             for name in ("One", "Two", "Three")]
+    for user in users:
+        repo.add(user)
+    before = repo.get_all()
+    assert before == users
+    repo.delete(users[1].id)
+    assert before == users
+    assert repo.get_all() == [users[0], users[2]]
+    assert repo.find_all_by_attribute('first_name', "Sam") == [users[0], users[2]]
+    print("✅ test_concurrent_snapshot_refreshes_after_write passed")
+
+def test_facade_review_moves_are_atomic():
+    facade = HBnBFacade()
+    owner = facade.create_user({'first_name': "Alice", 'last_name': "Smith",
+                                'email': "alice@example.com"})
+    places = [facade.create_place({'title': f"Place {i}", 'price': 50, 'latitude': 1.0,
+                                   'longitude': 2.0, 'owner_id': owner.id})
+              for i in range(3)]
+    reviews = [facade.create_review({'text': "Nice", 'rating': 4, 'user_id': owner.id,
+                                     'place_id': places[i % 3].id})
+               for i in range(30)]
+
+    def shuffle(worker):
+        rng = random.Random(worker)
+        for _ in range(300):
+            review = rng.choice(reviews)
+            if rng.random() < 0.02:
+                facade.delete_review(review.id)
+            else:
+                facade.update_review(review.id, {'place_id': rng.choice(places).id})
+
+    run_threads(6, shuffle)
+    alive = facade.get_all_reviews()
+    for place in places:
+        assert sorted(r.id for r in place.reviews) == sorted(r.id for r in alive if r.place is place)
+        assert sorted(r.id for r in facade.get_reviews_by_place(place.id)) == sorted(r.id for r in place.reviews)
+    print(f"✅ test_facade_review_moves_are_atomic passed — {len(alive)} reviews left")
+
+
+# ─── DURABLE STORE TESTS ──────────────────────────────────────
+
+def fill_facade(facade):
+    owner = facade.create_user({'first_name': "Alice", 'last_name': "Smith",
+                                'email': "alice@example.com"})
+    wifi = facade.create_amenity({'name': "Wi-Fi"})
+    place = facade.create_place({'title': "Loft", 'price': 120, 'latitude': 48.8,
+                                 'longitude': 2.3, 'owner_id': owner.id,
+                                 'amenities': [wifi.id]})
+    other = facade.create_place({'title': "Cabin", 'price': 60, 'latitude': 45.0,
+                                 'longitude': 6.0, 'owner_id': owner.id})
+    kept = facade.create_review({'text': "Great", 'rating': 5, 'user_id': owner.id,
+                                 'place_id': place.id})
+    gone = facade.create_review({'text': "Meh", 'rating': 2, 'user_id': owner.id,
+                                 'place_id': place.id})
+    facade.update_review(kept.id, {'place_id': other.id, 'rating': 4})
+    facade.update_place(place.id, {'price': 150})
+    facade.update_user(owner.id, {'email': "alice@example.org"})
+    facade.delete_review(gone.id)
+    return owner, wifi, place, other, kept
+
+def check_restored(facade, owner, wifi, place, other, kept):
+    assert facade.get_user_by_email("alice@example.org").id == owner.id
+    assert facade.get_user_by_email("alice@example.com") is None
+    restored = facade.get_place(place.id)
+    assert restored.price == 150.0 and restored.owner is facade.get_user(owner.id)
+    assert [a.id for a in restored.amenities] == [wifi.id]
+    assert restored.reviews == []
+    review = facade.get_review(kept.id)
+    assert review.rating == 4 and review.place is facade.get_place(other.id)
+    assert facade.get_place(other.id).reviews == [review]
+    assert facade.get_reviews_by_place(other.id) == [review]
+    assert len(facade.get_all_reviews()) == 1
+
+def test_durable_store_replays_log(tmp_path):
+    facade = HBnBFacade()
+    facade.enable_persistence(str(tmp_path))
+    saved = fill_facade(facade)
+    facade.store.close()
+
+    restarted = HBnBFacade()
+    restarted.enable_persistence(str(tmp_path))
+    check_restored(restarted, *saved)
+    # The restored objects keep being logged
+    restarted.update_place(saved[2].id, {'title': "Big Loft"})
+    restarted.store.close()
+    again = HBnBFacade()
+    again.enable_persistence(str(tmp_path))
+    assert again.get_place(saved[2].id).title == "Big Loft"
+    again.store.close()
+    print("✅ test_durable_store_replays_log passed")
+
+def test_durable_store_snapshot_and_torn_tail(tmp_path):
+    facade = HBnBFacade()
+    facade.enable_persistence(str(tmp_path))
+    saved = fill_facade(facade)
+    facade.store.snapshot()
+    facade.create_amenity({'name': "Pool"})
+    facade.store.close()
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert len([n for n in names if n.startswith('snapshot.')]) == 1
+    # A crash in the middle of a write leaves half a record behind
+    wal = tmp_path / [n for n in names if n.startswith('wal.')][-1]
+    with open(wal, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00garbage')
+
+    restarted = HBnBFacade()
+    restarted.enable_persistence(str(tmp_path))
+    check_restored(restarted, *saved)
+    assert sorted(a.name for a in restarted.get_all_amenities()) == ["Pool", "Wi-Fi"]
+    restarted.store.close()
+    print("✅ test_durable_store_snapshot_and_torn_tail passed")
@@ -2,6 +2,12 @@ from flask import Flask
 
 import config
 from app.extensions import db, bcrypt, jwt
+from app.models.ids import init_ids
+from app.persistence.sqlite import init_sqlite
+from app.persistence.replication import init_replication
+from app.persistence.sharding import init_sharding
+from app.persistence.soft_delete import init_purger
+from app.services import facade
 
 from flask_restx import Api
 from app.api.v1.users import api as users_ns
@@ -9,6 +15,9 @@ from app.api.v1.auth import api as auth_ns
 from app.api.v1.amenities import api as amenities_ns
 from app.api.v1.places import api as places_ns
 from app.api.v1.reviews import api as reviews_ns
+from app.api.v1.batch import api as batch_ns
+from app.api.v1.stats import api as stats_ns
+from app.api.v1.responses import output_json
 
 
 def init_api(app):
@@ -19,12 +28,15 @@ def init_api(app):
         description='HBnB Application API',
         doc='/api/v1/'
     )
+    api.representations['application/json'] = output_json
 
     api.add_namespace(users_ns, path='/api/v1/users')
     api.add_namespace(auth_ns, path='/api/v1/auth')
     api.add_namespace(amenities_ns, path='/api/v1/amenities')
     api.add_namespace(places_ns, path='/api/v1/places')
     api.add_namespace(reviews_ns, path='/api/v1/reviews')
+    api.add_namespace(batch_ns, path='/api/v1/batch')
+    api.add_namespace(stats_ns, path='/api/v1/stats')
 
     return api
 
@@ -33,7 +45,18 @@ def create_app(config_class="config.DevelopmentConfig"):
     app = Flask(__name__)
     app.config.from_object(config_class)
     init_api(app)
+    init_ids(app)
     db.init_app(app)
+    init_sqlite(app)
+    init_replication(app)
+    init_sharding(app)
+    init_purger(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    facade.response_cache.init_app(app)
+    facade.single_flight.init_app(app)
+    facade.amenity_catalog.init_app(app)
+    facade.place_stats.init_app(app)
+    facade.popularity.init_app(app)
+    facade.owner_dashboards.init_app(app)
     return app
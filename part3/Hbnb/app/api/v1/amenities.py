@@ -1,6 +1,11 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt
 from app.services import facade
+from app.serializers import AMENITY, AMENITY_COUNT, AMENITY_LIST
+from app.api.v1.etags import make_etag, etag_headers, not_modified_response
+from app.api.v1.responses import encode_json, cached_json_response
+from app.api.v1.batches import read_batch, batch_results
+from app.api.v1.fieldsets import parse_bbox, parse_flag, parse_ids
 
 api = Namespace('amenities', description='Amenity operations')
 
@@ -30,26 +35,122 @@ class AmenityList(Resource):
 
         try:
             amenity = facade.create_amenity(amenity_data)
-            return {'id': amenity.id, 'name': amenity.name}, 201
+            return AMENITY.dump(amenity), 201
         except ValueError as err:
             return {'message': str(err)}, 400
 
+    @api.doc(params={
+        'ids': 'Comma-separated amenity IDs: returns {items, missing} in this order',
+        'with_counts': 'true to add the number of places offering each amenity',
+        'bbox': 'With with_counts, only count places inside west,south,east,north (degrees)',
+    })
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(304, 'Amenity list not modified')
+    @api.response(400, 'Invalid ids, with_counts or bbox')
     def get(self):
-        """Retrieve a list of all amenities"""
+        """Retrieve a list of all amenities, or of the amenities listed in ?ids="""
+        try:
+            ids = parse_ids()
+            with_counts = parse_flag('with_counts')
+            bbox = parse_bbox()
+        except ValueError as err:
+            return {'message': str(err)}, 400
+        if with_counts:
+            if ids is not None:
+                return {'message': 'with_counts cannot be combined with ids'}, 400
+            return _amenity_counts(bbox)
+        if bbox is not None:
+            return {'message': 'bbox requires with_counts=true'}, 400
+
+        version = facade.get_amenities_version()
+        if ids is not None:
+            etag = make_etag('amenities', ','.join(ids), version)
+            not_modified = not_modified_response(etag)
+            if not_modified:
+                return not_modified
+            amenities, missing = facade.get_amenities(ids)
+            return {'items': AMENITY_LIST.dump_many(amenities), 'missing': missing}, 200, etag_headers(etag)
+
+        etag = make_etag('amenities', version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        cache_key = ('amenities', version)
+        body = facade.response_cache.get(cache_key)
+        if body is not None:
+            return cached_json_response(body, headers=etag_headers(etag), cache_status='HIT')
+
         amenities = facade.get_all_amenities()
-        return [{'id': amenity.id, 'name': amenity.name} for amenity in amenities], 200
+        body = encode_json(AMENITY_LIST.dump_many(amenities))
+        facade.response_cache.set(cache_key, body, [('amenities',)])
+        return cached_json_response(body, headers=etag_headers(etag), cache_status='MISS')
+
+def _amenity_counts(bbox):
+    """Amenities with their place counts, from the counters or counted inside ``bbox``"""
+    version = facade.get_amenity_counts_version()
+    etag = make_etag('amenity-counts', bbox, version)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+
+    if bbox is not None:
+        try:
+            amenities = facade.get_amenity_counts(bbox)
+        except ValueError as err:
+            return {'message': str(err)}, 400
+        return AMENITY_COUNT.dump_many(amenities), 200, etag_headers(etag)
+
+    cache_key = ('amenity-counts', version)
+    body = facade.response_cache.get(cache_key)
+    if body is not None:
+        return cached_json_response(body, headers=etag_headers(etag), cache_status='HIT')
+
+    body = encode_json(AMENITY_COUNT.dump_many(facade.get_amenity_counts()))
+    facade.response_cache.set(cache_key, body, [('amenities',)])
+    return cached_json_response(body, headers=etag_headers(etag), cache_status='MISS')
+
+@api.route('/batch')
+class AmenityBatch(Resource):
+    @jwt_required()
+    @api.expect([amenity_model], validate=False)
+    @api.response(201, 'All amenities successfully created')
+    @api.response(207, 'Some amenities were created, see the per-item results')
+    @api.response(403, 'Admin privileges required')
+    @api.response(400, 'Invalid batch or no amenity created')
+    def post(self):
+        """Register many amenities in one transaction"""
+        claims = get_jwt()
+        if not claims.get('is_admin', False):
+            return {'error': 'Admin privileges required'}, 403
+
+        try:
+            items = read_batch(api.payload)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        results = facade.create_amenities(items)
+        return batch_results(results, AMENITY)
 
 @api.route('/<amenity_id>')
 class AmenityResource(Resource):
     @api.response(200, 'Amenity details retrieved successfully')
+    @api.response(304, 'Amenity not modified')
     @api.response(404, 'Amenity not found')
     def get(self, amenity_id):
         """Get amenity details by ID"""
+        version = facade.get_amenity_version(amenity_id)
+        if version is None:
+            return {'message': 'Amenity not found'}, 404
+        etag = make_etag('amenity', amenity_id, version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {'message': 'Amenity not found'}, 404
-        return {'id': amenity.id, 'name': amenity.name}, 200
+        return AMENITY.dump(amenity), 200, etag_headers(etag)
 
     @jwt_required()
     @api.expect(amenity_model)
@@ -0,0 +1,127 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields
+from werkzeug.test import EnvironBuilder
+
+from app.extensions import db
+
+api = Namespace('batch', description='Run many API requests in one round trip')
+
+sub_request_model = api.model('SubRequest', {
+    'method': fields.String(required=True, description='GET, POST, PUT or DELETE'),
+    'path': fields.String(required=True, description='API path with its query string, e.g. /api/v1/places/<id>'),
+    'body': fields.Raw(description='JSON body of a POST or PUT'),
+})
+
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+# Headers of the outer request every sub-request runs with
+FORWARDED_HEADERS = ('Authorization',)
+
+
+def _validate(sub_request):
+    if not isinstance(sub_request, dict):
+        raise ValueError('Each sub-request must be an object')
+    method = str(sub_request.get('method', '')).upper()
+    if method not in METHODS:
+        raise ValueError('method must be one of {}'.format(', '.join(METHODS)))
+    path = sub_request.get('path')
+    if not isinstance(path, str) or not path.startswith('/api/v1/'):
+        raise ValueError('path must start with /api/v1/')
+    if path.split('?', 1)[0].rstrip('/') == request.path.rstrip('/'):
+        raise ValueError('Batches cannot be nested')
+    return method, path, sub_request.get('body')
+
+
+def _run(app, method, path, body, headers):
+    """Dispatch one sub-request through the application, without HTTP"""
+    builder = EnvironBuilder(
+        path=path,
+        method=method,
+        json=body if method in ('POST', 'PUT') else None,
+        headers=headers,
+    )
+    with app.request_context(builder.get_environ()):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as err:
+            # What wsgi_app does with an unhandled error, but one failed
+            # sub-request must not fail the others
+            db.session.rollback()
+            try:
+                response = app.handle_exception(err)
+            except Exception:
+                # Re-raised with PROPAGATE_EXCEPTIONS (debug, testing)
+                app.log_exception(sys.exc_info())
+                return {'status': 500, 'body': {'message': 'Internal Server Error'}}
+    if response.is_streamed:
+        # Event streams never end, they cannot be part of a batch
+        response.close()
+        return {'status': 400, 'body': {'error': 'Streaming endpoints cannot be batched'}}
+    body = response.get_json(silent=True) if response.data else None
+    return {'status': response.status_code, 'body': body}
+
+
+def _run_in_own_context(app, method, path, body, headers):
+    """Concurrent reads each get an application context, and so a session"""
+    with app.app_context():
+        return _run(app, method, path, body, headers)
+
+
+def _executor(app):
+    executor = app.extensions.get('batch_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=app.config.get('BATCH_MAX_WORKERS', 4),
+            thread_name_prefix='batch',
+        )
+        app.extensions['batch_executor'] = executor
+    return executor
+
+
+@api.route('/')
+class Batch(Resource):
+    @api.expect([sub_request_model], validate=False)
+    @api.response(200, 'One status and body per sub-request, in order')
+    @api.response(400, 'Invalid batch')
+    def post(self):
+        """Run a list of sub-requests and return their responses.
+
+        Sub-requests run in order with the caller's Authorization header and
+        share this request's database session. Consecutive GETs run
+        concurrently on a thread pool when BATCH_MAX_WORKERS allows it;
+        they only read, so each uses its own session.
+        """
+        sub_requests = api.payload
+        limit = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return {'error': 'Expected a non-empty JSON array of sub-requests'}, 400
+        if len(sub_requests) > limit:
+            return {'error': 'A batch holds at most {} sub-requests'.format(limit)}, 400
+        try:
+            parsed = [_validate(sub_request) for sub_request in sub_requests]
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        app = current_app._get_current_object()
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        concurrent = app.config.get('BATCH_MAX_WORKERS', 4) > 1
+        results = []
+        index = 0
+        while index < len(parsed):
+            reads = []
+            while index + len(reads) < len(parsed) and parsed[index + len(reads)][0] == 'GET':
+                reads.append(parsed[index + len(reads)])
+            if concurrent and len(reads) > 1:
+                futures = [
+                    _executor(app).submit(_run_in_own_context, app, method, path, body, headers)
+                    for method, path, body in reads
+                ]
+                results.extend(future.result() for future in futures)
+                index += len(reads)
+            else:
+                method, path, body = parsed[index]
+                results.append(_run(app, method, path, body, headers))
+                index += 1
+        return results, 200
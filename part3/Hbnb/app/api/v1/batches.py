@@ -0,0 +1,35 @@
+from flask import current_app
+
+
+def read_batch(payload):
+    """Validate the body of a bulk write: a JSON array of items.
+
+    Raises ValueError when it is not a non-empty array or exceeds
+    BULK_MAX_ITEMS.
+    """
+    if not isinstance(payload, list) or not payload:
+        raise ValueError('Expected a non-empty JSON array of items')
+    limit = current_app.config.get('BULK_MAX_ITEMS', 5000)
+    if len(payload) > limit:
+        raise ValueError('A batch holds at most {} items'.format(limit))
+    return payload
+
+
+def batch_results(results, serializer):
+    """Per-item outcome of a bulk write and the response status.
+
+    201 when every item was created, 400 when none was, 207 otherwise.
+    """
+    items = []
+    created = 0
+    for index, result in enumerate(results):
+        if isinstance(result, ValueError):
+            message = str(result)
+            status = 404 if 'not found' in message.lower() else 400
+            items.append({'index': index, 'status': status, 'error': message})
+        else:
+            created += 1
+            items.append({'index': index, 'status': 201, 'data': serializer.dump(result)})
+    if created == len(items):
+        return items, 201
+    return items, 400 if created == 0 else 207
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(sort, key):
+    """Opaque token resuming a search after ``key``, the (sort key, id) of its last item"""
+    value, item_id = key
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, item_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, datetime_keys=()):
+    """The (sort key, id) a cursor resumes after.
+
+    Raises ValueError when it is malformed or was issued for another sort.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, item_id = json.loads(raw)
+        if sort.lstrip('-') in datetime_keys:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError
+        if not isinstance(item_id, str):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort:
+        raise ValueError('cursor was issued for sort={}'.format(cursor_sort))
+    return value, item_id
@@ -0,0 +1,21 @@
+import hashlib
+
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+
+def make_etag(*parts):
+    """Build an opaque weak ETag value from the parts identifying a version"""
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def etag_headers(etag):
+    return {'ETag': quote_etag(etag, weak=True)}
+
+
+def not_modified_response(etag):
+    """Return a 304 response if the client already holds this version"""
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=etag_headers(etag))
+    return None
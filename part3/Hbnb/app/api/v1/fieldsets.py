@@ -0,0 +1,78 @@
+from flask import current_app, request
+
+
+def _split(value):
+    return tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+
+
+def parse_fieldset(views, default_fields, default_include=()):
+    """Read ``?fields=`` and ``?include=`` into a validated (fields, include) pair.
+
+    The id is always returned. Raises ValueError for unknown names.
+    """
+    fields = default_fields
+    if request.args.get('fields'):
+        fields = _split(request.args['fields'])
+        unknown = [name for name in fields if name not in views.fields]
+        if unknown:
+            raise ValueError('Unknown field(s): {}'.format(', '.join(unknown)))
+        if 'id' not in fields:
+            fields = ('id',) + fields
+
+    include = default_include
+    if 'include' in request.args:
+        include = _split(request.args['include'])
+        unknown = [name for name in include if name not in views.includes]
+        if unknown:
+            raise ValueError('Unknown include(s): {}'.format(', '.join(unknown)))
+
+    return fields, include
+
+
+def fieldset_key(fields, include):
+    """Stable token identifying a representation, for ETags and cache keys"""
+    return '{}|{}'.format(','.join(fields), ','.join(include))
+
+
+def parse_ids():
+    """Read ``?ids=a,b,c`` into a tuple of unique ids, None when absent.
+
+    Raises ValueError when it is empty or longer than MULTI_GET_MAX_IDS.
+    """
+    if 'ids' not in request.args:
+        return None
+    ids = _split(request.args['ids'])
+    if not ids:
+        raise ValueError('ids must list at least one id')
+    limit = current_app.config.get('MULTI_GET_MAX_IDS', 500)
+    if len(ids) > limit:
+        raise ValueError('At most {} ids per request'.format(limit))
+    return ids
+
+
+def parse_flag(name):
+    """Read a ``?name=true|false`` switch, False when absent.
+
+    Raises ValueError for any other value.
+    """
+    value = request.args.get(name, 'false').lower()
+    if value not in ('true', 'false'):
+        raise ValueError('{} must be true or false'.format(name))
+    return value == 'true'
+
+
+def parse_bbox():
+    """Read ``?bbox=west,south,east,north`` into four floats, None when absent.
+
+    Raises ValueError when it is not four numbers.
+    """
+    bbox = request.args.get('bbox')
+    if bbox is None:
+        return None
+    try:
+        bbox = tuple(float(value) for value in bbox.split(','))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise ValueError('bbox must be four numbers: west,south,east,north')
+    return bbox
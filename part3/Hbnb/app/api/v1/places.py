@@ -1,6 +1,16 @@
+from flask import Response, current_app, request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.serializers import (
+    PLACE_CREATED, PLACE_DETAIL_FIELDS, PLACE_DETAIL_INCLUDE, PLACE_LIST_FIELDS,
+    PLACE_TOP, PLACE_TOP_COLUMNS, PLACE_VIEWS, REVIEW_FIELDS, REVIEW_VIEWS, dumps,
+)
+from app.api.v1.etags import make_etag, etag_headers, not_modified_response
+from app.api.v1.fieldsets import parse_bbox, parse_fieldset, parse_ids, fieldset_key
+from app.api.v1.responses import encode_json, cached_json_response
+from app.api.v1.batches import read_batch, batch_results
+from app.api.v1.cursors import decode_cursor, encode_cursor
 
 api = Namespace('places', description='Place operations')
 
@@ -62,63 +72,253 @@ class PlaceList(Resource):
             status_code = 404 if 'not found' in message.lower() else 400
             return {'error': message}, status_code
 
-        return {
-            'id': new_place.id,
-            'title': new_place.title,
-            'description': new_place.description,
-            'price': new_place.price,
-            'latitude': new_place.latitude,
-            'longitude': new_place.longitude,
-            'owner_id': new_place.owner.id,
-            'amenities': [amenity.id for amenity in new_place.amenities]
-        }, 201
+        return PLACE_CREATED.dump(new_place), 201
 
+    @api.doc(params={
+        'fields': 'Comma-separated place fields to return',
+        'include': 'Comma-separated relations to embed: owner, amenities, reviews',
+        'ids': 'Comma-separated place IDs: returns {items, missing} in this order',
+        'min_price': 'Search: lowest price per night',
+        'max_price': 'Search: highest price per night',
+        'sort': 'Search order: price, -price, created_at (default) or -created_at',
+        'limit': 'Search: places per page',
+        'cursor': 'Search: next_cursor of the previous page',
+    })
     @api.response(200, 'List of places retrieved successfully')
+    @api.response(304, 'Place list not modified')
+    @api.response(400, 'Unknown field or include, or invalid ids or search parameters')
     def get(self):
-        """Retrieve a list of all places"""
-        places = facade.get_all_places()
-        return [
-            {
-                'id': place.id,
-                'title': place.title,
-                'latitude': place.latitude,
-                'longitude': place.longitude
-            }
-            for place in places
-        ], 200
+        """Retrieve all places, the places listed in ?ids=, or one page of a search.
+
+        Any search parameter returns {items, next_cursor}: the page of live
+        places matching the price range in ``sort`` order, and the cursor
+        of the next page, null on the last one.
+        """
+        try:
+            fields, include = parse_fieldset(PLACE_VIEWS, PLACE_LIST_FIELDS)
+            ids = parse_ids()
+            search = _parse_search_args()
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        if search is not None:
+            if ids is not None:
+                return {'error': 'Search parameters cannot be combined with ids'}, 400
+            return _search_places(search, fields, include)
+
+        version = facade.get_places_version(include)
+        if ids is not None:
+            etag = make_etag('places', ','.join(ids), fieldset_key(fields, include), *version)
+        else:
+            etag = make_etag('places', fieldset_key(fields, include), *version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        view = PLACE_VIEWS.view(fields, include)
+        if ids is not None:
+            places, missing = facade.get_places(ids, PLACE_VIEWS.columns(fields), include)
+            return {'items': view.dump_many(places), 'missing': missing}, 200, etag_headers(etag)
+        places = facade.get_all_places(PLACE_VIEWS.columns(fields), include)
+        return view.dump_many(places), 200, etag_headers(etag)
+
+
+SEARCH_ARGS = ('min_price', 'max_price', 'sort', 'limit', 'cursor')
+
+
+def _price_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        price = -1.0
+    if not 0.0 <= price < float('inf'):
+        raise ValueError('{} must be a non-negative number'.format(name))
+    return price
+
+
+def _parse_search_args():
+    """Read the search parameters, None when there are none; raises ValueError"""
+    if not any(name in request.args for name in SEARCH_ARGS):
+        return None
+    limit = current_app.config.get('PLACE_SEARCH_DEFAULT_LIMIT', 20)
+    max_limit = current_app.config.get('PLACE_SEARCH_MAX_LIMIT', 100)
+    try:
+        limit = int(request.args.get('limit', limit))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if not 1 <= limit <= max_limit:
+        raise ValueError('limit must be between 1 and {}'.format(max_limit))
+    sort = request.args.get('sort', 'created_at')
+    cursor = request.args.get('cursor')
+    return {
+        'sort': sort,
+        'limit': limit,
+        'cursor': decode_cursor(cursor, sort, ('created_at',)) if cursor else None,
+        'min_price': _price_arg('min_price'),
+        'max_price': _price_arg('max_price'),
+    }
+
+
+def _search_places(search, fields, include):
+    version = facade.get_places_version(include)
+    etag = make_etag(
+        'places', 'search', *(request.args.get(name) for name in SEARCH_ARGS),
+        fieldset_key(fields, include), *version
+    )
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+
+    try:
+        places, last = facade.search_places(columns=PLACE_VIEWS.columns(fields), include=include, **search)
+    except ValueError as err:
+        return {'error': str(err)}, 400
+    return {
+        'items': PLACE_VIEWS.view(fields, include).dump_many(places),
+        'next_cursor': encode_cursor(search['sort'], last) if last else None,
+    }, 200, etag_headers(etag)
+
+
+@api.route('/batch')
+class PlaceBatch(Resource):
+    @jwt_required()
+    @api.expect([place_create_model], validate=False)
+    @api.response(201, 'All places successfully created')
+    @api.response(207, 'Some places were created, see the per-item results')
+    @api.response(400, 'Invalid batch or no place created')
+    def post(self):
+        """Register many places owned by the current user in one transaction"""
+        try:
+            items = read_batch(api.payload)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        results = facade.create_places(items, get_jwt_identity())
+        return batch_results(results, PLACE_CREATED)
+
+
+def _parse_top_args():
+    """Read ``?k=`` and ``?bbox=west,south,east,north``, raising ValueError"""
+    limit = current_app.config.get('TOP_PLACES_MAX_K', 100)
+    try:
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        raise ValueError('k must be an integer')
+    if not 1 <= k <= limit:
+        raise ValueError('k must be between 1 and {}'.format(limit))
+    return k, parse_bbox()
+
+
+@api.route('/top')
+class PlaceTop(Resource):
+    @api.doc(params={
+        'k': 'Number of places to return (default 10)',
+        'bbox': 'Only places inside west,south,east,north (degrees)',
+    })
+    @api.response(200, 'Most popular places, best first')
+    @api.response(400, 'Invalid k or bbox')
+    def get(self):
+        """Most popular reviewed places by Bayesian average rating"""
+        try:
+            k, bbox = _parse_top_args()
+            places = facade.get_top_places(k, bbox, PLACE_TOP_COLUMNS)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return PLACE_TOP.dump_many(places), 200
+
+
+def _format_sse(event):
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+        event['id'], event['type'], dumps(event['data']).decode('utf-8').rstrip('\n')
+    )
+
+
+@api.route('/stream')
+class PlaceReviewStream(Resource):
+    @jwt_required(locations=['headers', 'query_string'])
+    @api.response(200, 'Stream of review events for the places owned by the user')
+    @api.response(401, 'Missing or invalid token')
+    def get(self):
+        """Stream review events for the current user's places (Server-Sent Events)"""
+        heartbeat = current_app.config.get('REVIEW_STREAM_HEARTBEAT', 15)
+        buffer_size = current_app.config.get('REVIEW_STREAM_BUFFER_SIZE', 100)
+        subscription = facade.review_events.subscribe(get_jwt_identity(), buffer_size)
+
+        def stream():
+            try:
+                yield 'retry: {}\n\n'.format(heartbeat * 1000)
+                while not subscription.closed:
+                    event = subscription.get(timeout=heartbeat)
+                    dropped = subscription.take_dropped()
+                    if dropped:
+                        # The client fell behind: ask it to refetch once
+                        yield 'event: overflow\ndata: {{"dropped": {}}}\n\n'.format(dropped)
+                    if event is None:
+                        yield ': heartbeat\n\n'
+                    else:
+                        yield _format_sse(event)
+            finally:
+                subscription.close()
+
+        return Response(
+            stream(),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
 
 
 @api.route('/<place_id>')
 class PlaceResource(Resource):
+    @api.doc(params={
+        'fields': 'Comma-separated place fields to return',
+        'include': 'Comma-separated relations to embed: owner, amenities, reviews',
+    })
     @api.response(200, 'Place details retrieved successfully')
+    @api.response(304, 'Place not modified')
+    @api.response(400, 'Unknown field or include')
     @api.response(404, 'Place not found')
     def get(self, place_id):
         """Get place details by ID"""
-        place = facade.get_place(place_id)
-        if not place:
+        try:
+            fields, include = parse_fieldset(
+                PLACE_VIEWS, PLACE_DETAIL_FIELDS, PLACE_DETAIL_INCLUDE
+            )
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        version = facade.get_place_version(place_id, include)
+        if version is None:
             return {'error': 'Place not found'}, 404
+        etag = make_etag('place', place_id, fieldset_key(fields, include), *version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        cache_key = ('place', place_id, etag)
+        body = facade.response_cache.get(cache_key)
+        if body is not None:
+            return cached_json_response(body, headers=etag_headers(etag), cache_status='HIT')
+
+        def load():
+            place = facade.get_place(place_id, PLACE_VIEWS.columns(fields), include)
+            if not place:
+                return None
+            body = encode_json(PLACE_VIEWS.view(fields, include).dump(place))
+            tags = [('place', place_id), ('user', place.user_id)]
+            if 'amenities' in include:
+                tags.extend(('amenity', amenity.id) for amenity in place.amenities)
+            facade.response_cache.set(cache_key, body, tags)
+            return body
 
-        return {
-            'id': place.id,
-            'title': place.title,
-            'description': place.description,
-            'price': place.price,
-            'latitude': place.latitude,
-            'longitude': place.longitude,
-            'owner': {
-                'id': place.owner.id,
-                'first_name': place.owner.first_name,
-                'last_name': place.owner.last_name,
-                'email': place.owner.email
-            },
-            'amenities': [
-                {
-                    'id': amenity.id,
-                    'name': amenity.name
-                }
-                for amenity in place.amenities
-            ]
-        }, 200
+        # Requests missing the cache together wait for the first one's load
+        body, shared = facade.single_flight.do(cache_key, load)
+        if body is None:
+            return {'error': 'Place not found'}, 404
+        return cached_json_response(
+            body, headers=etag_headers(etag), cache_status='COALESCED' if shared else 'MISS'
+        )
 
     @jwt_required()
     @api.expect(place_update_model, validate=True)
@@ -172,21 +372,38 @@ class PlaceResource(Resource):
 
 @api.route('/<place_id>/reviews')
 class PlaceReviewList(Resource):
+    @api.doc(params={
+        'fields': 'Comma-separated review fields to return',
+        'include': 'Comma-separated relations to embed: user, place',
+    })
     @api.response(200, 'List of reviews for the place retrieved successfully')
+    @api.response(304, 'Review list not modified')
+    @api.response(400, 'Unknown field or include')
     @api.response(404, 'Place not found')
     def get(self, place_id):
         """Get all reviews for a specific place"""
-        reviews = facade.get_reviews_by_place(place_id)
-        if reviews is None:
+        try:
+            fields, include = parse_fieldset(REVIEW_VIEWS, REVIEW_FIELDS)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        version = facade.get_place_reviews_version(place_id, include)
+        if version is None:
             return {'error': 'Place not found'}, 404
+        etag = make_etag('place_reviews', place_id, fieldset_key(fields, include), *version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        def load():
+            reviews = facade.get_reviews_by_place(place_id, REVIEW_VIEWS.columns(fields), include)
+            if reviews is None:
+                return None
+            return encode_json(REVIEW_VIEWS.view(fields, include).dump_many(reviews))
 
-        return [
-            {
-                'id': review.id,
-                'text': review.text,
-                'rating': review.rating,
-                'user_id': review.user.id,
-                'place_id': review.place.id,
-            }
-            for review in reviews
-        ], 200
+        body, shared = facade.single_flight.do(('place_reviews', place_id, etag), load)
+        if body is None:
+            return {'error': 'Place not found'}, 404
+        return cached_json_response(
+            body, headers=etag_headers(etag), cache_status='COALESCED' if shared else None
+        )
@@ -0,0 +1,25 @@
+from flask import Response
+
+from app.serializers import dumps
+
+
+def encode_json(payload):
+    """Encode a payload with the shared fast JSON encoder"""
+    return dumps(payload)
+
+
+def output_json(data, code, headers=None):
+    """flask-restx representation rendering every namespace's JSON output"""
+    response = Response(dumps(data), status=code, mimetype='application/json')
+    response.headers.extend(headers or {})
+    return response
+
+
+def cached_json_response(body, status=200, headers=None, cache_status=None):
+    """Send an already encoded JSON body, bypassing flask-restx rendering"""
+    response = Response(body, status=status, mimetype='application/json')
+    if headers:
+        response.headers.extend(headers)
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    return response
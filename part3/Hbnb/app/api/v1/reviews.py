@@ -1,6 +1,10 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services import facade
+from app.serializers import REVIEW, REVIEW_FIELDS, REVIEW_VIEWS
+from app.api.v1.etags import make_etag, etag_headers, not_modified_response
+from app.api.v1.fieldsets import parse_fieldset, fieldset_key
+from app.api.v1.batches import read_batch, batch_results
 
 api = Namespace('reviews', description='Review operations')
 
@@ -50,47 +54,81 @@ class ReviewList(Resource):
 			status_code = 404 if 'not found' in message.lower() else 400
 			return {'error': message}, status_code
 
-		return {
-			'id': review.id,
-			'text': review.text,
-			'rating': review.rating,
-			'user_id': review.user.id,
-			'place_id': review.place.id,
-		}, 201
+		return REVIEW.dump(review), 201
 
+	@api.doc(params={
+		'fields': 'Comma-separated review fields to return',
+		'include': 'Comma-separated relations to embed: user, place',
+	})
 	@api.response(200, 'List of reviews retrieved successfully')
+	@api.response(304, 'Review list not modified')
+	@api.response(400, 'Unknown field or include')
 	def get(self):
 		"""Retrieve a list of all reviews"""
-		reviews = facade.get_all_reviews()
-		return [
-			{
-				'id': review.id,
-				'text': review.text,
-				'rating': review.rating,
-				'user_id': review.user.id,
-				'place_id': review.place.id,
-			}
-			for review in reviews
-		], 200
+		try:
+			fields, include = parse_fieldset(REVIEW_VIEWS, REVIEW_FIELDS)
+		except ValueError as err:
+			return {'error': str(err)}, 400
+
+		version = facade.get_reviews_version(include)
+		etag = make_etag('reviews', fieldset_key(fields, include), *version)
+		not_modified = not_modified_response(etag)
+		if not_modified:
+			return not_modified
+
+		reviews = facade.get_all_reviews(REVIEW_VIEWS.columns(fields), include)
+		return REVIEW_VIEWS.view(fields, include).dump_many(reviews), 200, etag_headers(etag)
+
+
+@api.route('/batch')
+class ReviewBatch(Resource):
+	@jwt_required()
+	@api.expect([review_create_model], validate=False)
+	@api.response(201, 'All reviews successfully created')
+	@api.response(207, 'Some reviews were created, see the per-item results')
+	@api.response(400, 'Invalid batch or no review created')
+	def post(self):
+		"""Register many reviews by the current user in one transaction"""
+		try:
+			items = read_batch(api.payload)
+		except ValueError as err:
+			return {'error': str(err)}, 400
+
+		claims = get_jwt()
+		results = facade.create_reviews(items, get_jwt_identity(), claims.get('is_admin', False))
+		return batch_results(results, REVIEW)
 
 
 @api.route('/<review_id>')
 class ReviewResource(Resource):
+	@api.doc(params={
+		'fields': 'Comma-separated review fields to return',
+		'include': 'Comma-separated relations to embed: user, place',
+	})
 	@api.response(200, 'Review details retrieved successfully')
+	@api.response(304, 'Review not modified')
+	@api.response(400, 'Unknown field or include')
 	@api.response(404, 'Review not found')
 	def get(self, review_id):
 		"""Get review details by ID"""
-		review = facade.get_review(review_id)
+		try:
+			fields, include = parse_fieldset(REVIEW_VIEWS, REVIEW_FIELDS)
+		except ValueError as err:
+			return {'error': str(err)}, 400
+
+		version = facade.get_review_version(review_id, include)
+		if version is None:
+			return {'error': 'Review not found'}, 404
+		etag = make_etag('review', review_id, fieldset_key(fields, include), version)
+		not_modified = not_modified_response(etag)
+		if not_modified:
+			return not_modified
+
+		review = facade.get_review(review_id, REVIEW_VIEWS.columns(fields), include)
 		if not review:
 			return {'error': 'Review not found'}, 404
 
-		return {
-			'id': review.id,
-			'text': review.text,
-			'rating': review.rating,
-			'user_id': review.user.id,
-			'place_id': review.place.id,
-		}, 200
+		return REVIEW_VIEWS.view(fields, include).dump(review), 200, etag_headers(etag)
 
 	@jwt_required()
 	@api.expect(review_update_model, validate=True)
@@ -0,0 +1,43 @@
+from flask import request
+from flask_restx import Namespace, Resource
+from app.services import facade
+
+api = Namespace('stats', description='Aggregate reports')
+
+
+def _int_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('{} must be an integer'.format(name))
+
+
+@api.route('/places')
+class PlaceStats(Resource):
+    @api.doc(params={
+        'metric': 'price (default), rating (individual review ratings) or reviews (review count per place)',
+        'group_by': 'geocell (geohash prefix) or owner; totals only when absent',
+        'precision': 'Geohash prefix length of a geocell, 1-12 (default 4)',
+        'bins': 'Histogram bins of the price or reviews totals, 1-100 (default 10)',
+        'limit': 'Largest groups returned (default 100)',
+    })
+    @api.response(200, 'Report computed')
+    @api.response(400, 'Invalid parameters')
+    @api.response(501, 'NumPy is not installed')
+    def get(self):
+        """Price, rating and review count aggregates over every place"""
+        if not facade.place_stats.available:
+            return {'error': 'Place statistics require NumPy'}, 501
+        try:
+            return facade.get_place_stats(
+                metric=request.args.get('metric', 'price'),
+                group_by=request.args.get('group_by') or None,
+                precision=_int_arg('precision', 4),
+                bins=_int_arg('bins', 10),
+                limit=_int_arg('limit', 100),
+            ), 200
+        except ValueError as err:
+            return {'error': str(err)}, 400
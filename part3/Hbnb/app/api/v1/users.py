@@ -1,6 +1,10 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from app.services import facade
+from app.serializers import USER, USER_LIST
+from app.api.v1.etags import make_etag, etag_headers, not_modified_response
+from app.api.v1.fieldsets import parse_ids
+from app.api.v1.responses import encode_json, cached_json_response
 
 api = Namespace('users', description='User operations')
 
@@ -26,19 +30,30 @@ user_update_model = api.model('UserUpdate', {
 @api.route('/')
 class UserList(Resource):
 
+    @api.doc(params={'ids': 'Comma-separated user IDs: returns {items, missing} in this order'})
     @api.response(200, 'List of users retrieved successfully')
+    @api.response(304, 'User list not modified')
+    @api.response(400, 'Invalid ids')
     def get(self):
-        """Retrieve a list of all users"""
+        """Retrieve a list of all users, or of the users listed in ?ids="""
+        try:
+            ids = parse_ids()
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        if ids is not None:
+            etag = make_etag('users', ','.join(ids), facade.get_users_version())
+        else:
+            etag = make_etag('users', facade.get_users_version())
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        if ids is not None:
+            users, missing = facade.get_users(ids)
+            return {'items': USER_LIST.dump_many(users), 'missing': missing}, 200, etag_headers(etag)
         users = facade.get_all_users()
-        return [
-            {
-                'id': user.id,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email
-            }
-            for user in users
-        ], 200
+        return USER_LIST.dump_many(users), 200, etag_headers(etag)
 
     @jwt_required()
     @api.expect(user_registration_model, validate=True)
@@ -59,7 +74,7 @@ class UserList(Resource):
             return {'error': 'Invalid input data'}, 400
 
         # Check email uniqueness
-        existing_user = facade.get_user_by_email(user_data['email'])
+        existing_user = facade.get_user_by_email(user_data['email'], include_deleted=True)
         if existing_user:
             return {'error': 'Email already registered'}, 400
 
@@ -78,18 +93,22 @@ class UserList(Resource):
 class UserResource(Resource):
 
     @api.response(200, 'User details retrieved successfully')
+    @api.response(304, 'User not modified')
     @api.response(404, 'User not found')
     def get(self, user_id):
         """Get user details by ID"""
+        version = facade.get_user_version(user_id)
+        if version is None:
+            return {'error': 'User not found'}, 404
+        etag = make_etag('user', user_id, version)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
         user = facade.get_user(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        return {
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email
-        }, 200
+        return USER.dump(user), 200, etag_headers(etag)
 
     @jwt_required()
     @api.expect(user_update_model, validate=False)
@@ -110,7 +129,7 @@ class UserResource(Resource):
             return {'error': 'Invalid input data'}, 400
 
         if 'email' in user_data:
-            existing_user = facade.get_user_by_email(user_data['email'])
+            existing_user = facade.get_user_by_email(user_data['email'], include_deleted=True)
             if existing_user and existing_user.id != user_id:
                 return {'error': 'Email already in use'}, 400
 
@@ -122,9 +141,42 @@ class UserResource(Resource):
         if not updated_user:
             return {'error': 'User not found'}, 404
 
-        return {
-            'id': updated_user.id,
-            'first_name': updated_user.first_name,
-            'last_name': updated_user.last_name,
-            'email': updated_user.email
-        }, 200
+        return USER.dump(updated_user), 200
+
+    @jwt_required()
+    @api.response(200, 'User deleted successfully')
+    @api.response(404, 'User not found')
+    @api.response(403, 'Admin privileges required')
+    def delete(self, user_id):
+        """Delete a user along with their places and reviews"""
+        claims = get_jwt()
+        if not claims.get('is_admin', False):
+            return {'error': 'Admin privileges required'}, 403
+
+        if not facade.delete_user(user_id):
+            return {'error': 'User not found'}, 404
+        return {'message': 'User deleted successfully'}, 200
+
+
+@api.route('/<user_id>/dashboard')
+class UserDashboard(Resource):
+    @jwt_required()
+    @api.response(200, 'Dashboard retrieved successfully')
+    @api.response(403, 'Unauthorized action')
+    @api.response(404, 'User not found')
+    def get(self, user_id):
+        """Review count, average rating and latest review of each of a host's places, and totals"""
+        if get_jwt_identity() != user_id and not get_jwt().get('is_admin', False):
+            return {'error': 'Unauthorized action'}, 403
+
+        dashboards = facade.owner_dashboards
+        generation = dashboards.check()
+        body = dashboards.get(user_id)
+        if body is not None:
+            return cached_json_response(body, cache_status='HIT')
+
+        if not facade.get_user(user_id):
+            return {'error': 'User not found'}, 404
+        body = encode_json(facade.get_owner_dashboard(user_id))
+        dashboards.store(user_id, body, generation)
+        return cached_json_response(body, cache_status='MISS')
@@ -2,8 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 
+from app.persistence.routing import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
 
@@ -0,0 +1,99 @@
+# Geohash digits in order: the value of a character is its position
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=12):
+    """Encode a coordinate as a geohash string of the given precision"""
+    lat_low, lat_high = -90.0, 90.0
+    lon_low, lon_high = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            middle = (lon_low + lon_high) / 2
+            if longitude >= middle:
+                value = (value << 1) | 1
+                lon_low = middle
+            else:
+                value <<= 1
+                lon_high = middle
+        else:
+            middle = (lat_low + lat_high) / 2
+            if latitude >= middle:
+                value = (value << 1) | 1
+                lat_low = middle
+            else:
+                value <<= 1
+                lat_high = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def _cell_range(low, high, bits, span):
+    """Indexes of the cells of a 2**bits grid over ``span`` degrees covering [low, high]"""
+    size = span / (1 << bits)
+    last = (1 << bits) - 1
+    offset = span / 2
+    return range(min(int((low + offset) // size), last), min(int((high + offset) // size), last) + 1)
+
+
+def _interleave(x, y, x_bits, y_bits):
+    """Geohash bits of longitude cell ``x`` and latitude cell ``y``, longitude first"""
+    value = 0
+    for position in range(x_bits + y_bits):
+        if position % 2 == 0:
+            x_bits -= 1
+            bit = (x >> x_bits) & 1
+        else:
+            y_bits -= 1
+            bit = (y >> y_bits) & 1
+        value = value << 1 | bit
+    return value
+
+
+def _geohash_string(value, precision):
+    if value >= 1 << 5 * precision:
+        # Past the last cell: sorts after every geohash
+        return '{'
+    return ''.join(BASE32[(value >> 5 * (precision - 1 - i)) & 31] for i in range(precision))
+
+
+def geohash_ranges(west, south, east, north, max_cells=32):
+    """Half-open (low, high) geohash ranges covering a bounding box.
+
+    Uses the longest geohashes whose cells covering the box number at
+    most ``max_cells``, merging cells that follow each other in geohash
+    order, so an indexed geohash column is read range by range. The
+    ranges may reach outside the box. ``west > east`` crosses the
+    antimeridian.
+    """
+    if west > east:
+        return (geohash_ranges(west, south, 180.0, north, max_cells // 2)
+                + geohash_ranges(-180.0, south, east, north, max_cells // 2))
+    cover = None
+    for precision in range(1, 13):
+        bits = 5 * precision
+        x_bits, y_bits = (bits + 1) // 2, bits // 2
+        xs = _cell_range(west, east, x_bits, 360.0)
+        ys = _cell_range(south, north, y_bits, 180.0)
+        if len(xs) * len(ys) > max_cells:
+            break
+        cover = precision, sorted(_interleave(x, y, x_bits, y_bits) for x in xs for y in ys)
+    if cover is None:
+        return [('', '{')]
+
+    precision, cells = cover
+    ranges = []
+    for cell in cells:
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = cell + 1
+        else:
+            ranges.append([cell, cell + 1])
+    return [(_geohash_string(low, precision), _geohash_string(high, precision)) for low, high in ranges]
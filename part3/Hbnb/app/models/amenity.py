@@ -11,6 +11,7 @@ class Amenity(BaseModel):
         'Place',
         secondary=place_amenity,
         back_populates='amenities',
+        passive_deletes=True,
         lazy='subquery',
     )
 
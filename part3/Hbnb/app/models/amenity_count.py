@@ -0,0 +1,10 @@
+from app.extensions import db
+from app.models.ids import Identifier
+
+
+class AmenityPlaceCount(db.Model):
+    """Live places offering an amenity, kept by app.persistence.amenity_counts."""
+    __tablename__ = 'amenity_place_counts'
+
+    amenity_id = db.Column(Identifier, db.ForeignKey('amenities.id', ondelete='CASCADE'), primary_key=True)
+    place_count = db.Column(db.Integer, nullable=False, default=0)
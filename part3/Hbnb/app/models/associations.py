@@ -1,8 +1,9 @@
 from app.extensions import db
+from app.models.ids import Identifier
 
 
 place_amenity = db.Table(
     'place_amenity',
-    db.Column('place_id', db.String(36), db.ForeignKey('places.id'), primary_key=True),
-    db.Column('amenity_id', db.String(36), db.ForeignKey('amenities.id'), primary_key=True),
+    db.Column('place_id', Identifier, db.ForeignKey('places.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('amenity_id', Identifier, db.ForeignKey('amenities.id', ondelete='CASCADE'), primary_key=True, index=True),
 )
@@ -1,11 +1,11 @@
-import uuid
 from datetime import datetime
 from app.extensions import db
+from app.models.ids import Identifier, new_id
 
 class BaseModel(db.Model):
     __abstract__ = True
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(Identifier, primary_key=True, default=lambda: new_id())
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(
         db.DateTime,
@@ -13,6 +13,8 @@ class BaseModel(db.Model):
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
     )
+    # Tombstone set by repository deletes, rows are purged in the background
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified"""
@@ -0,0 +1,155 @@
+"""Primary key generation and storage.
+
+ID_STRATEGY picks how new ids are generated:
+
+- ``uuid4``: random UUIDs, the historical default
+- ``uuid7``: RFC 9562 UUIDs starting with a millisecond timestamp
+- ``ulid``: the same 128 bits written as 26 Crockford base32 characters
+
+Time-ordered ids append to the end of every primary key and foreign key
+index instead of splitting random pages. ID_STORAGE stores them either as
+their text form or as 16 raw bytes; the API always sees strings.
+
+Both settings are process wide and applied by ``init_ids`` when the
+application is created. Switching the storage of an existing database
+goes through ``python -m app.persistence.id_migration``.
+"""
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy.types import LargeBinary, String, TypeDecorator
+
+STRATEGIES = ('uuid4', 'uuid7', 'ulid')
+STORAGES = ('string', 'binary')
+
+_CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_CROCKFORD_VALUES = {char: index for index, char in enumerate(_CROCKFORD)}
+_CROCKFORD_VALUES.update({char.lower(): index for char, index in _CROCKFORD_VALUES.items()})
+
+_settings = {'strategy': 'uuid4', 'storage': 'string'}
+
+
+class _Clock:
+    """Millisecond clock with a per-millisecond counter keeping ids monotonic"""
+
+    def __init__(self, counter_bits):
+        self.counter_bits = counter_bits
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._counter = 0
+
+    def tick(self, timestamp_ms=None):
+        with self._lock:
+            now = int(time.time() * 1000) if timestamp_ms is None else timestamp_ms
+            if now > self._last_ms:
+                self._last_ms = now
+                # Leave headroom so a burst in one millisecond rarely overflows
+                self._counter = int.from_bytes(os.urandom(4), 'big') >> (33 - self.counter_bits)
+            else:
+                self._counter += 1
+                if self._counter >> self.counter_bits:
+                    self._last_ms += 1
+                    self._counter = 0
+            return self._last_ms, self._counter
+
+
+_uuid7_clock = _Clock(12)
+_ulid_clock = _Clock(16)
+
+
+def uuid7_int(timestamp_ms=None):
+    """128-bit UUIDv7 value using the 12 rand_a bits as a counter"""
+    timestamp, counter = _uuid7_clock.tick(timestamp_ms)
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    return (timestamp << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | random_bits
+
+
+def ulid_int(timestamp_ms=None):
+    """128-bit ULID value: timestamp, 16-bit counter, 64 random bits"""
+    timestamp, counter = _ulid_clock.tick(timestamp_ms)
+    return (timestamp << 80) | (counter << 64) | int.from_bytes(os.urandom(8), 'big')
+
+
+def encode_ulid(value):
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 0x1F])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def decode_ulid(text):
+    value = 0
+    for char in text:
+        value = (value << 5) | _CROCKFORD_VALUES[char]
+    if value >> 128:
+        raise ValueError("ULID out of range")
+    return value
+
+
+def id_to_bytes(text):
+    """16-byte form of a UUID or ULID string"""
+    if len(text) == 26:
+        return decode_ulid(text).to_bytes(16, 'big')
+    return uuid.UUID(text).bytes
+
+
+def id_from_bytes(value, strategy=None):
+    """Text form of a 16-byte id, as a ULID or as a UUID"""
+    if (strategy or _settings['strategy']) == 'ulid':
+        return encode_ulid(int.from_bytes(value, 'big'))
+    return str(uuid.UUID(bytes=bytes(value)))
+
+
+def new_id(strategy=None, timestamp_ms=None):
+    """Generate an id string with the configured strategy.
+
+    ``timestamp_ms`` backdates time-ordered ids, e.g. to a row's creation
+    time when migrating existing data.
+    """
+    strategy = strategy or _settings['strategy']
+    if strategy == 'uuid7':
+        return str(uuid.UUID(int=uuid7_int(timestamp_ms)))
+    if strategy == 'ulid':
+        return encode_ulid(ulid_int(timestamp_ms))
+    return str(uuid.uuid4())
+
+
+def configure_ids(strategy='uuid4', storage='string'):
+    if strategy not in STRATEGIES:
+        raise ValueError("ID_STRATEGY must be one of {}".format(', '.join(STRATEGIES)))
+    if storage not in STORAGES:
+        raise ValueError("ID_STORAGE must be one of {}".format(', '.join(STORAGES)))
+    _settings.update(strategy=strategy, storage=storage)
+
+
+def init_ids(app):
+    """Apply the application's ID_STRATEGY and ID_STORAGE"""
+    configure_ids(app.config.get('ID_STRATEGY', 'uuid4'), app.config.get('ID_STORAGE', 'string'))
+
+
+class Identifier(TypeDecorator):
+    """String id in Python, VARCHAR(36) or BINARY(16) in the database"""
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if _settings['storage'] == 'binary':
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or _settings['storage'] != 'binary':
+            return value
+        try:
+            return id_to_bytes(value)
+        except (KeyError, ValueError, TypeError):
+            # Not an id of ours: bind something no stored key can equal
+            return str(value).encode('utf-8')
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return id_from_bytes(value)
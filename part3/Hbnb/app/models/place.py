@@ -1,28 +1,48 @@
 from app.models.base_model import BaseModel
 from app.extensions import db
+from app.models.ids import Identifier
 from app.models.associations import place_amenity
+from app.geohash import encode_geohash
 
 class Place(BaseModel):
     __tablename__ = 'places'
+    # Top-k walks live places from the highest score down, bounding box
+    # counts walk live places by geohash range; with deleted_at first the
+    # soft delete filter is part of the same index range, as for the
+    # search indexes walked from a page's cursor
+    __table_args__ = (
+        db.Index('ix_places_popularity', 'deleted_at', 'popularity', 'id'),
+        db.Index('ix_places_live_geohash', 'deleted_at', 'geohash'),
+        db.Index('ix_places_live_price', 'deleted_at', 'price', 'id'),
+        db.Index('ix_places_live_created_at', 'deleted_at', 'created_at', 'id'),
+    )
 
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(1024), nullable=False, default='')
     price = db.Column(db.Float, nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(Identifier, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    geohash = db.Column(db.String(12), nullable=False, index=True)
+    # Rating totals and Bayesian popularity, kept by the review write paths
+    # (see app.services.popularity); places without reviews score 0
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    popularity = db.Column(db.Float, nullable=False, default=0.0)
 
     owner = db.relationship('User', back_populates='places', lazy=True)
     reviews = db.relationship(
         'Review',
         back_populates='place',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         lazy=True,
     )
     amenities = db.relationship(
         'Amenity',
         secondary=place_amenity,
         back_populates='places',
+        passive_deletes=True,
         lazy='subquery',
     )
 
@@ -50,6 +70,7 @@ class Place(BaseModel):
         self.price = price
         self.latitude = latitude
         self.longitude = longitude
+        self.geohash = encode_geohash(latitude, longitude)
         self.user_id = resolved_user_id
 
     @property
@@ -60,6 +81,12 @@ class Place(BaseModel):
     def owner_id(self, value):
         self.user_id = value
 
+    @property
+    def rating_average(self):
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
     @staticmethod
     def _validate_title(title):
         if not title or not isinstance(title, str):
@@ -113,6 +140,8 @@ class Place(BaseModel):
             self._validate_user_id(data_to_update['user_id'])
 
         super().update(data_to_update)
+        if 'latitude' in data_to_update or 'longitude' in data_to_update:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
 
     def add_review(self, review):
         """Add a review to the place"""
@@ -1,13 +1,17 @@
 from app.models.base_model import BaseModel
 from app.extensions import db
+from app.models.ids import Identifier
 
 class Review(BaseModel):
     __tablename__ = 'reviews'
+    # The live reviews of a place in one index range, which the planner
+    # prefers over scanning every live review through deleted_at
+    __table_args__ = (db.Index('ix_reviews_place_id', 'place_id', 'deleted_at'),)
 
     text = db.Column(db.String(2048), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    place_id = db.Column(db.String(36), db.ForeignKey('places.id'), nullable=False)
+    user_id = db.Column(Identifier, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    place_id = db.Column(Identifier, db.ForeignKey('places.id', ondelete='CASCADE'), nullable=False)
 
     user = db.relationship('User', back_populates='reviews', lazy=True)
     place = db.relationship('Place', back_populates='reviews', lazy=True)
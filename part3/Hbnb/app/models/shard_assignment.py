@@ -0,0 +1,9 @@
+from app.extensions import db
+
+
+class ShardAssignment(db.Model):
+    """Shard holding the places of a geohash prefix, overriding the default hash."""
+    __tablename__ = 'shard_map'
+
+    geohash_prefix = db.Column(db.String(12), primary_key=True)
+    shard = db.Column(db.String(64), nullable=False)
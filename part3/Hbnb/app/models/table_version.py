@@ -0,0 +1,9 @@
+from app.extensions import db
+
+
+class TableVersion(db.Model):
+    """Monotonic change counter for a table, bumped on every flush touching it."""
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
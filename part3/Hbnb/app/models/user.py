@@ -15,12 +15,14 @@ class User(BaseModel):
         'Place',
         back_populates='owner',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         lazy=True,
     )
     reviews = db.relationship(
         'Review',
         back_populates='user',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         lazy=True,
     )
 
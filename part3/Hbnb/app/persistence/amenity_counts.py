@@ -0,0 +1,172 @@
+"""Number of live places offering each amenity, kept up to date by every flush.
+
+Counting through ``Amenity.places`` loads every place of the amenity.
+Instead ``amenity_place_counts`` holds one counter per amenity, moved in
+the same transaction as the writes changing it, the way table versions
+are bumped: a place created with amenities, links added to or removed
+from a place, a place tombstoned, or an owner tombstoned with all their
+places. The counters live on the global database, so moving a place
+between shards leaves them alone.
+
+Links are only visible as collection history before the flush, and the
+links of a place being hidden must be read before its tombstone is
+written, so deltas are computed in ``before_flush`` and applied in
+``after_flush``, once new amenities exist to be referenced.
+
+    python -m app.persistence.amenity_counts     create the table and recount
+"""
+import sys
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+
+from app.extensions import db
+from app.models.amenity import Amenity
+from app.models.amenity_count import AmenityPlaceCount
+from app.models.associations import place_amenity
+from app.models.place import Place
+from app.models.user import User
+from app.persistence.sharding import identity_token
+
+_counts = AmenityPlaceCount.__table__
+
+
+def count_places(session, *criteria):
+    """Live places per amenity id among the places matching ``criteria``.
+
+    Runs through the ORM so tombstoned places and the places of tombstoned
+    owners are left out; when sharded each shard counts its own places.
+    """
+    counts = Counter()
+    rows = session.query(place_amenity.c.amenity_id, func.count()).select_from(Place).join(
+        place_amenity, place_amenity.c.place_id == Place.id
+    ).filter(*criteria).group_by(place_amenity.c.amenity_id)
+    for amenity_id, count in rows:
+        counts[amenity_id] += count
+    return counts
+
+
+def recount(session, amenity_ids=None):
+    """Rewrite the counters of ``amenity_ids``, or of every amenity, from the links"""
+    if amenity_ids is None:
+        amenity_ids = set(session.execute(select(Amenity.__table__.c.id)).scalars())
+        session.execute(delete(_counts))
+        criteria = ()
+    else:
+        session.execute(delete(_counts).where(_counts.c.amenity_id.in_(amenity_ids)))
+        criteria = (place_amenity.c.amenity_id.in_(amenity_ids),)
+    counts = count_places(session, *criteria)
+    if amenity_ids:
+        session.execute(insert(_counts), [
+            {'amenity_id': amenity_id, 'place_count': counts[amenity_id]} for amenity_id in amenity_ids
+        ])
+
+
+def _liveness(state):
+    """Whether a place or user was live before the flush and is after it"""
+    history = state.attrs.deleted_at.history
+    before = (history.deleted or history.unchanged or [None])[0] is None
+    after = history.added[0] is None if history.added else before
+    return before, after
+
+
+def _stored_links(session, state):
+    """Amenity ids linked to a place in the database, read on its shard"""
+    connection = session.connection(bind_arguments={'shard_id': identity_token(state)})
+    return set(connection.execute(
+        select(place_amenity.c.amenity_id).where(place_amenity.c.place_id == state.identity[0])
+    ).scalars())
+
+
+def _place_deltas(session, deltas):
+    for obj in session.new:
+        if isinstance(obj, Place) and obj.deleted_at is None:
+            deltas.update(amenity.id for amenity in obj.amenities)
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Place):
+            continue
+        state = inspect(obj)
+        links = state.attrs.amenities.history
+        before, after = _liveness(state)
+        if obj in session.deleted:
+            after = False
+        if before and after:
+            deltas.update(amenity.id for amenity in links.added)
+            deltas.subtract(amenity.id for amenity in links.deleted)
+        elif before or after:
+            stored = _stored_links(session, state)
+            if before:
+                deltas.subtract(stored)
+            if after:
+                current = (stored - {amenity.id for amenity in links.deleted}) | {
+                    amenity.id for amenity in links.added
+                }
+                deltas.update(current)
+
+
+def _owner_deltas(session, deltas):
+    """The live places of owners tombstoned or deleted by this flush stop counting"""
+    owner_ids = []
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            before, after = _liveness(inspect(obj))
+            if before and (not after or obj in session.deleted):
+                owner_ids.append(obj.id)
+    if owner_ids:
+        deltas.subtract(count_places(session, Place.user_id.in_(owner_ids)))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _count_links(session, flush_context, instances):
+    deltas = Counter()
+    _place_deltas(session, deltas)
+    _owner_deltas(session, deltas)
+    new_amenities = [obj for obj in session.new if isinstance(obj, Amenity)]
+    session.info['amenity_counts'] = (new_amenities, {
+        amenity_id: delta for amenity_id, delta in deltas.items() if delta
+    })
+
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_counts(session, flush_context):
+    new_amenities, deltas = session.info.pop('amenity_counts', ((), {}))
+    if not (new_amenities or deltas):
+        return
+    connection = session.connection()
+    if new_amenities:
+        connection.execute(insert(_counts), [
+            # Ids are assigned by the flush
+            {'amenity_id': amenity.id, 'place_count': 0} for amenity in new_amenities
+        ])
+    if deltas:
+        connection.execute(
+            update(_counts).where(_counts.c.amenity_id == bindparam('amenity'))
+            .values(place_count=_counts.c.place_count + bindparam('delta')),
+            [{'amenity': amenity_id, 'delta': delta} for amenity_id, delta in deltas.items()],
+        )
+        existing = set(connection.execute(
+            select(_counts.c.amenity_id).where(_counts.c.amenity_id.in_(deltas))
+        ).scalars())
+        missing = set(deltas) - existing
+        if missing:
+            # Amenities older than the table have no counter yet: count them
+            # from scratch, this flush's links included
+            recount(session, missing)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_counts(session):
+    session.info.pop('amenity_counts', None)
+
+
+if __name__ == '__main__':
+    # Creates the counters of a database predating them, or repairs them
+    import config
+    from app import create_app
+
+    application = create_app(config.config[sys.argv[1] if len(sys.argv) > 1 else 'development'])
+    with application.app_context():
+        _counts.create(db.engine, checkfirst=True)
+        recount(db.session)
+        db.session.commit()
+        print('counted places of {} amenities'.format(db.session.query(AmenityPlaceCount).count()))
@@ -1,12 +1,24 @@
+from sqlalchemy.orm import lazyload
+
 from app.extensions import db
 from app.models.amenity import Amenity
-from app.persistence.repository import SQLAlchemyRepository
+from app.models.amenity_count import AmenityPlaceCount
+from app.persistence.repository import SQLAlchemyRepository, read_only
 
 
 class AmenityRepository(SQLAlchemyRepository):
     def __init__(self):
         super().__init__(Amenity)
 
+    def get_by_ids(self, ids, options=()):
+        """Amenities by id, without subquery loading all of their places"""
+        return super().get_by_ids(ids, (lazyload(Amenity.places),) + tuple(options))
+
+    @read_only
+    def get_place_counts(self):
+        """Live places per amenity id, from the counters kept by app.persistence.amenity_counts"""
+        return dict(db.session.query(AmenityPlaceCount.amenity_id, AmenityPlaceCount.place_count).all())
+
     def update_amenity(self, amenity_id, data):
         amenity = self.get(amenity_id)
         if not amenity:
@@ -0,0 +1,108 @@
+"""Rewrite the ids of an existing database for another ID_STORAGE or strategy.
+
+Every id and foreign key column is converted to the target storage (text
+or 16-byte binary) keeping its value. With --rekey every id is replaced
+by a time-ordered one derived from the row's created_at, so primary key
+order follows creation order, and every reference to it is rewritten.
+
+Stop the application and back the database up first; re-keying also
+invalidates issued access tokens, which carry user ids. Sharded deployments
+convert the storage of each database separately and cannot be re-keyed.
+
+    python -m app.persistence.id_migration DATABASE_URL --storage binary
+    python -m app.persistence.id_migration DATABASE_URL --strategy ulid --rekey
+"""
+import argparse
+from datetime import timezone
+
+from sqlalchemy import MetaData, create_engine, insert, inspect, select, update
+
+from app.extensions import db
+from app.models.ids import Identifier, STORAGES, STRATEGIES, configure_ids, id_from_bytes, new_id
+from app.models import amenity, amenity_count, place, review, user  # noqa: F401 - register the tables
+from app.models.table_version import TableVersion
+
+# Tables holding ids, in dependency order
+ENTITY_TABLES = ('users', 'amenities', 'places', 'reviews')
+LINK_TABLES = ('place_amenity', 'amenity_place_counts')
+
+
+def _identifier_columns(table):
+    return [column.name for column in table.columns if isinstance(column.type, Identifier)]
+
+
+def _epoch_ms(value):
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def migrate_ids(url, storage, strategy, rekey=False):
+    """Convert the database at ``url``, returning the number of rows rewritten"""
+    if rekey and strategy == 'uuid4':
+        raise ValueError("--rekey needs a time-ordered strategy (uuid7 or ulid)")
+    configure_ids(strategy, storage)
+    tables = [db.metadata.tables[name] for name in ENTITY_TABLES + LINK_TABLES]
+    engine = create_engine(url)
+
+    with engine.connect() as connection:
+        if engine.dialect.name == 'sqlite':
+            # Tables are dropped and recreated underneath their references
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+        with connection.begin():
+            current = MetaData()
+            current.reflect(connection, only=[table.name for table in tables])
+            data = {}
+            for table in tables:
+                columns = _identifier_columns(table)
+                rows = [dict(row) for row in connection.execute(
+                    select(current.tables[table.name])
+                ).mappings()]
+                for row in rows:
+                    for column in columns:
+                        if isinstance(row[column], (bytes, memoryview)):
+                            row[column] = id_from_bytes(bytes(row[column]), strategy)
+                data[table.name] = rows
+
+            if rekey:
+                # One pass in creation order keeps the generated ids monotonic
+                entities = sorted(
+                    (row for name in ENTITY_TABLES for row in data[name]),
+                    key=lambda row: row['created_at'],
+                )
+                new_ids = {
+                    row['id']: new_id(strategy, timestamp_ms=_epoch_ms(row['created_at']))
+                    for row in entities
+                }
+                for table in tables:
+                    columns = _identifier_columns(table)
+                    for row in data[table.name]:
+                        for column in columns:
+                            row[column] = new_ids.get(row[column], row[column])
+
+            for table in reversed(tables):
+                current.tables[table.name].drop(connection)
+            for table in tables:
+                table.create(connection)
+                if data[table.name]:
+                    connection.execute(insert(table), data[table.name])
+
+            # Cached representations embed the old ids
+            if inspect(connection).has_table(TableVersion.__tablename__):
+                connection.execute(
+                    update(TableVersion.__table__)
+                    .where(TableVersion.table_name.in_([table.name for table in tables]))
+                    .values(version=TableVersion.version + 1)
+                )
+    engine.dispose()
+    return sum(len(rows) for rows in data.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the ids of an HBnB database')
+    parser.add_argument('url', help='SQLAlchemy database URL')
+    parser.add_argument('--storage', choices=STORAGES, default='string')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='uuid7')
+    parser.add_argument('--rekey', action='store_true', help='replace ids with time-ordered ones')
+    arguments = parser.parse_args()
+    count = migrate_ids(arguments.url, arguments.storage, arguments.strategy, arguments.rekey)
+    print('rewrote {} rows'.format(count))
@@ -1,12 +1,258 @@
+import heapq
+from collections import Counter
+
+from sqlalchemy import and_, bindparam, case, func, or_, tuple_, update
+from sqlalchemy.orm import joinedload, lazyload, load_only, selectinload
+
 from app.extensions import db
+from app.geohash import geohash_ranges
+from app.models.amenity import Amenity
+from app.models.associations import place_amenity
 from app.models.place import Place
-from app.persistence.repository import SQLAlchemyRepository
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.amenity_counts import count_places
+from app.persistence.repository import SQLAlchemyRepository, keep_loaded, read_only
+from app.persistence.review_repository import ReviewRepository
+from app.persistence.sharding import get_shard_router
 
 
 class PlaceRepository(SQLAlchemyRepository):
+    # Tables whose content is embedded by each ?include= relationship
+    INCLUDE_TABLES = {'owner': 'users', 'amenities': 'amenities', 'reviews': 'reviews'}
+    # Search orders: (sort key column, descending)
+    SORTS = {
+        'price': ('price', False),
+        '-price': ('price', True),
+        'created_at': ('created_at', False),
+        '-created_at': ('created_at', True),
+    }
+
     def __init__(self):
         super().__init__(Place)
 
+    @staticmethod
+    def load_options(columns=None, include=()):
+        """Column projection and eager loads for a requested representation.
+
+        Each included relationship costs at most one extra query whatever
+        the number of places: the owner is joined, amenities and reviews
+        are batch loaded with SELECT ... IN. Relationships that were not
+        requested are left lazy, including the amenities that the model
+        otherwise subquery-loads with every place. Owners live on the global
+        database when places are sharded, so they are batch loaded instead.
+        """
+        options = []
+        if columns is not None:
+            attributes = dict.fromkeys(('id', 'user_id') + tuple(columns))
+            options.append(load_only(*(getattr(Place, name) for name in attributes)))
+        if 'owner' in include:
+            loader = selectinload if get_shard_router() else joinedload
+            options.append(
+                loader(Place.owner).load_only(User.first_name, User.last_name, User.email)
+            )
+        if 'amenities' in include:
+            options.append(selectinload(Place.amenities).lazyload(Amenity.places))
+        else:
+            options.append(lazyload(Place.amenities))
+        if 'reviews' in include:
+            options.append(selectinload(Place.reviews))
+        return options
+
+    def add_places(self, places, amenities):
+        """Insert many places with their amenity lists in one transaction.
+
+        Amenities are attached just before their places are flushed: when
+        sharded, the places of each shard are flushed separately because a
+        flush may only write the amenity links of one shard (see
+        ``ShardRouter.flush_shard``), and attaching them all up front would
+        cascade every place into the first flush through ``Amenity.places``.
+        """
+        router = get_shard_router()
+        groups = {}
+        for place, place_amenities in zip(places, amenities):
+            shard_id = router.shard_for_instance(db.session, place) if router else None
+            groups.setdefault(shard_id, []).append((place, place_amenities))
+        with keep_loaded() as session:
+            for group in groups.values():
+                for place, place_amenities in group:
+                    place.amenities = place_amenities
+                session.add_all(place for place, _ in group)
+                session.flush()
+            session.commit()
+
+    def get_place(self, place_id, columns=None, include=()):
+        return self.get(place_id, options=self.load_options(columns, include))
+
+    def get_places(self, place_ids, columns=None, include=()):
+        return self.get_many(place_ids, options=self.load_options(columns, include))
+
+    def get_all_places(self, columns=None, include=()):
+        return self.get_all(options=self.load_options(columns, include))
+
+    def get_stats_rows(self, place_ids=None):
+        """(id, price, latitude, longitude, user_id, geohash, 1-5 star review counts)
+        of every visible place, or of those among ``place_ids``.
+
+        Reviews live on the shard of their place, so the per-place counts
+        of each shard are complete.
+        """
+        stars = [func.count(case((Review.rating == star, 1))) for star in range(1, 6)]
+        query = db.session.query(
+            Place.id, Place.price, Place.latitude, Place.longitude, Place.user_id, Place.geohash, *stars
+        ).outerjoin(Review, Review.place_id == Place.id).group_by(Place.id)
+        if place_ids is not None:
+            query = query.filter(Place.id.in_(place_ids))
+        return query.all()
+
+    @staticmethod
+    def within(bbox):
+        """Criteria keeping the places inside (west, south, east, north).
+
+        West > east crosses the antimeridian.
+        """
+        west, south, east, north = bbox
+        if west <= east:
+            longitude = Place.longitude.between(west, east)
+        else:
+            longitude = or_(Place.longitude >= west, Place.longitude <= east)
+        return [Place.latitude.between(south, north), longitude]
+
+    @read_only
+    def get_amenity_counts(self, bbox):
+        """Live places per amenity id among the places inside ``bbox``.
+
+        The places are read through the live geohash index, one query per
+        run of geohash cells covering the box (SQLite would rather use the
+        deleted_at index than OR several index ranges), then their amenity
+        links through the place_amenity primary key.
+        """
+        counts = Counter()
+        for low, high in geohash_ranges(*bbox):
+            counts.update(count_places(db.session, Place.geohash >= low, Place.geohash < high, *self.within(bbox)))
+        return counts
+
+    def get_top_places(self, k, bbox=None, columns=None):
+        """The ``k`` reviewed places with the highest popularity, best first.
+
+        Walks the popularity index from the top, keeping the places inside
+        ``bbox`` (west, south, east, north; west > east crosses the
+        antimeridian). Ties go to the newest place. Each shard returns its
+        own top ``k``, merged here.
+        """
+        query = Place.query.options(*self.load_options(columns)).filter(Place.popularity > 0)
+        if bbox is not None:
+            query = query.filter(*self.within(bbox))
+        places = query.order_by(Place.popularity.desc(), Place.id.desc()).limit(k).all()
+        if get_shard_router():
+            places = heapq.nlargest(k, places, key=lambda place: (place.popularity, place.id))
+        return places
+
+    def get_place_page(self, sort, limit, after=None, min_price=None, max_price=None, columns=None, include=()):
+        """The first ``limit`` live places after the (sort key, id) ``after`` in ``sort`` order.
+
+        Keyset pagination: a page resumes strictly after the last (key, id)
+        of the previous one, so places inserted or deleted meanwhile never
+        shift the following pages, and the id breaks ties between equal
+        keys. The page is read in one query, walking the search index of
+        the sort key from ``after``: loading the ids afterwards with IN
+        would let SQLite scan the deleted_at index instead. Each shard
+        returns its own first ``limit``, merged here.
+        """
+        name, descending = self.SORTS[sort]
+        column = getattr(Place, name)
+        if columns is not None:
+            columns = tuple(columns) + (name,)
+        query = Place.query.options(*self.load_options(columns, include))
+        if after is not None:
+            key = tuple_(column, Place.id)
+            query = query.filter(key < tuple(after) if descending else key > tuple(after))
+            # Past the first page the cursor is the tighter bound on that
+            # side: left alone, SQLite would start the index range at the
+            # price filter and step over every earlier page
+            if name == 'price' and (max_price if descending else min_price) is not None:
+                if descending and after[0] <= max_price:
+                    max_price = None
+                elif not descending and after[0] >= min_price:
+                    min_price = None
+        if min_price is not None:
+            query = query.filter(Place.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Place.price <= max_price)
+        order = (column.desc(), Place.id.desc()) if descending else (column, Place.id)
+        places = query.order_by(*order).limit(limit).all()
+        if get_shard_router():
+            places = sorted(places, key=lambda place: (getattr(place, name), place.id), reverse=descending)[:limit]
+        return places
+
+    def get_place_ids(self, after=None, limit=500, rated_only=False):
+        """Place ids in id order, the first ``limit`` after ``after``"""
+        query = db.session.query(Place.id)
+        if rated_only:
+            query = query.filter(Place.popularity > 0)
+        if after is not None:
+            query = query.filter(Place.id > after)
+        # Shards each return their first ``limit`` ids: the first ``limit``
+        # of them all are the global ones
+        return sorted(row[0] for row in query.order_by(Place.id).limit(limit))[:limit]
+
+    def set_popularity(self, scores, commit=True):
+        """Store (review_count, rating_sum, popularity) for each place id of ``scores``.
+
+        Leaves updated_at alone: the score is derived from the reviews, not
+        an edit of the place. Runs on every shard, places are missing on all
+        but one. Without ``commit`` the scores join the current transaction.
+        """
+        if not scores:
+            return
+        table = Place.__table__
+        statement = update(table).where(table.c.id == bindparam('place')).values(
+            review_count=bindparam('count'),
+            rating_sum=bindparam('total'),
+            popularity=bindparam('score'),
+            updated_at=table.c.updated_at,
+        )
+        parameters = [
+            {'place': place_id, 'count': count, 'total': total, 'score': score}
+            for place_id, (count, total, score) in scores.items()
+        ]
+        router = get_shard_router()
+        for shard_id in router.shard_ids if router else (None,):
+            db.session.execute(statement, parameters, bind_arguments={'shard_id': shard_id})
+        if commit:
+            db.session.commit()
+
+    def get_owner_dashboard_rows(self, owner_id):
+        """(id, title, created_at, review count, rating sum, latest review time) of each live place of an owner.
+
+        One grouped query: the places through the user_id index, their live
+        reviews through the place_id index. Each shard groups its own
+        places, whose reviews it holds. Oldest place first, by creation
+        time and then id: ids are only time-ordered with uuid7.
+        """
+        reviews = and_(Review.place_id == Place.id, *ReviewRepository.live_criteria())
+        rows = db.session.query(
+            Place.id, Place.title, Place.created_at,
+            func.count(Review.id), func.sum(Review.rating), func.max(Review.created_at)
+        ).execution_options(include_deleted=True).outerjoin(Review, reviews).filter(
+            Place.user_id == owner_id, Place.deleted_at.is_(None)
+        ).group_by(Place.id, Place.title, Place.created_at).order_by(Place.created_at, Place.id).all()
+        if get_shard_router():
+            rows.sort(key=lambda row: (row[2], row[0]))
+        return rows
+
+    def get_owner_ids(self, place_ids):
+        """Owners of the places among ``place_ids``, deleted ones included"""
+        if not place_ids:
+            return set()
+        return {row[0] for row in db.session.query(Place.user_id).execution_options(
+            include_deleted=True
+        ).filter(Place.id.in_(set(place_ids)))}
+
+    def get_list_version(self, include=()):
+        """Versions of the place table and of every included relationship"""
+        return self.get_table_versions(*(self.INCLUDE_TABLES[name] for name in include))
+
     def update_place(self, place_id, data):
         place = self.get(place_id)
         if not place:
@@ -14,4 +260,49 @@ class PlaceRepository(SQLAlchemyRepository):
 
         place.update(data)
         db.session.commit()
+        router = get_shard_router()
+        if router is not None and router.relocate_place(db.session, place):
+            place = self.get(place_id)
         return place
+
+    @read_only
+    def get_detail_version(self, place_id):
+        """Version stamp of a place and everything embedded in its detail view.
+
+        Computed with one aggregate query over the place, its owner and its
+        amenities so callers can validate a cached representation without
+        loading any relationship. Returns None when the place does not exist.
+        """
+        if get_shard_router():
+            return self._get_sharded_detail_version(place_id)
+        return db.session.query(
+            Place.updated_at,
+            User.updated_at,
+            func.count(Amenity.id),
+            func.max(Amenity.updated_at),
+        ).join(User, Place.user_id == User.id).outerjoin(
+            place_amenity, place_amenity.c.place_id == Place.id
+        ).outerjoin(
+            Amenity, Amenity.id == place_amenity.c.amenity_id
+        ).filter(Place.id == place_id).group_by(
+            Place.id, Place.updated_at, User.updated_at
+        ).first()
+
+    def _get_sharded_detail_version(self, place_id):
+        """Same stamp with the owner read from the global database"""
+        row = db.session.query(
+            Place.updated_at,
+            Place.user_id,
+            func.count(Amenity.id),
+            func.max(Amenity.updated_at),
+        ).outerjoin(
+            place_amenity, place_amenity.c.place_id == Place.id
+        ).outerjoin(
+            Amenity, Amenity.id == place_amenity.c.amenity_id
+        ).filter(Place.id == place_id).group_by(
+            Place.id, Place.updated_at, Place.user_id
+        ).first()
+        if row is None:
+            return None
+        owner_updated_at = db.session.query(User.updated_at).filter_by(id=row[1]).scalar()
+        return row[0], owner_updated_at, row[2], row[3]
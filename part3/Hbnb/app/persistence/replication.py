@@ -0,0 +1,78 @@
+"""Replication stand-in keeping a local SQLite replica in sync.
+
+Real deployments point DATABASE_REPLICA_BIND at a database replicated by
+the server. Locally the replica is a second SQLite file refreshed from the
+primary with the online backup API, either on demand or every
+SQLITE_REPLICATION_INTERVAL seconds, which also reproduces replica lag.
+
+    python -m app.persistence.replication primary.db replica.db
+"""
+import sqlite3
+import sys
+import threading
+
+
+class SQLiteReplicator:
+    def __init__(self, primary_path, replica_path, interval=None):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.syncs = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync(self):
+        """Copy the current primary content over the replica"""
+        with self._lock:
+            source = sqlite3.connect(self.primary_path)
+            target = sqlite3.connect(self.replica_path, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.syncs += 1
+
+    def start(self):
+        if self.interval is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='sqlite-replicator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+
+def init_replication(app):
+    """Start the SQLite replication stand-in when a local replica is configured"""
+    from app.extensions import db
+
+    replica_bind = app.config.get('DATABASE_REPLICA_BIND')
+    interval = app.config.get('SQLITE_REPLICATION_INTERVAL')
+    if not replica_bind or interval is None:
+        return None
+
+    with app.app_context():
+        primary, replica = db.engines[None], db.engines[replica_bind]
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        return None
+
+    replicator = SQLiteReplicator(primary.url.database, replica.url.database, interval)
+    app.extensions['sqlite_replicator'] = replicator
+    replicator.sync()
+    replicator.start()
+    return replicator
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python -m app.persistence.replication PRIMARY REPLICA')
+    SQLiteReplicator(sys.argv[1], sys.argv[2]).sync()
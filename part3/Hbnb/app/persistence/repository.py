@@ -1,5 +1,34 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
 from app.extensions import db
+from app.persistence.routing import replica_reads
+from app.persistence.versioning import get_table_versions
+
+
+def read_only(method):
+    """Mark a repository method as safe to serve from the read replica"""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with replica_reads(db.session()):
+            return method(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def keep_loaded():
+    """Commit without expiring the session's objects.
+
+    Bulk writes return thousands of objects to serialize; expiring them
+    would reload each one with its own SELECT.
+    """
+    session = db.session()
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        yield session
+    finally:
+        session.expire_on_commit = expire_on_commit
 
 class Repository(ABC):
     @abstractmethod
@@ -10,6 +39,10 @@ class Repository(ABC):
     def get(self, obj_id):
         pass
 
+    @abstractmethod
+    def get_many(self, ids):
+        pass
+
     @abstractmethod
     def get_all(self):
         pass
@@ -37,6 +70,11 @@ class InMemoryRepository(Repository):
     def get(self, obj_id):
         return self._storage.get(obj_id)
 
+    def get_many(self, ids):
+        """Objects for ``ids`` in request order, and the ids not found"""
+        found = [self._storage[obj_id] for obj_id in ids if obj_id in self._storage]
+        return found, [obj_id for obj_id in ids if obj_id not in self._storage]
+
     def get_all(self):
         return list(self._storage.values())
 
@@ -61,11 +99,39 @@ class SQLAlchemyRepository(Repository):
         db.session.add(obj)
         db.session.commit()
 
-    def get(self, obj_id):
-        return db.session.get(self.model, obj_id)
-
-    def get_all(self):
-        return self.model.query.all()
+    def add_all(self, objs):
+        """Insert many objects in a single transaction"""
+        with keep_loaded() as session:
+            session.add_all(objs)
+            session.commit()
+
+    @read_only
+    def get(self, obj_id, options=()):
+        return db.session.get(self.model, obj_id, options=options)
+
+    @read_only
+    def get_by_ids(self, ids, options=()):
+        """Map each existing id to its object, fetched with one IN query"""
+        ids = set(ids)
+        if not ids:
+            return {}
+        objs = self.model.query.options(*options).filter(self.model.id.in_(ids)).all()
+        return {obj.id: obj for obj in objs}
+
+    def get_many(self, ids, options=()):
+        """Objects for ``ids`` in request order, and the ids not found"""
+        found = self.get_by_ids(ids, options)
+        return [found[obj_id] for obj_id in ids if obj_id in found], [
+            obj_id for obj_id in ids if obj_id not in found
+        ]
+
+    @read_only
+    def get_all(self, options=()):
+        return self.model.query.options(*options).all()
+
+    @read_only
+    def exists(self, obj_id):
+        return db.session.query(self.model.id).filter_by(id=obj_id).first() is not None
 
     def update(self, obj_id, data):
         obj = self.get(obj_id)
@@ -76,12 +142,32 @@ class SQLAlchemyRepository(Repository):
         return obj
 
     def delete(self, obj_id):
+        """Tombstone an object, hiding it and everything it owns at once"""
         obj = self.get(obj_id)
         if obj:
-            db.session.delete(obj)
+            obj.deleted_at = datetime.utcnow()
             db.session.commit()
             return True
         return False
 
+    @read_only
     def get_by_attribute(self, attr_name, attr_value):
         return self.model.query.filter_by(**{attr_name: attr_value}).first()
+
+    @read_only
+    def get_updated_at(self, obj_id):
+        """Fetch only the last modification time of a row, None if missing"""
+        return db.session.query(self.model.updated_at).filter_by(id=obj_id).scalar()
+
+    @read_only
+    def get_table_version(self):
+        """Change counter of the whole table, bumped by every write"""
+        table_name = self.model.__tablename__
+        return get_table_versions(table_name)[table_name]
+
+    @read_only
+    def get_table_versions(self, *related_tables):
+        """Change counters of this table followed by the related tables"""
+        names = (self.model.__tablename__,) + tuple(related_tables)
+        versions = get_table_versions(*names)
+        return tuple(versions[name] for name in names)
@@ -1,23 +1,131 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
 from app.extensions import db
+from app.models.place import Place
 from app.models.review import Review
-from app.persistence.repository import SQLAlchemyRepository
+from app.models.user import User
+from app.persistence.repository import SQLAlchemyRepository, read_only
+from app.persistence.sharding import get_shard_router
+from app.persistence.soft_delete import hidden_ids
 
 
 class ReviewRepository(SQLAlchemyRepository):
+    # Tables whose content is embedded by each ?include= relationship
+    INCLUDE_TABLES = {'user': 'users', 'place': 'places'}
+
     def __init__(self):
         super().__init__(Review)
 
-    def get_reviews_by_place(self, place_id):
-        return self.model.query.filter_by(place_id=place_id).all()
+    @staticmethod
+    def load_options(columns=None, include=()):
+        """Column projection and eager loads for a representation.
+
+        Relationships are joined, except users when reviews are sharded:
+        they live on the global database and are batch loaded instead.
+        """
+        options = []
+        if columns is not None:
+            attributes = dict.fromkeys(('id',) + tuple(columns))
+            options.append(load_only(*(getattr(Review, name) for name in attributes)))
+        if 'user' in include:
+            loader = selectinload if get_shard_router() else joinedload
+            options.append(
+                loader(Review.user).load_only(User.first_name, User.last_name, User.email)
+            )
+        if 'place' in include:
+            options.append(
+                joinedload(Review.place)
+                .load_only(Place.title, Place.latitude, Place.longitude)
+                .lazyload(Place.amenities)
+            )
+        return options
+
+    def get_review(self, review_id, columns=None, include=()):
+        return self.get(review_id, options=self.load_options(columns, include))
 
+    def get_all_reviews(self, columns=None, include=()):
+        return self.get_all(options=self.load_options(columns, include))
+
+    @read_only
+    def get_reviews_by_place(self, place_id, columns=None, include=()):
+        return self.model.query.options(
+            *self.load_options(columns, include)
+        ).filter_by(place_id=place_id).all()
+
+    def get_list_version(self, include=()):
+        """Versions of the review table and of every included relationship"""
+        return self.get_table_versions(*(self.INCLUDE_TABLES[name] for name in include))
+
+    @read_only
     def get_review_by_user_and_place(self, user_id, place_id):
         return self.model.query.filter_by(user_id=user_id, place_id=place_id).first()
 
+    @read_only
+    def get_reviewed_place_ids(self, user_id, place_ids):
+        """Ids among ``place_ids`` of the places the user already reviewed"""
+        return {row[0] for row in db.session.query(Review.place_id).filter(
+            Review.user_id == user_id, Review.place_id.in_(set(place_ids))
+        )}
+
+    @staticmethod
+    def live_criteria():
+        """Criteria keeping reviews that are not tombstoned nor by a deleted user.
+
+        For queries run with include_deleted about places already known to
+        be live: the generic visibility criteria also check every review's
+        place, which means scanning every place to find the hidden ones.
+        Shards hold no users, tombstoning a user tombstones their reviews there.
+        """
+        criteria = [Review.deleted_at.is_(None)]
+        if not get_shard_router():
+            criteria.append(Review.user_id.notin_(hidden_ids(User.__table__)))
+        return criteria
+
+    def get_ratings(self, place_ids, with_dates=False):
+        """(place_id, review count, rating sum) of the reviewed places among ``place_ids``.
+
+        With ``with_dates`` returns one (place_id, rating, created_at) row
+        per review instead. Always read from the primary: callers refresh
+        place totals right after their own writes.
+
+        Hidden places are not filtered, see ``live_criteria``.
+        """
+        if with_dates:
+            query = db.session.query(Review.place_id, Review.rating, Review.created_at)
+        else:
+            query = db.session.query(
+                Review.place_id, func.count(Review.id), func.sum(Review.rating)
+            ).group_by(Review.place_id)
+        return query.execution_options(include_deleted=True).filter(
+            Review.place_id.in_(set(place_ids)), *self.live_criteria()
+        ).all()
+
+    def get_reviewed_place_ids_of_user(self, user_id):
+        return [row[0] for row in db.session.query(Review.place_id).filter(Review.user_id == user_id)]
+
+    def purge_deleted_reviews(self, user_id, place_ids):
+        """Free the (user, place) pairs still held by tombstoned reviews"""
+        reviews = self.model.query.execution_options(include_deleted=True).filter(
+            Review.user_id == user_id,
+            Review.place_id.in_(set(place_ids)),
+            Review.deleted_at.isnot(None),
+        ).all()
+        for review in reviews:
+            db.session.delete(review)
+        if reviews:
+            db.session.flush()
+
     def update_review(self, review_id, data):
-        review = self.get(review_id)
+        # A flush before a move across shards would UPDATE the old shard
+        with db.session.no_autoflush:
+            review = self.get(review_id)
         if not review:
             return None
 
         review.update(data)
+        router = get_shard_router()
+        if router is not None:
+            review = router.relocate_review(db.session, review)
         db.session.commit()
         return review
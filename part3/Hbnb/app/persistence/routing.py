@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+
+
+class RoutingSession(Session):
+    """Session sending replica-safe reads to the DATABASE_REPLICA_BIND engine.
+
+    Reads only go to the replica inside ``replica_reads()`` and only until
+    the session flushes anything: from then on the rest of the request
+    reads from the primary so it always sees its own writes.
+
+    When sharding is enabled, places and reviews are also routed to their
+    shard: writes per object, reads to the shard of the object they are
+    loaded for or to every shard (see ``app.persistence.sharding``).
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.shard_router = current_app.extensions.get('shard_router')
+        if self.shard_router is not None:
+            self.connection_callable = self._shard_connection
+
+    def get_bind(self, mapper=None, clause=None, bind=None, shard_id=None, **kwargs):
+        if shard_id is not None:
+            return self._db.engines[shard_id]
+        router = self.shard_router
+        if router is not None and bind is None and clause is None and self._flushing and (
+            router.is_sharded(mapper) or router.is_reference(mapper)
+        ):
+            # Only amenity links are written without an object to route by
+            shard_id = self.info.get('flush_shard')
+            if shard_id is not None:
+                return self._db.engines[shard_id]
+        if bind is None and self.info.get('use_replica') and not self._flushing:
+            replica = current_app.config.get('DATABASE_REPLICA_BIND')
+            if replica and not self.info.get('pinned_to_primary'):
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _shard_connection(self, mapper=None, instance=None, **kwargs):
+        shard_id = None
+        if instance is not None:
+            shard_id = self.shard_router.shard_for_instance(self, instance)
+        if shard_id is None:
+            return self.get_transaction().connection(None)
+        return self.get_transaction().connection(mapper, shard_id=shard_id)
+
+    def _identity_lookup(self, mapper, primary_key_identity, identity_token=None, **kwargs):
+        router = self.shard_router
+        if router is None or identity_token is not None or not router.is_sharded(mapper):
+            return super()._identity_lookup(
+                mapper, primary_key_identity, identity_token=identity_token, **kwargs
+            )
+        for shard_id in router.shard_ids:
+            obj = super()._identity_lookup(
+                mapper, primary_key_identity, identity_token=shard_id, **kwargs
+            )
+            if obj is not None:
+                return obj
+        return None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_to_primary(session, flush_context):
+    session.info['pinned_to_primary'] = True
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _choose_flush_shard(session, flush_context, instances):
+    if session.shard_router is not None:
+        session.info['flush_shard'] = session.shard_router.flush_shard(session)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _propagate_to_shards(session, flush_context):
+    """Copy amenity changes to the shards and cascade global deletes and tombstones there"""
+    router = session.shard_router
+    if router is None:
+        return
+    changed = {}
+    deleted = {}
+    tombstoned = {}
+    for obj in session.new | session.dirty:
+        state = inspect(obj)
+        if router.is_reference(state.mapper) and session.is_modified(obj, include_collections=False):
+            changed.setdefault(state.mapper, []).append(obj)
+        elif (
+            not router.is_sharded(state.mapper) and 'deleted_at' in state.mapper.attrs
+            and any(state.attrs.deleted_at.history.added)
+        ):
+            tombstoned.setdefault(state.mapper, []).append(obj.id)
+    for obj in session.deleted:
+        mapper = inspect(obj).mapper
+        if not router.is_sharded(mapper):
+            deleted.setdefault(mapper, []).append(obj.id)
+    if changed or deleted or tombstoned:
+        router.replicate_references(session, changed, deleted, tombstoned)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _route_sharded_execute(orm_context):
+    """Run statements on sharded tables on their shards and merge the rows"""
+    router = orm_context.session.shard_router
+    if router is None:
+        return None
+    shard_ids = router.shards_for_execute(orm_context)
+    if shard_ids is None:
+        return None
+    tokenised = router.is_sharded(orm_context.bind_mapper)
+    results = []
+    for shard_id in shard_ids:
+        if tokenised:
+            orm_context.update_execution_options(identity_token=shard_id)
+        results.append(orm_context.invoke_statement(
+            bind_arguments=dict(orm_context.bind_arguments, shard_id=shard_id)
+        ))
+    if len(results) == 1:
+        return results[0]
+    return results[0].merge(*results[1:])
+
+
+@contextmanager
+def replica_reads(session):
+    """Allow the queries run inside the block to be served by the replica"""
+    previous = session.info.get('use_replica', False)
+    session.info['use_replica'] = True
+    try:
+        yield
+    finally:
+        session.info['use_replica'] = previous
@@ -0,0 +1,515 @@
+"""Horizontal sharding of places and their reviews by geohash prefix.
+
+When SHARD_BINDS lists bind keys, every place is stored on the shard owning
+the first SHARD_GEOHASH_PRECISION characters of its geohash, together with
+its reviews and amenity links. Users, amenities and the shard map stay on
+the global database; amenities are also copied to every shard so the
+amenities of a place can be joined without leaving its shard.
+
+Prefixes are spread over the shards by a stable hash unless the shard map
+pins them elsewhere. Lookups by id and list queries fan out to every shard
+and merge the results, so rows stay reachable while a prefix is moving.
+
+    python -m app.persistence.sharding init        create shard schemas
+    python -m app.persistence.sharding rebalance   even out the shards
+"""
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import Column, ForeignKey, Index, MetaData, Table, delete, func, insert, inspect, select, update
+
+from app.geohash import encode_geohash
+from app.models.shard_assignment import ShardAssignment
+from app.models.table_version import TableVersion
+
+# Tables partitioned across the shards and tables copied to every shard
+SHARDED_TABLES = ('places', 'reviews', 'place_amenity')
+REFERENCE_TABLES = ('amenities',)
+
+
+def identity_token(state):
+    """Shard an object was loaded from or assigned to, if any"""
+    if state.key is not None:
+        return state.key[2]
+    return state.identity_token
+
+
+def get_shard_router():
+    """The router of the current application, None when sharding is off"""
+    return current_app.extensions.get('shard_router')
+
+
+class ShardRouter:
+    """Maps geohash prefixes to shard bind keys and routes ORM statements."""
+
+    def __init__(self, db, shard_ids, precision=2, refresh_interval=5.0):
+        if not shard_ids:
+            raise ValueError("at least one shard bind is required")
+        self.db = db
+        self.shard_ids = tuple(shard_ids)
+        self.precision = precision
+        self.refresh_interval = refresh_interval
+        self._overrides = {}
+        self._overrides_version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    # ─── PLACEMENT ────────────────────────────────────────────
+
+    def engine(self, shard_id):
+        return self.db.engines[shard_id]
+
+    def prefix(self, geohash):
+        return geohash[:self.precision]
+
+    def default_shard(self, prefix):
+        return self.shard_ids[zlib.crc32(prefix.encode('ascii')) % len(self.shard_ids)]
+
+    def shard_for_prefix(self, prefix):
+        self._refresh_overrides()
+        return self._overrides.get(prefix) or self.default_shard(prefix)
+
+    def shard_for_location(self, latitude, longitude):
+        return self.shard_for_prefix(self.prefix(encode_geohash(latitude, longitude)))
+
+    def reload(self):
+        """Force the shard map to be read again on the next lookup"""
+        with self._lock:
+            self._checked_at = None
+
+    def _refresh_overrides(self):
+        """Reload the shard map when its table version moved.
+
+        The version is checked at most every ``refresh_interval`` seconds,
+        on a connection of its own so routing never recurses into the
+        session asking for it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+                return
+            self._checked_at = now
+        with self.engine(None).connect() as connection:
+            version = connection.execute(
+                select(TableVersion.version)
+                .where(TableVersion.table_name == ShardAssignment.__tablename__)
+            ).scalar()
+            if version == self._overrides_version:
+                return
+            overrides = dict(connection.execute(
+                select(ShardAssignment.geohash_prefix, ShardAssignment.shard)
+            ).all())
+        with self._lock:
+            self._overrides = {
+                prefix: shard for prefix, shard in overrides.items() if shard in self.shard_ids
+            }
+            self._overrides_version = version
+
+    # ─── SESSION ROUTING ──────────────────────────────────────
+
+    @staticmethod
+    def is_sharded(mapper):
+        return mapper is not None and mapper.local_table.name in SHARDED_TABLES
+
+    @staticmethod
+    def is_reference(mapper):
+        return mapper is not None and mapper.local_table.name in REFERENCE_TABLES
+
+    def shard_for_instance(self, session, instance):
+        """Shard of a place or review, None for globally stored objects.
+
+        Persistent objects stay where they were loaded from; new ones follow
+        their geohash, or their place for reviews.
+        """
+        state = inspect(instance)
+        if not self.is_sharded(state.mapper):
+            return None
+        token = identity_token(state)
+        if token is not None:
+            return token
+
+        if state.mapper.local_table.name == 'places':
+            shard_id = self.shard_for_prefix(self.prefix(instance.geohash))
+        else:
+            place = state.dict.get('place')
+            if place is not None:
+                shard_id = self.shard_for_instance(session, place)
+            else:
+                shard_id = self.locate_place(session, instance.place_id)
+        state.identity_token = shard_id
+        return shard_id
+
+    def locate_place(self, session, place_id):
+        """Shard currently storing a place, looked up without loading it"""
+        from app.models.place import Place
+
+        for shard_id in self.shard_ids:
+            key = (Place, (place_id,), shard_id)
+            if key in session.identity_map:
+                return shard_id
+        for shard_id in self.shard_ids:
+            found = session.connection(bind_arguments={'shard_id': shard_id}).execute(
+                select(Place.__table__.c.id).where(Place.__table__.c.id == place_id)
+            ).first()
+            if found is not None:
+                return shard_id
+        raise ValueError("Place not found")
+
+    def flush_shard(self, session):
+        """Shard receiving the amenity links written by a flush, if any.
+
+        Links are written per relationship rather than per object, so one
+        flush may only change the links of places stored on a single shard.
+        """
+        shards = set()
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            state = inspect(obj)
+            for relationship in state.mapper.relationships:
+                secondary = relationship.secondary
+                if secondary is None or secondary.name not in SHARDED_TABLES:
+                    continue
+                history = state.attrs[relationship.key].history
+                if not (history.has_changes() or obj in session.deleted):
+                    continue
+                for related in (obj, *history.added, *history.deleted):
+                    shards.add(self.shard_for_instance(session, related))
+        shards.discard(None)
+        if len(shards) > 1:
+            raise ValueError("amenity links of places on several shards cannot change together")
+        return shards.pop() if shards else None
+
+    def shards_for_execute(self, orm_context):
+        """Shards an ORM statement must run on, None for the global database"""
+        shard_id = (
+            orm_context.bind_arguments.get('shard_id')
+            or orm_context.execution_options.get('shard_id')
+        )
+        if shard_id is not None:
+            return (shard_id,)
+
+        mapper = orm_context.bind_mapper
+        if not (self.is_sharded(mapper) or self.is_reference(mapper)):
+            return None
+
+        token = None
+        parent = orm_context.lazy_loaded_from
+        if parent is not None:
+            token = identity_token(parent)
+        elif orm_context.is_select and orm_context.load_options._identity_token is not None:
+            token = orm_context.load_options._identity_token
+        if token is not None:
+            return (token,)
+        if self.is_reference(mapper):
+            # Amenities joined to places through place_amenity are read on
+            # every shard, plain amenity queries on the global database
+            if orm_context.is_relationship_load:
+                return self.shard_ids
+            return None
+        return self.shard_ids
+
+    # ─── SCHEMA AND DATA MOVEMENT ─────────────────────────────
+
+    def shard_metadata(self):
+        """Shard copy of the sharded and reference tables and their indexes.
+
+        Foreign keys to tables that only exist on the global database are
+        dropped: they cannot be enforced across databases.
+        """
+        local = SHARDED_TABLES + REFERENCE_TABLES
+        metadata = MetaData()
+        for name in local:
+            table = self.db.metadata.tables[name]
+            columns = []
+            for column in table.columns:
+                foreign_keys = [
+                    ForeignKey(fk.target_fullname, ondelete=fk.ondelete)
+                    for fk in column.foreign_keys
+                    if fk.column.table.name in local
+                ]
+                columns.append(Column(
+                    column.name,
+                    column.type,
+                    *foreign_keys,
+                    primary_key=column.primary_key,
+                    nullable=column.nullable,
+                    index=column.index,
+                    unique=column.unique,
+                ))
+            shard_table = Table(name, metadata, *columns)
+            for index in table.indexes:
+                # Single column indexes come with their column
+                if len(index.columns) > 1:
+                    Index(index.name, *(shard_table.c[column.name] for column in index.columns))
+        return metadata
+
+    def create_all(self):
+        metadata = self.shard_metadata()
+        for shard_id in self.shard_ids:
+            metadata.create_all(self.engine(shard_id))
+
+    def sync_reference_tables(self):
+        """Copy the global reference tables over every shard"""
+        metadata = self.db.metadata
+        with self.engine(None).connect() as source:
+            snapshot = {
+                name: [dict(row) for row in source.execute(select(metadata.tables[name])).mappings()]
+                for name in REFERENCE_TABLES
+            }
+        for shard_id in self.shard_ids:
+            with self.engine(shard_id).begin() as target:
+                for name, rows in snapshot.items():
+                    table = metadata.tables[name]
+                    target.execute(delete(table).where(table.c.id.notin_([row['id'] for row in rows])))
+                    self._replace_rows(target, table, table.c.id, rows)
+
+    def replicate_references(self, session, changed, deleted, tombstoned=None):
+        """Apply a flush's global changes to every shard in the same transaction.
+
+        Amenity rows are copied over their shard replicas. Deleted global
+        rows are removed from the replicas, and the sharded rows pointing at
+        them are deleted explicitly: their foreign keys to the global
+        database were dropped, so the shards cannot cascade on their own.
+        For the same reason rows owned by a tombstoned user are tombstoned
+        too, since shard queries cannot see the user's tombstone.
+        """
+        for mapper, objects in changed.items():
+            table = mapper.local_table
+            rows = [
+                {column.key: getattr(obj, mapper.get_property_by_column(column).key)
+                 for column in table.columns}
+                for obj in objects
+            ]
+            for shard_id in self.shard_ids:
+                connection = session.connection(bind_arguments={'shard_id': shard_id})
+                self._replace_rows(connection, table, table.c.id, rows)
+
+        statements = []
+        for mapper, ids in deleted.items():
+            table = mapper.local_table
+            if table.name in REFERENCE_TABLES:
+                statements.append(delete(table).where(table.c.id.in_(ids)))
+            for name in SHARDED_TABLES:
+                for fk in self.db.metadata.tables[name].foreign_keys:
+                    if fk.column.table is table and fk.ondelete == 'CASCADE':
+                        statements.append(delete(fk.parent.table).where(fk.parent.in_(ids)))
+        now = datetime.utcnow()
+        for mapper, ids in (tombstoned or {}).items():
+            table = mapper.local_table
+            for name in SHARDED_TABLES:
+                sharded = self.db.metadata.tables[name]
+                if 'deleted_at' not in sharded.c:
+                    continue
+                for fk in sharded.foreign_keys:
+                    if fk.column.table is table and fk.ondelete == 'CASCADE':
+                        statements.append(
+                            update(sharded)
+                            .where(fk.parent.in_(ids), sharded.c.deleted_at.is_(None))
+                            .values(deleted_at=now)
+                        )
+        for shard_id in self.shard_ids if statements else ():
+            connection = session.connection(bind_arguments={'shard_id': shard_id})
+            for statement in statements:
+                connection.execute(statement)
+
+    @staticmethod
+    def _replace_rows(connection, table, key_column, rows):
+        if not rows:
+            return
+        connection.execute(delete(table).where(key_column.in_([row[key_column.key] for row in rows])))
+        connection.execute(insert(table), rows)
+
+    def move_places(self, place_ids, source, target):
+        """Move places with their reviews and amenity links between shards.
+
+        Rows are written to the target before being removed from the source,
+        so a failure in between leaves duplicates that reads merge and that a
+        new run overwrites, never missing rows.
+        """
+        if not place_ids or source == target:
+            return 0
+        tables = self.db.metadata.tables
+        places = tables['places']
+        owned = (
+            (places, places.c.id),
+            (tables['reviews'], tables['reviews'].c.place_id),
+            (tables['place_amenity'], tables['place_amenity'].c.place_id),
+        )
+        with self.engine(source).begin() as src:
+            copied = [
+                (table, column, [dict(row) for row in src.execute(
+                    select(table).where(column.in_(place_ids))
+                ).mappings()])
+                for table, column in owned
+            ]
+            with self.engine(target).begin() as dst:
+                for table, column, _ in reversed(copied):
+                    dst.execute(delete(table).where(column.in_(place_ids)))
+                for table, column, rows in copied:
+                    if rows:
+                        dst.execute(insert(table), rows)
+            for table, column, _ in reversed(copied):
+                src.execute(delete(table).where(column.in_(place_ids)))
+        return len(copied[0][2])
+
+    def relocate_place(self, session, place):
+        """Move a place whose coordinates now belong to another shard"""
+        source = identity_token(inspect(place))
+        target = self.shard_for_prefix(self.prefix(place.geohash))
+        if source is None or source == target:
+            return False
+        session.expunge(place)
+        self.move_places([place.id], source, target)
+        return True
+
+    def relocate_review(self, session, review):
+        """Follow a review given a place stored on another shard.
+
+        Its row cannot be updated in place: the UPDATE would run on the
+        shard it was loaded from, where the new place does not exist. The
+        review is deleted there and a copy with the same id and columns is
+        added for the place's shard, both in the pending flush. Returns the
+        object standing for the review from now on.
+        """
+        state = inspect(review)
+        with session.no_autoflush:
+            source = identity_token(state)
+            target = self.shard_for_instance(session, review.place)
+            if source is None or source == target:
+                return review
+            copy = state.manager.new_instance()
+            for prop in state.mapper.column_attrs:
+                setattr(copy, prop.key, getattr(review, prop.key))
+            # Collections holding the review, loaded or with the append
+            # queued by assigning its place, would flush the deleted review
+            # as an UPDATE: the copy takes its place in them
+            for relationship in state.mapper.relationships:
+                related = getattr(review, relationship.key)
+                backref = relationship.back_populates
+                if related is None or not backref:
+                    continue
+                collection = getattr(related, backref)
+                if review in collection:
+                    collection.remove(review)
+                setattr(copy, relationship.key, related)
+        inspect(copy).identity_token = target
+        session.delete(review)
+        session.add(copy)
+        return copy
+
+    def prefix_counts(self):
+        """Number of places per (prefix, shard) currently stored"""
+        places = self.db.metadata.tables['places']
+        prefix = func.substr(places.c.geohash, 1, self.precision)
+        counts = {}
+        for shard_id in self.shard_ids:
+            with self.engine(shard_id).connect() as connection:
+                for value, count in connection.execute(
+                    select(prefix, func.count()).group_by(prefix)
+                ):
+                    counts[(value, shard_id)] = count
+        return counts
+
+    def plan_rebalance(self, counts, tolerance=0.1):
+        """Target shard of every stored prefix.
+
+        Prefixes stay where most of their places are while that shard has
+        room; the rest go, largest first, to the least loaded shard.
+        """
+        sizes = {}
+        current = {}
+        for (prefix, shard_id), count in counts.items():
+            sizes[prefix] = sizes.get(prefix, 0) + count
+            if count > counts.get((prefix, current.get(prefix)), 0):
+                current[prefix] = shard_id
+        capacity = sum(sizes.values()) / len(self.shard_ids) * (1 + tolerance)
+
+        loads = dict.fromkeys(self.shard_ids, 0)
+        plan = {}
+        pending = []
+        for prefix in sorted(sizes, key=sizes.get, reverse=True):
+            shard_id = current[prefix]
+            if shard_id in loads and loads[shard_id] + sizes[prefix] <= capacity:
+                plan[prefix] = shard_id
+                loads[shard_id] += sizes[prefix]
+            else:
+                pending.append(prefix)
+        for prefix in pending:
+            shard_id = min(loads, key=loads.get)
+            plan[prefix] = shard_id
+            loads[shard_id] += sizes[prefix]
+        return plan
+
+    def rebalance(self, tolerance=0.1):
+        """Even out the shards and pin every stored prefix in the shard map.
+
+        Pinning keeps existing prefixes in place when SHARD_BINDS changes
+        the default hash. Returns the number of places moved.
+        """
+        self.sync_reference_tables()
+        counts = self.prefix_counts()
+        plan = self.plan_rebalance(counts, tolerance)
+        places = self.db.metadata.tables['places']
+        moved = 0
+        for (prefix, shard_id), _ in counts.items():
+            target = plan[prefix]
+            if shard_id == target:
+                continue
+            with self.engine(shard_id).connect() as connection:
+                place_ids = list(connection.execute(
+                    select(places.c.id).where(places.c.geohash.startswith(prefix, autoescape=True))
+                ).scalars())
+            moved += self.move_places(place_ids, shard_id, target)
+
+        session = self.db.session
+        pinned = {row.geohash_prefix: row for row in session.query(ShardAssignment)}
+        for prefix, shard_id in plan.items():
+            if prefix in pinned:
+                pinned[prefix].shard = shard_id
+            else:
+                session.add(ShardAssignment(geohash_prefix=prefix, shard=shard_id))
+        session.commit()
+        self.reload()
+        return moved
+
+
+def init_sharding(app):
+    """Install the shard router when SHARD_BINDS is configured"""
+    from app.extensions import db
+
+    shard_ids = app.config.get('SHARD_BINDS')
+    if not shard_ids:
+        return None
+    router = ShardRouter(
+        db,
+        shard_ids,
+        precision=app.config.get('SHARD_GEOHASH_PRECISION', 2),
+        refresh_interval=app.config.get('SHARD_MAP_REFRESH_INTERVAL', 5.0),
+    )
+    app.extensions['shard_router'] = router
+    return router
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3) or sys.argv[1] not in ('init', 'rebalance'):
+        sys.exit('usage: python -m app.persistence.sharding init|rebalance [CONFIG]')
+
+    import config
+    from app import create_app
+
+    config_name = sys.argv[2] if len(sys.argv) == 3 else 'sharded'
+    application = create_app(config.config[config_name])
+    with application.app_context():
+        shard_router = get_shard_router()
+        if shard_router is None:
+            sys.exit('SHARD_BINDS is not configured for {}'.format(config_name))
+        if sys.argv[1] == 'init':
+            application.extensions['sqlalchemy'].create_all()
+            shard_router.create_all()
+            shard_router.sync_reference_tables()
+            print('created {} shard schemas'.format(len(shard_router.shard_ids)))
+        else:
+            print('moved {} places'.format(shard_router.rebalance()))
@@ -0,0 +1,207 @@
+"""Tombstones instead of hard deletes, and the purger that removes them.
+
+Deleting a model only sets its ``deleted_at`` column. Every ORM SELECT on
+the session then hides tombstoned rows and the rows owned by them (the
+reviews of a deleted place, the places of a deleted user...), following
+the ON DELETE CASCADE foreign keys, unless it runs with
+``execution_options(include_deleted=True)``.
+
+``TombstonePurger`` physically removes rows tombstoned for longer than
+PURGE_GRACE_SECONDS in small batches, children before their parents, so
+no statement ever holds the write lock for a whole cascade.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, event, or_, select, tuple_
+from sqlalchemy.orm import with_loader_criteria
+
+from app.extensions import db
+from app.models.base_model import BaseModel
+from app.persistence.routing import RoutingSession
+from app.persistence.sharding import REFERENCE_TABLES, SHARDED_TABLES
+
+
+def _owners(table, tables=None):
+    """(column, parent table) pairs of the cascading foreign keys of a table.
+
+    ``tables`` restricts the parents to tables stored in the same database.
+    """
+    return [
+        (fk.parent, fk.column.table)
+        for fk in table.foreign_keys
+        if fk.ondelete == 'CASCADE' and 'deleted_at' in fk.column.table.c
+        and (tables is None or fk.column.table.name in tables)
+    ]
+
+
+def hidden_ids(table, cutoff=None, tables=None):
+    """SELECT of the ids of a table's rows that are deleted or owned by one.
+
+    With ``cutoff`` only tombstones older than it count, which is what the
+    purger may remove.
+    """
+    deleted = table.c.deleted_at.isnot(None) if cutoff is None else table.c.deleted_at < cutoff
+    return select(table.c.id).where(or_(deleted, *(
+        column.in_(hidden_ids(parent, cutoff, tables))
+        for column, parent in _owners(table, tables)
+    ))).correlate(None)
+
+
+def visible(cls, tables=None):
+    """Criteria keeping the live rows of a model.
+
+    Built from the mapped attributes so that aliases of the model, such as
+    joined eager loads, get adapted criteria.
+    """
+    mapper = cls.__mapper__
+
+    def attribute(column):
+        return getattr(cls, mapper.get_property_by_column(column).key)
+
+    return and_(cls.deleted_at.is_(None), *(
+        attribute(column).notin_(hidden_ids(parent, tables=tables))
+        for column, parent in _owners(mapper.local_table, tables)
+    ))
+
+
+# Shards only hold places, reviews and amenities, so there the criteria
+# stop at those tables: rows owned by a deleted user are tombstoned too
+_SHARD_TABLES = SHARDED_TABLES + REFERENCE_TABLES
+
+_criteria = {}
+
+
+def _visible_on_shard(cls):
+    return visible(cls, _SHARD_TABLES)
+
+
+def _visibility_options(sharded):
+    """One loader criteria option per model, built once the mappers exist"""
+    if sharded not in _criteria:
+        # Separate lambdas, their SQL is cached per code object
+        if sharded:
+            criteria = lambda cls: _visible_on_shard(cls)  # noqa: E731
+        else:
+            criteria = lambda cls: visible(cls)  # noqa: E731
+        _criteria[sharded] = [
+            with_loader_criteria(mapper.class_, criteria, include_aliases=True, track_closure_variables=False)
+            for mapper in db.Model.registry.mappers
+            if issubclass(mapper.class_, BaseModel)
+        ]
+    return _criteria[sharded]
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _hide_deleted(orm_context):
+    if (
+        orm_context.is_select
+        and not orm_context.is_column_load
+        and not orm_context.is_relationship_load
+        and not orm_context.execution_options.get('include_deleted', False)
+    ):
+        sharded = orm_context.session.shard_router is not None
+        orm_context.statement = orm_context.statement.options(*_visibility_options(sharded))
+
+
+class TombstonePurger:
+    """Background thread deleting old tombstones batch by batch"""
+
+    def __init__(self, app, batch_size=500, pause=0.05, grace=3600, interval=60):
+        self.app = app
+        self.batch_size = batch_size
+        self.pause = pause
+        self.grace = grace
+        self.interval = interval
+        self.purged = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _plan(tables):
+        """Purgeable tables of one database, every child before its parents"""
+        return [
+            table for table in reversed(db.metadata.sorted_tables)
+            if table.name in tables and ('deleted_at' in table.c or _owners(table, tables))
+        ]
+
+    def _doomed(self, table, cutoff, tables):
+        """Primary key SELECT of the purgeable rows of a table"""
+        primary_key = list(table.primary_key.columns)
+        if 'deleted_at' in table.c:
+            return hidden_ids(table, cutoff, tables), primary_key
+        # Link tables have no tombstone of their own, only owners
+        return select(*primary_key).where(or_(*(
+            column.in_(hidden_ids(parent, cutoff, tables))
+            for column, parent in _owners(table, tables)
+        ))), primary_key
+
+    def purge_database(self, engine, tables, cutoff, budget):
+        """Purge one database until done or ``budget`` batches were used"""
+        used = 0
+        for table in self._plan(tables):
+            doomed, primary_key = self._doomed(table, cutoff, tables)
+            key = primary_key[0] if len(primary_key) == 1 else tuple_(*primary_key)
+            while True:
+                if used >= budget:
+                    # Parents must wait until all their children are gone
+                    return used, False
+                with engine.begin() as connection:
+                    removed = connection.execute(
+                        delete(table).where(key.in_(doomed.limit(self.batch_size)))
+                    ).rowcount
+                used += 1
+                self.purged += removed
+                if removed < self.batch_size:
+                    break
+                time.sleep(self.pause)
+        return used, True
+
+    def purge(self, budget=100):
+        """Run one purge pass over every database, returns True when all is done"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.grace)
+        router = self.app.extensions.get('shard_router')
+        with self.app.app_context():
+            targets = [(db.engines[None], set(db.metadata.tables))]
+            if router is not None:
+                targets += [(router.engine(shard_id), set(_SHARD_TABLES)) for shard_id in router.shard_ids]
+            done = True
+            for engine, tables in targets:
+                _, finished = self.purge_database(engine, tables, cutoff, budget)
+                done = done and finished
+        return done
+
+    def start(self):
+        if self.interval is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='tombstone-purger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            while not self.purge() and not self._stop.is_set():
+                pass
+
+
+def init_purger(app):
+    """Start the background purger when PURGE_INTERVAL is set"""
+    interval = app.config.get('PURGE_INTERVAL')
+    if interval is None:
+        return None
+    purger = TombstonePurger(
+        app,
+        batch_size=app.config.get('PURGE_BATCH_SIZE', 500),
+        pause=app.config.get('PURGE_BATCH_PAUSE', 0.05),
+        grace=app.config.get('PURGE_GRACE_SECONDS', 3600),
+        interval=interval,
+    )
+    app.extensions['tombstone_purger'] = purger
+    purger.start()
+    return purger
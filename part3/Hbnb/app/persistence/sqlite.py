@@ -0,0 +1,32 @@
+from functools import partial
+
+from sqlalchemy import event
+
+from app.extensions import db
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
+    finally:
+        cursor.close()
+
+
+def init_sqlite(app):
+    """Run the configured SQLITE_PRAGMAS on every new SQLite connection.
+
+    Most pragmas (foreign_keys, synchronous, cache_size, busy_timeout...)
+    only last for the connection that sets them, so they are applied from
+    the pool's connect event rather than once at startup.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', partial(_apply_pragmas, pragmas))
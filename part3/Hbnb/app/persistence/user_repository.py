@@ -1,14 +1,18 @@
 from app.extensions import db
 from app.models.user import User
-from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.repository import SQLAlchemyRepository, read_only
 
 
 class UserRepository(SQLAlchemyRepository):
     def __init__(self):
         super().__init__(User)
 
-    def get_user_by_email(self, email):
-        return self.model.query.filter_by(email=email).first()
+    @read_only
+    def get_user_by_email(self, email, include_deleted=False):
+        """Deleted users keep their email reserved until they are purged"""
+        return self.model.query.execution_options(
+            include_deleted=include_deleted
+        ).filter_by(email=email).first()
 
     def update_user(self, user_id, data):
         user = self.get(user_id)
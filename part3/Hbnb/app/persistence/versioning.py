@@ -0,0 +1,78 @@
+from functools import lru_cache
+
+from sqlalchemy import event, inspect, select, update, insert
+
+from app.extensions import db
+from app.models.table_version import TableVersion
+
+
+def get_table_versions(*table_names):
+    """Return the change counter of each table, 0 for tables never written."""
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(table_names))
+    ).all()
+    versions = dict.fromkeys(table_names, 0)
+    versions.update(rows)
+    return versions
+
+
+@lru_cache(maxsize=None)
+def _cascaded_tables(table_name):
+    """Tables whose rows the database deletes along with rows of table_name"""
+    cascaded = set()
+    pending = [table_name]
+    while pending:
+        parent = pending.pop()
+        for table in db.metadata.tables.values():
+            if table.name not in cascaded and any(
+                fk.ondelete == 'CASCADE' and fk.column.table.name == parent
+                for fk in table.foreign_keys
+            ):
+                cascaded.add(table.name)
+                pending.append(table.name)
+    return frozenset(cascaded)
+
+
+def changed_tables(session):
+    """Tables whose version the flush in progress bumps"""
+    tables = set()
+    for obj in session.new:
+        tables.add(obj.__table__.name)
+    for obj in session.deleted:
+        tables.add(obj.__table__.name)
+        # ON DELETE CASCADE removes child rows the session never sees
+        tables.update(_cascaded_tables(obj.__table__.name))
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tables.add(obj.__table__.name)
+            state = inspect(obj)
+            if 'deleted_at' in state.mapper.attrs and state.attrs.deleted_at.history.added:
+                # A tombstone also hides the rows the object owns
+                tables.update(_cascaded_tables(obj.__table__.name))
+    tables.discard(TableVersion.__tablename__)
+    return tables
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_table_versions(session, flush_context):
+    """Bump the counters in the same transaction as the rows they describe"""
+    tables = changed_tables(session)
+    if not tables:
+        return
+
+    connection = session.connection()
+    connection.execute(
+        update(TableVersion.__table__)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1)
+    )
+    existing = set(connection.execute(
+        select(TableVersion.table_name).where(TableVersion.table_name.in_(tables))
+    ).scalars())
+    missing = tables - existing
+    if missing:
+        connection.execute(
+            insert(TableVersion.__table__),
+            [{'table_name': name, 'version': 1} for name in missing],
+        )
@@ -0,0 +1,223 @@
+"""Shared response shapes and JSON encoding for the HBnB models.
+
+Every model has a fixed set of views (list, detail, embedded, ...). Each
+view is compiled once into an ``operator.attrgetter`` over its plain
+columns plus a handful of nested extractors, so turning thousands of rows
+into dicts costs a C-level attribute fetch and a ``zip`` per row.
+
+Encoding uses orjson when it is installed and falls back to the standard
+library otherwise; both produce compact UTF-8 bytes.
+"""
+import json
+from datetime import date, datetime
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class Nested:
+    """Embed another view of a related object (or list of objects)"""
+
+    def __init__(self, attribute, serializer, many=False):
+        self.attribute = attribute
+        self.serializer = serializer
+        self.many = many
+        self._get = attrgetter(attribute)
+
+    def extract(self, obj):
+        value = self._get(obj)
+        if self.many:
+            return self.serializer.dump_many(value)
+        if value is None:
+            return None
+        return self.serializer.dump(value)
+
+
+class Pluck:
+    """Embed a single attribute of each related object, e.g. their ids"""
+
+    def __init__(self, attribute, field='id'):
+        self.attribute = attribute
+        self.field = field
+        self._get = attrgetter(attribute)
+        self._pluck = attrgetter(field)
+
+    def extract(self, obj):
+        return [self._pluck(item) for item in self._get(obj)]
+
+
+class Serializer:
+    """Precompiled extractor for one view of a model.
+
+    ``fields`` maps output keys to either an attribute name or a
+    ``Nested`` extractor. Plain attributes are emitted first, in order,
+    followed by nested ones.
+    """
+
+    def __init__(self, fields):
+        self.fields = dict(fields)
+        plain = [(key, spec) for key, spec in self.fields.items() if isinstance(spec, str)]
+        self._plain_keys = tuple(key for key, _ in plain)
+        self._nested = tuple(
+            (key, spec) for key, spec in self.fields.items() if not isinstance(spec, str)
+        )
+        attributes = [attribute for _, attribute in plain]
+        if len(attributes) == 1:
+            single = attrgetter(attributes[0])
+            self._values = lambda obj: (single(obj),)
+        elif attributes:
+            self._values = attrgetter(*attributes)
+        else:
+            self._values = lambda obj: ()
+
+    def dump(self, obj):
+        data = dict(zip(self._plain_keys, self._values(obj)))
+        for key, nested in self._nested:
+            data[key] = nested.extract(obj)
+        return data
+
+    def dump_many(self, objs):
+        keys = self._plain_keys
+        values = self._values
+        if not self._nested:
+            return [dict(zip(keys, values(obj))) for obj in objs]
+        return [self.dump(obj) for obj in objs]
+
+
+class SparseViews:
+    """Views of a model restricted to requested fields and includes.
+
+    ``fields`` maps every selectable output key to its attribute and
+    ``includes`` maps relationship names to their nested extractor. Each
+    combination is compiled once and memoised.
+    """
+
+    def __init__(self, fields, includes):
+        self.fields = dict(fields)
+        self.includes = dict(includes)
+        self._views = {}
+
+    def columns(self, fields):
+        """Model attributes backing the given output fields"""
+        return tuple(self.fields[name] for name in fields)
+
+    def view(self, fields, include=()):
+        key = (tuple(fields), tuple(include))
+        view = self._views.get(key)
+        if view is None:
+            spec = {name: self.fields[name] for name in fields}
+            spec.update((name, self.includes[name]) for name in include)
+            view = self._views[key] = Serializer(spec)
+        return view
+
+
+# ─── VIEWS ────────────────────────────────────────────────────
+
+USER = Serializer({
+    'id': 'id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+})
+USER_LIST = USER
+USER_EMBEDDED = USER
+
+AMENITY = Serializer({'id': 'id', 'name': 'name'})
+AMENITY_LIST = AMENITY
+AMENITY_EMBEDDED = AMENITY
+AMENITY_COUNT = Serializer({'id': 'id', 'name': 'name', 'place_count': 'place_count'})
+
+PLACE_LIST = Serializer({
+    'id': 'id',
+    'title': 'title',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+})
+PLACE_EMBEDDED = PLACE_LIST
+PLACE_CREATED = Serializer({
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'price': 'price',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'owner_id': 'user_id',
+    'amenities': Pluck('amenities'),
+})
+
+PLACE_TOP = Serializer({
+    'id': 'id',
+    'title': 'title',
+    'price': 'price',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'review_count': 'review_count',
+    'rating_average': 'rating_average',
+    'popularity': 'popularity',
+})
+PLACE_TOP_COLUMNS = ('title', 'price', 'latitude', 'longitude', 'review_count', 'rating_sum', 'popularity')
+
+# Reviews expose the foreign key columns so no relationship is loaded
+REVIEW = Serializer({
+    'id': 'id',
+    'text': 'text',
+    'rating': 'rating',
+    'user_id': 'user_id',
+    'place_id': 'place_id',
+})
+REVIEW_LIST = REVIEW
+REVIEW_EMBEDDED = REVIEW
+
+# Sparse fieldsets (?fields=) and relationship expansion (?include=)
+PLACE_VIEWS = SparseViews(
+    fields={
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'price': 'price',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'owner_id': 'user_id',
+    },
+    includes={
+        'owner': Nested('owner', USER_EMBEDDED),
+        'amenities': Nested('amenities', AMENITY_EMBEDDED, many=True),
+        'reviews': Nested('reviews', REVIEW_EMBEDDED, many=True),
+    },
+)
+PLACE_LIST_FIELDS = ('id', 'title', 'latitude', 'longitude')
+PLACE_DETAIL_FIELDS = ('id', 'title', 'description', 'price', 'latitude', 'longitude')
+PLACE_DETAIL_INCLUDE = ('owner', 'amenities')
+PLACE_DETAIL = PLACE_VIEWS.view(PLACE_DETAIL_FIELDS, PLACE_DETAIL_INCLUDE)
+
+REVIEW_VIEWS = SparseViews(
+    fields=REVIEW.fields,
+    includes={
+        'user': Nested('user', USER_EMBEDDED),
+        'place': Nested('place', PLACE_EMBEDDED),
+    },
+)
+REVIEW_FIELDS = tuple(REVIEW.fields)
+
+
+# ─── ENCODING ─────────────────────────────────────────────────
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+if orjson is not None:
+    def dumps(payload):
+        """Encode a payload to compact JSON bytes ending with a newline"""
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_default)
+
+    def dumps(payload):
+        """Encode a payload to compact JSON bytes ending with a newline"""
+        return (_encoder.encode(payload) + '\n').encode('utf-8')
@@ -0,0 +1,96 @@
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.extensions import db
+from app.models.amenity import Amenity
+from app.persistence.versioning import get_table_versions
+
+CatalogAmenity = namedtuple('CatalogAmenity', ('id', 'name', 'updated_at'))
+AmenityUsage = namedtuple('AmenityUsage', ('id', 'name', 'place_count'))
+
+_Snapshot = namedtuple('_Snapshot', ('version', 'checked_at', 'amenities', 'by_id'))
+
+
+class AmenityCatalog:
+    """Every amenity of the database, held in memory by each worker.
+
+    The copy is stamped with the amenities table version. Lookups compare
+    it with the database at most every AMENITY_CATALOG_CHECK_INTERVAL
+    seconds and run no query in between; writes made through this worker
+    invalidate it at once. A lookup that misses forces a check, so an
+    amenity just created by another worker is never reported missing.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('AMENITY_CATALOG_CHECK_INTERVAL', self.check_interval)
+
+    def _snapshot(self, force=False):
+        extensions = current_app.extensions
+        snapshot = extensions.get('amenity_catalog')
+        now = time.monotonic()
+        if snapshot is not None and not force and now - snapshot.checked_at < self.check_interval:
+            return snapshot
+
+        version = get_table_versions(Amenity.__tablename__)[Amenity.__tablename__]
+        if snapshot is not None and snapshot.version == version:
+            snapshot = snapshot._replace(checked_at=now)
+        else:
+            amenities = tuple(CatalogAmenity(*row) for row in db.session.query(
+                Amenity.id, Amenity.name, Amenity.updated_at
+            ))
+            snapshot = _Snapshot(version, now, amenities, {amenity.id: amenity for amenity in amenities})
+        # Snapshots are immutable, replacing one is safe across threads
+        extensions['amenity_catalog'] = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """Compare with the database on the next lookup"""
+        snapshot = current_app.extensions.get('amenity_catalog')
+        if snapshot is not None:
+            current_app.extensions['amenity_catalog'] = snapshot._replace(checked_at=float('-inf'))
+
+    def version(self):
+        return self._snapshot().version
+
+    def all(self):
+        return list(self._snapshot().amenities)
+
+    def get(self, amenity_id):
+        amenity = self._snapshot().by_id.get(amenity_id)
+        if amenity is None:
+            amenity = self._snapshot(force=True).by_id.get(amenity_id)
+        return amenity
+
+    def get_many(self, amenity_ids):
+        """Amenities in the order of ``amenity_ids``, and the ids not found"""
+        by_id = self._snapshot().by_id
+        if any(amenity_id not in by_id for amenity_id in amenity_ids):
+            by_id = self._snapshot(force=True).by_id
+        return [by_id[amenity_id] for amenity_id in amenity_ids if amenity_id in by_id], [
+            amenity_id for amenity_id in amenity_ids if amenity_id not in by_id
+        ]
+
+    def attach(self, amenity_ids):
+        """Session-bound Amenity instances for ``amenity_ids``, without a query.
+
+        Raises ValueError when one of them does not exist.
+        """
+        amenities, missing = self.get_many(amenity_ids)
+        if missing:
+            raise ValueError('Amenity not found')
+        return [self._attach(amenity) for amenity in amenities]
+
+    @staticmethod
+    def _attach(entry):
+        amenity = Amenity(entry.name)
+        amenity.id = entry.id
+        amenity.updated_at = entry.updated_at
+        # Mark it as loaded from the database so the session will not insert it
+        make_transient_to_detached(amenity)
+        return db.session.merge(amenity, load=False)
@@ -0,0 +1,100 @@
+import itertools
+import threading
+from collections import deque
+
+
+class Subscription:
+    """A single stream connection with its own bounded event buffer."""
+
+    def __init__(self, bus, owner_id, buffer_size):
+        self.bus = bus
+        self.owner_id = owner_id
+        self.buffer_size = buffer_size
+        self.dropped = 0
+        self._events = deque()
+        self._ready = threading.Condition()
+        self._closed = False
+
+    def push(self, event):
+        """Queue an event without ever blocking the publisher.
+
+        When the consumer lags behind and the buffer is full, the oldest
+        event is discarded and counted so the stream can tell the client
+        to resynchronise instead of slowing down the write path.
+        """
+        with self._ready:
+            if self._closed:
+                return
+            if len(self._events) >= self.buffer_size:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """Wait for the next event, returning None when the timeout expires."""
+        with self._ready:
+            if not self._events and not self._closed:
+                self._ready.wait(timeout)
+            if self._events:
+                return self._events.popleft()
+            return None
+
+    def take_dropped(self):
+        """Return and reset the number of events lost since the last call."""
+        with self._ready:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._events.clear()
+            self._ready.notify_all()
+        self.bus.unsubscribe(self)
+
+
+class ReviewEventBus:
+    """In-process pub/sub fanning review events out to place owners."""
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, owner_id, buffer_size=None):
+        subscription = Subscription(self, owner_id, buffer_size or self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(owner_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.owner_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.owner_id]
+
+    def subscriber_count(self, owner_id=None):
+        with self._lock:
+            if owner_id is not None:
+                return len(self._subscribers.get(owner_id, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, owner_id, event_type, data):
+        """Deliver an event to every stream opened by the place owner."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(owner_id, ()))
+            if not subscriptions:
+                return None
+            event = {'id': next(self._ids), 'type': event_type, 'data': data}
+        for subscription in subscriptions:
+            subscription.push(event)
+        return event
@@ -6,6 +6,14 @@ from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.place import Place
 from app.models.review import Review
+from app.services.amenity_catalog import AmenityCatalog, AmenityUsage
+from app.services.events import ReviewEventBus
+from app.services.owner_dashboards import OwnerDashboards
+from app.services.place_stats import PlaceStats
+from app.services.popularity import PlacePopularity
+from app.services.response_cache import ResponseCache
+from app.services.single_flight import SingleFlight
+from app.serializers import REVIEW
 
 class HBnBFacade:
     def __init__(self):
@@ -13,6 +21,13 @@ class HBnBFacade:
         self.place_repo = PlaceRepository()
         self.review_repo = ReviewRepository()
         self.amenity_repo = AmenityRepository()
+        self.review_events = ReviewEventBus()
+        self.response_cache = ResponseCache()
+        self.single_flight = SingleFlight()
+        self.amenity_catalog = AmenityCatalog()
+        self.place_stats = PlaceStats(self.place_repo)
+        self.popularity = PlacePopularity(self.place_repo, self.review_repo)
+        self.owner_dashboards = OwnerDashboards(self.place_repo, self.response_cache)
 
     # ─── USER METHODS ─────────────────────────────────────────
 
@@ -24,30 +39,135 @@ class HBnBFacade:
     def get_user(self, user_id):
         return self.user_repo.get(user_id)
 
-    def get_user_by_email(self, email):
-        return self.user_repo.get_user_by_email(email)
+    def get_user_by_email(self, email, include_deleted=False):
+        return self.user_repo.get_user_by_email(email, include_deleted)
+
+    def get_users(self, user_ids):
+        """Users in the order of ``user_ids``, and the ids not found"""
+        return self.user_repo.get_many(user_ids)
 
     def get_all_users(self):
         return self.user_repo.get_all()
 
     def update_user(self, user_id, user_data):
-        return self.user_repo.update_user(user_id, user_data)
+        user = self.user_repo.update_user(user_id, user_data)
+        if user:
+            self.response_cache.invalidate(('user', user_id))
+        return user
+
+    def delete_user(self, user_id):
+        # The user's reviews disappear with them
+        self.popularity.refresh_on_commit(self.review_repo.get_reviewed_place_ids_of_user(user_id))
+        deleted = self.user_repo.delete(user_id)
+        if deleted:
+            self.response_cache.invalidate(('user', user_id))
+        return deleted
+
+    def get_owner_dashboard(self, owner_id):
+        """Review count, average rating and latest review of each place of an owner, and overall"""
+        places = []
+        reviews = rating_sum = 0
+        latest = None
+        for place_id, title, _, count, total, latest_at in self.place_repo.get_owner_dashboard_rows(owner_id):
+            places.append({
+                'id': place_id,
+                'title': title,
+                'review_count': count,
+                'average_rating': total / count if count else None,
+                'latest_review_at': latest_at,
+            })
+            reviews += count
+            rating_sum += total or 0
+            if latest_at is not None and (latest is None or latest_at > latest):
+                latest = latest_at
+        return {
+            'owner_id': owner_id,
+            'places': places,
+            'totals': {
+                'places': len(places),
+                'reviews': reviews,
+                'average_rating': rating_sum / reviews if reviews else None,
+                'latest_review_at': latest,
+            },
+        }
+
+    def get_user_version(self, user_id):
+        return self.user_repo.get_updated_at(user_id)
+
+    def get_users_version(self):
+        return self.user_repo.get_table_version()
 
     # ─── AMENITY METHODS ──────────────────────────────────────
 
     def create_amenity(self, amenity_data):
         amenity = Amenity(**amenity_data)
         self.amenity_repo.add(amenity)
+        self.amenity_catalog.invalidate()
+        self.response_cache.invalidate(('amenities',))
         return amenity
 
+    def create_amenities(self, items):
+        """Create many amenities in one transaction.
+
+        Returns one entry per item, the new amenity or the ValueError that
+        rejected it; valid items are created even when others are not.
+        """
+        results = []
+        for item in items:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Invalid input data')
+                results.append(Amenity(item.get('name')))
+            except ValueError as err:
+                results.append(err)
+        amenities = [result for result in results if isinstance(result, Amenity)]
+        if amenities:
+            self.amenity_repo.add_all(amenities)
+            self.amenity_catalog.invalidate()
+            self.response_cache.invalidate(('amenities',))
+        return results
+
+    # Reads are served by the in-memory catalog and run no query
+
     def get_amenity(self, amenity_id):
-        return self.amenity_repo.get(amenity_id)
+        return self.amenity_catalog.get(amenity_id)
+
+    def get_amenities(self, amenity_ids):
+        """Amenities in the order of ``amenity_ids``, and the ids not found"""
+        return self.amenity_catalog.get_many(amenity_ids)
 
     def get_all_amenities(self):
-        return self.amenity_repo.get_all()
+        return self.amenity_catalog.all()
 
     def update_amenity(self, amenity_id, amenity_data):
-        return self.amenity_repo.update_amenity(amenity_id, amenity_data)
+        amenity = self.amenity_repo.update_amenity(amenity_id, amenity_data)
+        if amenity:
+            self.amenity_catalog.invalidate()
+            self.response_cache.invalidate(('amenity', amenity_id), ('amenities',))
+        return amenity
+
+    def get_amenity_version(self, amenity_id):
+        amenity = self.amenity_catalog.get(amenity_id)
+        return amenity.updated_at if amenity else None
+
+    def get_amenities_version(self):
+        return self.amenity_catalog.version()
+
+    def get_amenity_counts(self, bbox=None):
+        """Every amenity with the number of live places offering it, inside ``bbox`` if given"""
+        if bbox is None:
+            counts = self.amenity_repo.get_place_counts()
+        else:
+            self._check_bbox(bbox)
+            counts = self.place_repo.get_amenity_counts(bbox)
+        return [
+            AmenityUsage(amenity.id, amenity.name, counts.get(amenity.id, 0))
+            for amenity in self.amenity_catalog.all()
+        ]
+
+    def get_amenity_counts_version(self):
+        """Versions of everything the counts depend on: amenities, places and their owners"""
+        return self.amenity_repo.get_table_versions('places', 'users')
 
     # ─── PLACE METHODS ────────────────────────────────────────
 
@@ -57,13 +177,7 @@ class HBnBFacade:
         if not owner:
             raise ValueError('Owner not found')
 
-        amenity_ids = place_data.get('amenities', [])
-        amenities = []
-        for amenity_id in amenity_ids:
-            amenity = self.get_amenity(amenity_id)
-            if not amenity:
-                raise ValueError('Amenity not found')
-            amenities.append(amenity)
+        amenities = self.amenity_catalog.attach(place_data.get('amenities', []))
 
         place_payload = {
             'title': place_data.get('title'),
@@ -79,11 +193,92 @@ class HBnBFacade:
         self.place_repo.add(place)
         return place
 
-    def get_place(self, place_id):
-        return self.place_repo.get(place_id)
+    def create_places(self, items, owner_id):
+        """Create many places of one owner in one transaction.
 
-    def get_all_places(self):
-        return self.place_repo.get_all()
+        The owner is resolved with one query, amenities by the in-memory
+        catalog. Returns one entry per item, the new place or the ValueError
+        that rejected it.
+        """
+        owner = self.get_user(owner_id)
+        amenity_ids = {
+            amenity_id
+            for item in items if isinstance(item, dict) and isinstance(item.get('amenities'), list)
+            for amenity_id in item['amenities'] if isinstance(amenity_id, str)
+        }
+        known_amenities = {amenity.id for amenity in self.amenity_catalog.get_many(amenity_ids)[0]}
+
+        results = []
+        places = []
+        place_amenities = []
+        for item in items:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Invalid input data')
+                if not owner:
+                    raise ValueError('Owner not found')
+                ids = item.get('amenities') or []
+                if not isinstance(ids, list):
+                    raise ValueError('amenities must be a list of amenity IDs')
+                if any(amenity_id not in known_amenities for amenity_id in ids):
+                    raise ValueError('Amenity not found')
+                place = Place(
+                    title=item.get('title'),
+                    description=item.get('description', ''),
+                    price=item.get('price'),
+                    latitude=item.get('latitude'),
+                    longitude=item.get('longitude'),
+                    user_id=owner.id,
+                )
+            except ValueError as err:
+                results.append(err)
+                continue
+            results.append(place)
+            places.append(place)
+            place_amenities.append(self.amenity_catalog.attach(dict.fromkeys(ids)))
+        if places:
+            self.place_repo.add_places(places, place_amenities)
+        return results
+
+    def get_place(self, place_id, columns=None, include=None):
+        """Get a place, optionally projected to columns with included relations"""
+        if columns is None and include is None:
+            return self.place_repo.get(place_id)
+        return self.place_repo.get_place(place_id, columns, include or ())
+
+    def get_places(self, place_ids, columns=None, include=()):
+        """Places in the order of ``place_ids``, and the ids not found"""
+        return self.place_repo.get_places(place_ids, columns, include)
+
+    def get_all_places(self, columns=None, include=()):
+        return self.place_repo.get_all_places(columns, include)
+
+    def search_places(self, sort='created_at', limit=20, cursor=None, min_price=None, max_price=None,
+                      columns=None, include=()):
+        """One page of live places in ``sort`` order, after the (sort key, id) ``cursor``.
+
+        Returns the places and the key to resume after, None on the last page.
+        """
+        if sort not in self.place_repo.SORTS:
+            raise ValueError('sort must be one of: {}'.format(', '.join(self.place_repo.SORTS)))
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError('min_price must not exceed max_price')
+        # One extra place tells whether another page follows
+        places = self.place_repo.get_place_page(sort, limit + 1, cursor, min_price, max_price, columns, include)
+        if len(places) <= limit:
+            return places, None
+        last = places[limit - 1]
+        return places[:limit], (getattr(last, self.place_repo.SORTS[sort][0]), last.id)
+
+    def get_place_version(self, place_id, include=()):
+        """Version of the place detail view, including owner and amenities"""
+        version = self.place_repo.get_detail_version(place_id)
+        if version is None or 'reviews' not in include:
+            return version
+        return tuple(version) + self.review_repo.get_table_versions()
+
+    def get_places_version(self, include=()):
+        return self.place_repo.get_list_version(include)
 
     def update_place(self, place_id, place_data):
         place = self.get_place(place_id)
@@ -97,14 +292,7 @@ class HBnBFacade:
             place.owner = owner
 
         if 'amenities' in place_data:
-            amenity_ids = place_data['amenities']
-            updated_amenities = []
-            for amenity_id in amenity_ids:
-                amenity = self.get_amenity(amenity_id)
-                if not amenity:
-                    raise ValueError('Amenity not found')
-                updated_amenities.append(amenity)
-            place.amenities = updated_amenities
+            place.amenities = self.amenity_catalog.attach(place_data['amenities'])
 
         updatable_fields = ['title', 'description', 'price', 'latitude', 'longitude', 'owner_id']
         data_to_update = {
@@ -114,13 +302,34 @@ class HBnBFacade:
 
         if not updated_place:
             return None
+        self.response_cache.invalidate(('place', place_id))
         return updated_place
 
     def delete_place(self, place_id):
         place = self.place_repo.get(place_id)
         if not place:
             return False
-        return self.place_repo.delete(place_id)
+        deleted = self.place_repo.delete(place_id)
+        self.response_cache.invalidate(('place', place_id))
+        return deleted
+
+    def get_place_stats(self, metric='price', group_by=None, precision=4, bins=10, limit=100):
+        """Aggregates over every place, computed from in-memory columns"""
+        return self.place_stats.report(metric, group_by, precision, bins, limit)
+
+    def get_top_places(self, k=10, bbox=None, columns=None):
+        """The ``k`` most popular reviewed places, within ``bbox`` if given"""
+        if bbox is not None:
+            self._check_bbox(bbox)
+        return self.place_repo.get_top_places(k, bbox, columns)
+
+    @staticmethod
+    def _check_bbox(bbox):
+        west, south, east, north = bbox
+        if not (-180.0 <= west <= 180.0 and -180.0 <= east <= 180.0):
+            raise ValueError('bbox longitudes must be between -180 and 180')
+        if not -90.0 <= south <= north <= 90.0:
+            raise ValueError('bbox latitudes must be between -90 and 90, south first')
 
     # ─── REVIEW METHODS ───────────────────────────────────────
 
@@ -136,6 +345,7 @@ class HBnBFacade:
         if not place:
             raise ValueError('Place not found')
 
+        self.review_repo.purge_deleted_reviews(user.id, [place.id])
         review_payload = {
             'text': review_data.get('text'),
             'rating': review_data.get('rating'),
@@ -143,25 +353,90 @@ class HBnBFacade:
             'user': user,
         }
         review = Review(**review_payload)
+        self.popularity.refresh_on_commit([place.id])
         self.review_repo.add(review)
+        self._publish_review_event('review_created', review)
         return review
 
-    def get_review(self, review_id):
-        return self.review_repo.get(review_id)
+    def create_reviews(self, items, user_id, is_admin=False):
+        """Create many reviews by one user in one transaction.
 
-    def get_all_reviews(self):
-        return self.review_repo.get_all()
+        Places and the user's existing reviews of them are looked up with
+        one query each. Returns one entry per item, the new review or the
+        ValueError that rejected it.
+        """
+        user = self.get_user(user_id)
+        place_ids = {
+            item['place_id'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('place_id'), str)
+        }
+        places = self.place_repo.get_by_ids(place_ids, self.place_repo.load_options(()))
+        reviewed = self.review_repo.get_reviewed_place_ids(user_id, places)
+        self.review_repo.purge_deleted_reviews(user_id, places)
+
+        results = []
+        reviews = []
+        for item in items:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Invalid input data')
+                if not user:
+                    raise ValueError('User not found')
+                place = places.get(item.get('place_id'))
+                if not place:
+                    raise ValueError('Place not found')
+                if not is_admin and place.user_id == user.id:
+                    raise ValueError('You cannot review your own place.')
+                if place.id in reviewed:
+                    raise ValueError('You have already reviewed this place.')
+                review = Review(item.get('text'), item.get('rating'), place=place, user_id=user.id)
+            except ValueError as err:
+                results.append(err)
+                continue
+            reviewed.add(place.id)
+            results.append(review)
+            reviews.append(review)
+        if reviews:
+            self.popularity.refresh_on_commit(review.place.id for review in reviews)
+            self.review_repo.add_all(reviews)
+            for review in reviews:
+                self._publish_review_event('review_created', review, review.place)
+        return results
+
+    def get_review(self, review_id, columns=None, include=None):
+        """Get a review, optionally projected to columns with included relations"""
+        if columns is None and include is None:
+            return self.review_repo.get(review_id)
+        return self.review_repo.get_review(review_id, columns, include or ())
+
+    def get_all_reviews(self, columns=None, include=()):
+        return self.review_repo.get_all_reviews(columns, include)
+
+    def get_review_version(self, review_id, include=()):
+        updated_at = self.review_repo.get_updated_at(review_id)
+        if updated_at is None or not include:
+            return updated_at
+        return (updated_at,) + self.review_repo.get_list_version(include)
+
+    def get_reviews_version(self, include=()):
+        return self.review_repo.get_list_version(include)
+
+    def get_place_reviews_version(self, place_id, include=()):
+        """Version of a place's review list, None if the place does not exist"""
+        if not self.place_repo.exists(place_id):
+            return None
+        return self.review_repo.get_list_version(include)
 
-    def get_reviews_by_place(self, place_id):
-        place = self.get_place(place_id)
-        if not place:
+    def get_reviews_by_place(self, place_id, columns=None, include=()):
+        if not self.place_repo.exists(place_id):
             return None
-        return place.reviews
+        return self.review_repo.get_reviews_by_place(place_id, columns, include)
 
     def update_review(self, review_id, review_data):
         review = self.get_review(review_id)
         if not review:
             return None
+        previous_place = review.place
 
         if 'user_id' in review_data:
             user = self.get_user(review_data['user_id'])
@@ -180,10 +455,42 @@ class HBnBFacade:
             key: value for key, value in review_data.items() if key in updatable_fields
         }
 
+        self.popularity.refresh_on_commit([previous_place.id, review.place.id])
         updated_review = self.review_repo.update_review(review_id, data_to_update)
         if not updated_review:
             return None
+
+        if updated_review.place is not previous_place:
+            self._publish_review_event('review_deleted', updated_review, previous_place)
+        self._publish_review_event('review_updated', updated_review)
         return updated_review
 
     def delete_review(self, review_id):
-        return self.review_repo.delete(review_id)
+        review = self.get_review(review_id)
+        if not review:
+            return False
+
+        owner_id = review.place.user_id
+        place_id = review.place_id
+        payload = self._review_event_payload(review)
+        self.popularity.refresh_on_commit([place_id])
+        deleted = self.review_repo.delete(review_id)
+        if deleted:
+            self.review_events.publish(owner_id, 'review_deleted', payload)
+        return deleted
+
+    # ─── REVIEW EVENTS ────────────────────────────────────────
+
+    @staticmethod
+    def _review_event_payload(review, place=None):
+        payload = REVIEW.dump(review)
+        if place is not None:
+            payload['place_id'] = place.id
+        return payload
+
+    def _publish_review_event(self, event_type, review, place=None):
+        """Notify the owner of the review's place about a review change"""
+        place = place or review.place
+        self.review_events.publish(
+            place.user_id, event_type, self._review_event_payload(review, place)
+        )
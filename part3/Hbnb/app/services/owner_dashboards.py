@@ -0,0 +1,79 @@
+"""Cache of encoded owner dashboards, dropped when the owner's data changes.
+
+Each dashboard is cached in the response cache under its owner until a
+commit touches one of the owner's places or the reviews of one (see
+``app.services.place_changes``); only that owner's entry is dropped.
+Changes this worker cannot attribute to owners, such as writes from
+another worker seen as unexpected table versions or a deleted user whose
+reviews disappear, drop every dashboard.
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app.persistence.versioning import get_table_versions
+from app.services.place_changes import expected_versions, subscribe
+
+TABLES = ('places', 'reviews', 'users')
+ALL_DASHBOARDS = ('dashboards',)
+
+
+class _State:
+    def __init__(self, changes):
+        self.changes = changes
+        self.lock = threading.Lock()
+        self.versions = None
+        self.checked_at = 0.0
+        self.generation = 0
+
+
+class OwnerDashboards:
+    def __init__(self, place_repo, response_cache, check_interval=1.0):
+        self.place_repo = place_repo
+        self.response_cache = response_cache
+        self.check_interval = check_interval
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('OWNER_DASHBOARD_CHECK_INTERVAL', self.check_interval)
+        app.extensions['owner_dashboards'] = _State(subscribe(app))
+
+    @staticmethod
+    def key(owner_id):
+        return ('dashboard', owner_id)
+
+    def check(self):
+        """Drop the dashboards changed since the last check; returns a generation for ``store``"""
+        state = current_app.extensions['owner_dashboards']
+        now = time.monotonic()
+        if (state.versions is not None and now - state.checked_at < self.check_interval
+                and not state.changes.pending()):
+            return state.generation
+
+        with state.lock:
+            place_ids, owner_ids, bumps, unknown = state.changes.take()
+            versions = get_table_versions(*TABLES)
+            if state.versions is None or unknown or versions != expected_versions(state.versions, bumps):
+                self.response_cache.invalidate(ALL_DASHBOARDS)
+                state.generation += 1
+            elif place_ids or owner_ids:
+                owner_ids |= self.place_repo.get_owner_ids(place_ids)
+                self.response_cache.invalidate(*(self.key(owner_id) for owner_id in owner_ids))
+                state.generation += 1
+            state.versions, state.checked_at = versions, now
+        return state.generation
+
+    def get(self, owner_id):
+        return self.response_cache.get(self.key(owner_id))
+
+    def store(self, owner_id, body, generation):
+        """Cache a dashboard built after ``check`` returned ``generation``.
+
+        Skipped when a change was processed in between: the dashboard may
+        predate it and nothing would drop it again.
+        """
+        state = current_app.extensions['owner_dashboards']
+        with state.lock:
+            if state.generation == generation:
+                key = self.key(owner_id)
+                self.response_cache.set(key, body, [key, ALL_DASHBOARDS])
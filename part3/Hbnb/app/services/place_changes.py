@@ -0,0 +1,124 @@
+"""Places touched by this worker's commits, for in-process views of them.
+
+Views kept in memory (the place statistics columns, the owner dashboard
+cache) are stamped with table versions. Each commit made through this
+worker's session records which places and owners it touched and how many
+version bumps it caused per table. A view that sees the database versions
+move by exactly the bumps it was told about knows nothing else changed
+and only has to refresh those places. Writes from another worker, or
+deletes that hide places and reviews through another object, cannot be
+narrowed down that way: the first show up as unexpected versions, the
+second are flagged ``unknown``.
+"""
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+
+from app.extensions import db
+from app.models.place import Place
+from app.models.review import Review
+from app.persistence.versioning import changed_tables
+
+_TABLES = {Place.__tablename__, Review.__tablename__}
+
+
+class PlaceChanges:
+    """What this worker's commits changed since the subscriber last looked"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.place_ids = set()
+        self.owner_ids = set()
+        self.bumps = {}
+        self.unknown = False
+
+    def take(self):
+        """(place_ids, owner_ids, bumps per table, unknown), emptied"""
+        with self.lock:
+            taken = (self.place_ids, self.owner_ids, self.bumps, self.unknown)
+            self.place_ids, self.owner_ids, self.bumps, self.unknown = set(), set(), {}, False
+        return taken
+
+    def pending(self):
+        return bool(self.place_ids or self.unknown)
+
+
+def subscribe(app):
+    """A new change set of ``app`` that every later commit adds to"""
+    changes = PlaceChanges()
+    app.extensions.setdefault('place_changes', []).append(changes)
+    return changes
+
+
+def expected_versions(versions, bumps):
+    """Table versions after ``bumps`` were applied to ``versions``"""
+    return {table: version + bumps.get(table, 0) for table, version in versions.items()}
+
+
+def _touched(session):
+    place_ids = set()
+    owner_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Place):
+            place_ids.add(obj.id)
+            owner_ids.add(obj.user_id)
+            # A place handed to another owner changes both
+            owner_ids.update(inspect(obj).attrs.user_id.history.deleted)
+        elif isinstance(obj, Review):
+            place_ids.add(obj.place_id)
+            # A review moved to another place changes both
+            place_ids.update(inspect(obj).attrs.place_id.history.deleted)
+    place_ids.discard(None)
+    owner_ids.discard(None)
+    return place_ids, owner_ids
+
+
+def _cascades(session):
+    """Whether the flush hides or deletes places or reviews through another object"""
+    for obj in session.deleted:
+        if not isinstance(obj, (Place, Review)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, (Place, Review)):
+            continue
+        state = inspect(obj)
+        if 'deleted_at' in state.mapper.attrs and state.attrs.deleted_at.history.added:
+            return True
+    return False
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_flush(session, flush_context):
+    tables = changed_tables(session)
+    if not tables:
+        return
+    pending = session.info.setdefault('place_changes', {
+        'place_ids': set(), 'owner_ids': set(), 'bumps': {}, 'unknown': False,
+    })
+    for table in tables:
+        pending['bumps'][table] = pending['bumps'].get(table, 0) + 1
+    place_ids, owner_ids = _touched(session)
+    pending['place_ids'].update(place_ids)
+    pending['owner_ids'].update(owner_ids)
+    if not tables.isdisjoint(_TABLES) and _cascades(session):
+        pending['unknown'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changes(session):
+    pending = session.info.pop('place_changes', None)
+    if pending is None or not has_app_context():
+        return
+    for changes in current_app.extensions.get('place_changes', ()):
+        with changes.lock:
+            changes.place_ids.update(pending['place_ids'])
+            changes.owner_ids.update(pending['owner_ids'])
+            for table, count in pending['bumps'].items():
+                changes.bumps[table] = changes.bumps.get(table, 0) + count
+            changes.unknown = changes.unknown or pending['unknown']
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_changes(session):
+    session.info.pop('place_changes', None)
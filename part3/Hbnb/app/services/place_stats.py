@@ -0,0 +1,277 @@
+"""Columnar in-memory copy of the places table for analytics.
+
+Each worker keeps price, coordinates, owner, geohash and per-star review
+counts of every place as NumPy arrays, so reports such as the average
+price per geohash cell are a handful of vectorized operations instead of
+a walk over millions of ORM objects.
+
+The copy is stamped with the places and reviews table versions. When
+the database versions moved by exactly the bumps of this worker's own
+commits (see ``app.services.place_changes``), only the places they
+touched are re-read and patched in. Any other change, such as a write
+from another worker, triggers a full reload.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from app.models.place import Place
+from app.models.review import Review
+from app.geohash import BASE32
+from app.persistence.versioning import get_table_versions
+from app.services.place_changes import expected_versions, subscribe
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+TABLES = (Place.__tablename__, Review.__tablename__)
+METRICS = ('price', 'rating', 'reviews')
+GROUP_BY = ('geocell', 'owner')
+GEOHASH_LENGTH = 12
+_PATCH_CHUNK = 500
+_STARS = (1, 2, 3, 4, 5)
+
+# Geohashes are kept as integers, five bits per character, so a cell of any
+# precision is a right shift and cells sort in the same order as strings
+_CELL_BITS = 5
+
+_Columns = namedtuple('_Columns', (
+    'version', 'checked_at', 'index', 'owners', 'owner_index',
+    'alive', 'price', 'latitude', 'longitude', 'owner', 'cell', 'stars', 'dead',
+))
+
+
+class PlaceStats:
+    def __init__(self, place_repo, check_interval=1.0, max_groups=1000):
+        self.place_repo = place_repo
+        self.check_interval = check_interval
+        self.max_groups = max_groups
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return np is not None
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('PLACE_STATS_CHECK_INTERVAL', self.check_interval)
+        self.max_groups = app.config.get('PLACE_STATS_MAX_GROUPS', self.max_groups)
+        app.extensions['place_stats_changes'] = subscribe(app)
+
+    # ─── SNAPSHOT ─────────────────────────────────────────────
+
+    def _columns(self):
+        extensions = current_app.extensions
+        columns = extensions.get('place_stats')
+        changes = extensions['place_stats_changes']
+        now = time.monotonic()
+        if (columns is not None and now - columns.checked_at < self.check_interval
+                and not changes.pending()):
+            return columns
+
+        with self._refresh_lock:
+            columns = extensions.get('place_stats')
+            place_ids, _, bumps, unknown = changes.take()
+            version = get_table_versions(*TABLES)
+            if (columns is None or unknown or version != expected_versions(columns.version, bumps)
+                    or columns.dead * 4 > len(columns.alive)):
+                columns = self._load(version, now)
+            elif place_ids:
+                columns = self._patch(columns, place_ids, version, now)
+            else:
+                columns = columns._replace(checked_at=now)
+            # Columns are never modified once published, swapping them is safe
+            extensions['place_stats'] = columns
+        return columns
+
+    @staticmethod
+    def _arrays(rows):
+        count = len(rows)
+        return {
+            'price': np.fromiter((row[1] for row in rows), np.float64, count),
+            'latitude': np.fromiter((row[2] for row in rows), np.float64, count),
+            'longitude': np.fromiter((row[3] for row in rows), np.float64, count),
+            'cell': _encode_cells([row[5] for row in rows]),
+            'stars': np.array([row[6:11] for row in rows], dtype=np.int32).reshape(count, 5),
+        }
+
+    def _load(self, version, now):
+        rows = self.place_repo.get_stats_rows()
+        owners, owner_index = [], {}
+        owner = np.fromiter(
+            (owner_index.setdefault(row[4], len(owner_index)) for row in rows), np.int32, len(rows)
+        )
+        owners.extend(owner_index)
+        return _Columns(
+            version=version, checked_at=now,
+            index={row[0]: i for i, row in enumerate(rows)},
+            owners=owners, owner_index=owner_index,
+            alive=np.ones(len(rows), dtype=bool), owner=owner, dead=0,
+            **self._arrays(rows)
+        )
+
+    def _patch(self, columns, place_ids, version, now):
+        """New columns with the current rows of ``place_ids``"""
+        place_ids = list(place_ids)
+        rows = []
+        for start in range(0, len(place_ids), _PATCH_CHUNK):
+            rows.extend(self.place_repo.get_stats_rows(place_ids[start:start + _PATCH_CHUNK]))
+
+        # Published columns are shared with concurrent reports: what changes
+        # is copied, never modified in place
+        index, owners, owner_index = columns.index, columns.owners, columns.owner_index
+        alive = columns.alive.copy()
+        found = {row[0] for row in rows}
+        gone = [place_id for place_id in place_ids if place_id not in found and place_id in index]
+        updated = [row for row in rows if row[0] in index]
+        added = [row for row in rows if row[0] not in index]
+        if gone or added:
+            index = dict(index)
+        for place_id in gone:
+            alive[index.pop(place_id)] = False
+        dead = columns.dead + len(gone)
+
+        new_owners = list(dict.fromkeys(row[4] for row in rows if row[4] not in owner_index))
+        if new_owners:
+            owner_index = dict(owner_index)
+            owner_index.update((owner_id, len(owners) + i) for i, owner_id in enumerate(new_owners))
+            owners = owners + new_owners
+        arrays = {name: getattr(columns, name) for name in ('price', 'latitude', 'longitude', 'cell', 'stars')}
+        owner = columns.owner
+
+        if updated:
+            positions = np.array([index[row[0]] for row in updated], dtype=np.intp)
+            values = self._arrays(updated)
+            for name in arrays:
+                arrays[name] = arrays[name].copy()
+                arrays[name][positions] = values[name]
+            owner = owner.copy()
+            owner[positions] = [owner_index[row[4]] for row in updated]
+
+        if added:
+            start = len(alive)
+            for offset, row in enumerate(added):
+                index[row[0]] = start + offset
+            values = self._arrays(added)
+            for name in arrays:
+                arrays[name] = np.concatenate([arrays[name], values[name]])
+            owner = np.concatenate([owner, np.array([owner_index[row[4]] for row in added], dtype=np.int32)])
+            alive = np.concatenate([alive, np.ones(len(added), dtype=bool)])
+
+        return columns._replace(
+            version=version, checked_at=now, index=index, owners=owners, owner_index=owner_index,
+            alive=alive, owner=owner, dead=dead, **arrays
+        )
+
+    # ─── REPORTS ──────────────────────────────────────────────
+
+    def report(self, metric='price', group_by=None, precision=4, bins=10, limit=100):
+        """Aggregates of ``metric`` over every place, and per group.
+
+        ``price`` and ``reviews`` (review count) are per-place values;
+        ``rating`` aggregates individual review ratings. Raises ValueError
+        for unknown parameters.
+        """
+        if metric not in METRICS:
+            raise ValueError('metric must be one of: {}'.format(', '.join(METRICS)))
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError('group_by must be one of: {}'.format(', '.join(GROUP_BY)))
+        if not 1 <= precision <= GEOHASH_LENGTH:
+            raise ValueError('precision must be between 1 and {}'.format(GEOHASH_LENGTH))
+        if not 1 <= bins <= 100:
+            raise ValueError('bins must be between 1 and 100')
+        if not 1 <= limit <= self.max_groups:
+            raise ValueError('limit must be between 1 and {}'.format(self.max_groups))
+
+        columns = self._columns()
+        alive = columns.alive
+        stars = columns.stars[alive]
+        result = {'metric': metric, 'places': int(alive.sum())}
+
+        if metric == 'rating':
+            result['total'] = self._rating_summary(stars.sum(axis=0))
+        else:
+            values = columns.price[alive] if metric == 'price' else stars.sum(axis=1).astype(np.float64)
+            result['total'] = self._summary(values)
+            if len(values):
+                counts, edges = np.histogram(values, bins=bins)
+                result['total']['histogram'] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+        if group_by is None:
+            return result
+
+        if group_by == 'geocell':
+            shift = _CELL_BITS * (GEOHASH_LENGTH - precision)
+            keys, inverse = np.unique(columns.cell[alive] >> shift, return_inverse=True)
+            label = lambda i: _decode_cell(int(keys[i]), precision)  # noqa: E731
+            result['precision'] = precision
+        else:
+            codes, inverse = np.unique(columns.owner[alive], return_inverse=True)
+            owners = [columns.owners[code] for code in codes]
+            keys, label = np.array(owners), owners.__getitem__
+        inverse = inverse.reshape(-1)
+        result['group_by'] = group_by
+        result['groups'], result['truncated'] = self._groups(metric, keys, label, inverse, columns, alive, stars, limit)
+        return result
+
+    @staticmethod
+    def _summary(values):
+        if not len(values):
+            return {'count': 0}
+        return {
+            'count': int(len(values)), 'sum': float(values.sum()), 'mean': float(values.mean()),
+            'min': float(values.min()), 'max': float(values.max()),
+        }
+
+    @staticmethod
+    def _rating_summary(star_counts):
+        reviews = int(star_counts.sum())
+        summary = {'count': reviews, 'histogram': {'stars': list(_STARS), 'counts': star_counts.tolist()}}
+        if reviews:
+            present = np.flatnonzero(star_counts)
+            total = int(np.dot(star_counts, _STARS))
+            summary.update(sum=total, mean=total / reviews, min=int(present[0]) + 1, max=int(present[-1]) + 1)
+        return summary
+
+    def _groups(self, metric, keys, label, inverse, columns, alive, stars, limit):
+        size = len(keys)
+        if metric == 'rating':
+            per_group = np.stack([np.bincount(inverse, weights=stars[:, i], minlength=size) for i in range(5)], axis=1)
+            counts = per_group.sum(axis=1)
+            order = [i for i in np.lexsort((keys, -counts)) if counts[i]]
+            groups = [dict(key=label(i), **self._rating_summary(per_group[i].astype(np.int64))) for i in order[:limit]]
+            return groups, len(order) > limit
+
+        values = columns.price[alive] if metric == 'price' else stars.sum(axis=1).astype(np.float64)
+        counts = np.bincount(inverse, minlength=size)
+        sums = np.bincount(inverse, weights=values, minlength=size)
+        # Values sorted by group, so each group's min and max is one reduceat
+        by_group = values[np.argsort(inverse, kind='stable')]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        minimums = np.minimum.reduceat(by_group, starts) if size else by_group
+        maximums = np.maximum.reduceat(by_group, starts) if size else by_group
+        order = np.lexsort((keys, -counts))[:limit]
+        groups = [{
+            'key': label(i), 'count': int(counts[i]), 'sum': float(sums[i]),
+            'mean': float(sums[i] / counts[i]), 'min': float(minimums[i]), 'max': float(maximums[i]),
+        } for i in order]
+        return groups, size > limit
+
+
+def _encode_cells(geohashes):
+    digits = np.zeros(256, dtype=np.int64)
+    digits[np.frombuffer(BASE32.encode(), dtype=np.uint8)] = np.arange(len(BASE32))
+    chars = np.frombuffer(''.join(geohashes).encode(), dtype=np.uint8).reshape(-1, GEOHASH_LENGTH)
+    weights = np.int64(1) << (_CELL_BITS * np.arange(GEOHASH_LENGTH - 1, -1, -1, dtype=np.int64))
+    return digits[chars] @ weights
+
+
+def _decode_cell(cell, precision):
+    chars = []
+    for _ in range(precision):
+        cell, digit = divmod(cell, 1 << _CELL_BITS)
+        chars.append(BASE32[digit])
+    return ''.join(reversed(chars))
@@ -0,0 +1,148 @@
+"""Bayesian popularity of places, precomputed for GET /api/v1/places/top.
+
+A place's score is its mean rating pulled toward a prior mean, as if it
+had ``prior_weight`` extra reviews rating it ``prior_mean``:
+
+    (prior_weight * prior_mean + sum of ratings) / (prior_weight + review count)
+
+so one 5-star review does not outrank a hundred 4-star ones. The facade
+has the score of the places touched by each review write recomputed
+just before the write commits, in the same transaction, and stored in
+the indexed ``places.popularity`` column, which the top-k query walks
+instead of loading every place and review.
+
+With a half-life, each review counts for half as much every
+``half_life_days``, favouring places reviewed recently. Those scores age
+without any write, so a background thread recomputes them every
+``rescore_interval`` seconds.
+"""
+import sys
+import threading
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.extensions import db
+
+_PENDING = 'popularity_refresh'
+
+
+class PlacePopularity:
+    def __init__(self, place_repo, review_repo, prior_mean=3.0, prior_weight=5.0,
+                 half_life_days=None, rescore_interval=3600, batch_size=500):
+        self.place_repo = place_repo
+        self.review_repo = review_repo
+        self.prior_mean = prior_mean
+        self.prior_weight = prior_weight
+        self.half_life_days = half_life_days
+        self.rescore_interval = rescore_interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.prior_mean = app.config.get('POPULARITY_PRIOR_MEAN', self.prior_mean)
+        self.prior_weight = app.config.get('POPULARITY_PRIOR_WEIGHT', self.prior_weight)
+        self.half_life_days = app.config.get('POPULARITY_HALF_LIFE_DAYS', self.half_life_days)
+        self.rescore_interval = app.config.get('POPULARITY_RESCORE_INTERVAL', self.rescore_interval)
+        if self.half_life_days and self.rescore_interval is not None:
+            self.start(app)
+
+    # ─── SCORING ──────────────────────────────────────────────
+
+    def score(self, weight, total):
+        """Score of a place whose reviews weigh ``weight`` and sum to ``total``"""
+        if not weight:
+            return 0.0
+        return (self.prior_weight * self.prior_mean + total) / (self.prior_weight + weight)
+
+    def _scores(self, place_ids):
+        scores = dict.fromkeys(place_ids, (0, 0, 0.0))
+        if not self.half_life_days:
+            for place_id, count, total in self.review_repo.get_ratings(place_ids):
+                scores[place_id] = (count, total, self.score(count, total))
+            return scores
+
+        now = datetime.utcnow()
+        half_life = self.half_life_days * 86400.0
+        totals = {}
+        for place_id, rating, created_at in self.review_repo.get_ratings(place_ids, with_dates=True):
+            weight = 0.5 ** (max((now - created_at).total_seconds(), 0.0) / half_life)
+            count, total, weight_sum, weighted_total = totals.get(place_id, (0, 0, 0.0, 0.0))
+            totals[place_id] = (count + 1, total + rating, weight_sum + weight, weighted_total + weight * rating)
+        for place_id, (count, total, weight_sum, weighted_total) in totals.items():
+            scores[place_id] = (count, total, self.score(weight_sum, weighted_total))
+        return scores
+
+    def refresh(self, place_ids, commit=True):
+        """Recompute and store the totals and score of places from their reviews"""
+        place_ids = {place_id for place_id in place_ids if place_id is not None}
+        if place_ids:
+            self.place_repo.set_popularity(self._scores(place_ids), commit)
+
+    def refresh_on_commit(self, place_ids):
+        """Refresh places when the session next commits, in the same transaction.
+
+        Called before a review write: its commit then stores the review and
+        the scores counting it together, or neither.
+        """
+        _, pending = db.session.info.setdefault(_PENDING, (self, set()))
+        pending.update(place_id for place_id in place_ids if place_id is not None)
+
+    def rescore(self, rated_only=True):
+        """Recompute every reviewed place, or every place, batch by batch; returns how many"""
+        rescored = 0
+        after = None
+        while not self._stop.is_set():
+            place_ids = self.place_repo.get_place_ids(after, self.batch_size, rated_only)
+            if not place_ids:
+                break
+            self.refresh(place_ids)
+            rescored += len(place_ids)
+            after = place_ids[-1]
+        return rescored
+
+    # ─── DECAY ────────────────────────────────────────────────
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(app,), name='popularity-rescorer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, app):
+        while not self._stop.wait(self.rescore_interval):
+            with app.app_context():
+                self.rescore()
+
+
+@event.listens_for(db.session, 'before_commit')
+def _refresh_pending(session):
+    popularity, place_ids = session.info.pop(_PENDING, (None, ()))
+    if place_ids:
+        # Runs ahead of the commit's own flush: the scores must count it
+        session.flush()
+        popularity.refresh(place_ids, commit=False)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+if __name__ == '__main__':
+    # Fills the columns of places stored before they existed
+    import config
+    from app import create_app
+    from app.services import facade
+
+    application = create_app(config.config[sys.argv[1] if len(sys.argv) > 1 else 'development'])
+    with application.app_context():
+        print('rescored {} places'.format(facade.popularity.rescore(rated_only=False)))
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of encoded response bodies with a memory cap.
+
+    Entries are keyed by resource and version so a stale body can never be
+    served, and tagged with the ids their payload depends on so write
+    paths can release them eagerly instead of waiting for eviction.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, body, tags=()):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, tuple(tags))
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry depending on any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
+
+    def _remove(self, key):
+        body, tags = self._entries.pop(key)
+        self._size -= len(body)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -0,0 +1,75 @@
+import threading
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'failed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Concurrent identical reads sharing one in-flight load.
+
+    When a popular resource misses the response cache, every request for
+    it would run the same queries at once. The first caller of a key runs
+    the load, the callers arriving while it runs wait for its result
+    instead. Results cross threads, so loads must return plain data such
+    as encoded bodies, never ORM objects bound to the loading request's
+    session. Keys must include the resource version, so a caller never
+    receives a result older than the version it saw.
+    """
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'coalesced': 0, 'timeouts': 0, 'failures': 0}
+
+    def init_app(self, app):
+        self.timeout = app.config.get('SINGLE_FLIGHT_TIMEOUT', self.timeout)
+
+    def do(self, key, load, timeout=None):
+        """(result of ``load()``, whether it came from another caller's load).
+
+        A caller that waited ``timeout`` seconds (SINGLE_FLIGHT_TIMEOUT by
+        default) for the running load, or whose load failed, runs ``load``
+        itself: a slow or broken load never fails the requests behind it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['loads'] += 1
+        if leader:
+            return self._lead(key, flight, load), False
+
+        shared = flight.done.wait(self.timeout if timeout is None else timeout) and not flight.failed
+        with self._lock:
+            if shared:
+                self._stats['coalesced'] += 1
+            else:
+                self._stats['failures' if flight.failed else 'timeouts'] += 1
+                self._stats['loads'] += 1
+        if shared:
+            return flight.result, True
+        return load(), False
+
+    def _lead(self, key, flight, load):
+        try:
+            flight.result = load()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
@@ -0,0 +1,148 @@
+"""Amenity place counts from the counter table vs walking Amenity.places.
+
+Seeds ``places`` places, each linked to a random handful of ``amenities``
+amenities, then times:
+
+- walk: len(amenity.places) for every amenity, which subquery-loads the
+  places of each one, what the filter UI counts used to cost
+- group: one GROUP BY over every link, without the counters
+- counters: the counts read from amenity_place_counts
+- request: GET /amenities/?with_counts=true, served from the response cache
+- bbox: the same restricted to a city-sized and a country-sized box,
+  counted through the geohash index
+- write: creating a place with 5 amenities, counters included
+
+    python benchmarks/bench_amenity_counts.py [places] [amenities]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, insert  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.geohash import encode_geohash  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.associations import place_amenity  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.persistence.amenity_counts import count_places, recount  # noqa: E402
+from app.services import facade  # noqa: E402
+
+CITY = (2.2, 48.8, 2.5, 48.95)
+COUNTRY = (-5.0, 42.0, 8.0, 51.0)
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(places, amenities):
+    now = datetime.utcnow()
+    rng = random.Random(11)
+    host = User('Host', 'One', 'host@example.com', 'password')
+    db.session.add(host)
+    db.session.commit()
+    amenity_ids = [new_id() for _ in range(amenities)]
+    db.session.execute(insert(Amenity.__table__), [
+        {'id': amenity_id, 'name': 'Amenity {}'.format(i), 'created_at': now, 'updated_at': now}
+        for i, amenity_id in enumerate(amenity_ids)
+    ])
+
+    place_rows, link_rows = [], []
+    for i in range(places):
+        if i % 10 == 0:
+            # A tenth of the places in and around Paris
+            latitude, longitude = rng.gauss(48.86, 0.2), rng.gauss(2.35, 0.3)
+        else:
+            latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        place_id = new_id()
+        place_rows.append({
+            'id': place_id, 'title': 'Place {}'.format(i), 'description': '', 'price': 80.0,
+            'latitude': latitude, 'longitude': longitude, 'user_id': host.id,
+            'geohash': encode_geohash(latitude, longitude), 'created_at': now, 'updated_at': now,
+        })
+        link_rows.extend(
+            {'place_id': place_id, 'amenity_id': amenity_id}
+            for amenity_id in rng.sample(amenity_ids, rng.randint(0, 8))
+        )
+    for rows, table in ((place_rows, Place.__table__), (link_rows, place_amenity)):
+        for start in range(0, len(rows), 10000):
+            db.session.execute(insert(table), rows[start:start + 10000])
+    recount(db.session)
+    db.session.commit()
+    return host.id, amenity_ids, len(link_rows)
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        db.session.expunge_all()
+    return best * 1000
+
+
+def walk():
+    return {amenity.id: len(amenity.places) for amenity in Amenity.query.all()}
+
+
+def main():
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    amenities = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'amenities.db')))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            host_id, amenity_ids, links = seed(places, amenities)
+            print('{} places, {} amenities, {} links'.format(places, amenities, links))
+
+            counters = {item.id: item.place_count for item in facade.get_amenity_counts()}
+            assert counters == count_places(db.session) == walk()
+            print('walk      {:>9.1f} ms'.format(timed(walk, repeat=1)))
+            print('group     {:>9.1f} ms'.format(timed(lambda: count_places(db.session), repeat=3)))
+            print('counters  {:>9.2f} ms'.format(timed(lambda: facade.get_amenity_counts())))
+            url = '/api/v1/amenities/?with_counts=true'
+            client.get(url)
+            print('request   {:>9.2f} ms'.format(timed(lambda: client.get(url))))
+            for name, bbox in (('city', CITY), ('country', COUNTRY)):
+                print('bbox {:<8} {:>7.2f} ms'.format(name, timed(lambda: facade.get_amenity_counts(bbox))))
+
+            statements = []
+
+            def record(connection, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+            event.listen(db.engine, 'before_cursor_execute', record)
+            facade.get_amenity_counts(CITY)
+            event.remove(db.engine, 'before_cursor_execute', record)
+            statement, parameters = statements[-1]
+            plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            print('plan of one range query:', [row[-1] for row in plan])
+
+            def write():
+                facade.create_place({
+                    'title': 'New', 'price': 50.0, 'latitude': 48.85, 'longitude': 2.35,
+                    'owner_id': host_id, 'amenities': amenity_ids[:5],
+                })
+            print('write     {:>9.2f} ms'.format(timed(write)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Places created per second, one POST per place vs POST /places/batch.
+
+Drives the API through the Flask test client on a file database: the
+single path sends one authenticated POST /api/v1/places/ per place, the
+bulk path sends the same places in POST /api/v1/places/batch requests.
+Every place references ``amenities`` amenities (2 by default); with 0 the
+single path no longer pays for loading each amenity with all its places.
+
+    python benchmarks/bench_bulk_create.py [count] [batch] [amenities]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        PURGE_INTERVAL = None
+    return Profile
+
+
+def setup(path, amenity_count):
+    app = create_app(make_profile(path))
+    with app.app_context():
+        db.create_all()
+        owner = User('Bench', 'Owner', 'owner@example.com', 'password')
+        amenities = [Amenity('Amenity {}'.format(i)) for i in range(amenity_count)]
+        db.session.add_all([owner] + amenities)
+        db.session.commit()
+        amenity_ids = [amenity.id for amenity in amenities]
+    client = app.test_client()
+    response = client.post('/api/v1/auth/login', json={
+        'email': 'owner@example.com', 'password': 'password',
+    })
+    headers = {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+    return client, headers, amenity_ids
+
+
+def make_places(count, amenity_ids):
+    return [{
+        'title': 'Place {}'.format(i),
+        'description': 'Bench place',
+        'price': 10.0 + i % 90,
+        'latitude': -80.0 + (i % 160),
+        'longitude': -170.0 + (i % 340),
+        'amenities': amenity_ids,
+    } for i in range(count)]
+
+
+def single(client, headers, places):
+    for place in places:
+        response = client.post('/api/v1/places/', json=place, headers=headers)
+        assert response.status_code == 201, response.get_json()
+
+
+def bulk(client, headers, places, batch):
+    for offset in range(0, len(places), batch):
+        response = client.post(
+            '/api/v1/places/batch', json=places[offset:offset + batch], headers=headers
+        )
+        assert response.status_code == 201, response.get_json()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    amenity_count = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    directory = tempfile.mkdtemp()
+    rates = {}
+    for name in ('single', 'batch'):
+        client, headers, amenity_ids = setup(os.path.join(directory, name + '.db'), amenity_count)
+        places = make_places(count, amenity_ids)
+        start = time.perf_counter()
+        if name == 'single':
+            single(client, headers, places)
+        else:
+            bulk(client, headers, places, batch)
+        rates[name] = count / (time.perf_counter() - start)
+        print('{:<7} {:>9.0f} places/s'.format(name, rates[name]))
+    print('speedup {:.1f}x'.format(rates['batch'] / rates['single']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Time to delete a large host, ORM-loaded cascade vs ON DELETE CASCADE.
+
+Seeds one owner with many places, each reviewed by a pool of guests, then
+deletes the owner twice on fresh copies:
+
+- orm: loads every place, review and amenity link first and lets the
+  ORM delete them row by row, which is what the relationships did before
+  they were declared with passive_deletes
+- database: deletes the user row only and lets the foreign keys cascade
+
+    python benchmarks/bench_cascade_delete.py [places] [reviews_per_place]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, func, insert, select  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.associations import place_amenity  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(places, reviews_per_place):
+    now = datetime.utcnow()
+    owner = User('Big', 'Host', 'host@example.com', 'password')
+    guests = [User('Guest', str(i), 'guest{}@example.com'.format(i), 'password')
+              for i in range(reviews_per_place)]
+    amenities = [Amenity('Amenity {}'.format(i)) for i in range(5)]
+    db.session.add_all([owner] + guests + amenities)
+    db.session.commit()
+
+    place_rows = [{
+        'id': new_id(), 'title': 'Place {}'.format(i), 'description': '', 'price': 50.0,
+        'latitude': 0.0, 'longitude': 0.0, 'user_id': owner.id, 'geohash': 's00000000000',
+        'created_at': now, 'updated_at': now,
+    } for i in range(places)]
+    db.session.execute(insert(Place.__table__), place_rows)
+    db.session.execute(insert(place_amenity), [
+        {'place_id': row['id'], 'amenity_id': amenity.id}
+        for row in place_rows for amenity in amenities[:2]
+    ])
+    for row in place_rows:
+        db.session.execute(insert(Review.__table__), [{
+            'id': new_id(), 'text': 'Great stay', 'rating': 5, 'user_id': guest.id,
+            'place_id': row['id'], 'created_at': now, 'updated_at': now,
+        } for guest in guests])
+    db.session.commit()
+    return owner.id
+
+
+def delete_owner(owner_id, load_children):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engines[None]
+    event.listen(engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    owner = db.session.get(User, owner_id)
+    if load_children:
+        for place in owner.places:
+            place.reviews
+        owner.reviews
+    loaded = len(db.session.identity_map)
+    db.session.delete(owner)
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, 'before_cursor_execute', count)
+    return elapsed, loaded, len(statements)
+
+
+def run(name, path, owner_id, load_children):
+    app = create_app(make_profile(path))
+    with app.app_context():
+        elapsed, loaded, statements = delete_owner(owner_id, load_children)
+        remaining = db.session.execute(select(func.count()).select_from(Review)).scalar()
+    print('{:<9} {:>8.0f} ms  objects loaded {:>7}  statements {:>6}  reviews left {}'.format(
+        name, elapsed * 1000, loaded, statements, remaining))
+
+
+def main():
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    reviews_per_place = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    directory = tempfile.mkdtemp()
+    seeded = os.path.join(directory, 'seed.db')
+    app = create_app(make_profile(seeded))
+    with app.app_context():
+        db.create_all()
+        owner_id = seed(places, reviews_per_place)
+    print('{} places, {} reviews'.format(places, places * reviews_per_place))
+
+    for name, load_children in (('orm', True), ('database', False)):
+        path = os.path.join(directory, name + '.db')
+        shutil.copy(seeded, path)
+        run(name, path, owner_id, load_children)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Insert rate, index size and keyset pagination per id strategy.
+
+Fills places and place_amenity with each ID_STRATEGY / ID_STORAGE pair,
+committing in batches like a busy API would, then reports the time spent
+inserting, the on-disk size of the primary key and link indexes (from
+SQLite's dbstat table) and the time to page through every place with
+``WHERE id > :last ORDER BY id``. With time-ordered ids that walk also
+returns places in creation order.
+
+    python benchmarks/bench_ids.py [count] [batch]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert, select, text  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.associations import place_amenity  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+VARIANTS = (
+    ('uuid4', 'string'),
+    ('uuid7', 'string'),
+    ('ulid', 'string'),
+    ('uuid4', 'binary'),
+    ('uuid7', 'binary'),
+)
+PAGE_SIZE = 100
+
+
+def make_profile(path, strategy, storage):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        ID_STRATEGY = strategy
+        ID_STORAGE = storage
+    return Profile
+
+
+def seed_references(count):
+    owners = [User('Bench', 'Owner', 'owner{}@example.com'.format(i), 'password') for i in range(count)]
+    amenities = [Amenity('Amenity {}'.format(i)) for i in range(count)]
+    db.session.add_all(owners + amenities)
+    db.session.commit()
+    return [owner.id for owner in owners], [amenity.id for amenity in amenities]
+
+
+def insert_places(count, batch, owner_ids, amenity_ids):
+    now = datetime.utcnow()
+    inserted = []
+    start = time.perf_counter()
+    for offset in range(0, count, batch):
+        rows = []
+        links = []
+        for i in range(offset, min(offset + batch, count)):
+            place_id = new_id()
+            rows.append({
+                'id': place_id,
+                'title': 'Place {}'.format(i),
+                'description': '',
+                'price': 10.0 + i % 90,
+                'latitude': 0.0,
+                'longitude': 0.0,
+                'user_id': owner_ids[i % len(owner_ids)],
+                'geohash': 's00000000000',
+                'created_at': now,
+                'updated_at': now,
+            })
+            links.extend(
+                {'place_id': place_id, 'amenity_id': amenity_ids[(i + k) % len(amenity_ids)]}
+                for k in range(3)
+            )
+            inserted.append(place_id)
+        db.session.execute(insert(Place.__table__), rows)
+        db.session.execute(insert(place_amenity), links)
+        db.session.commit()
+    return time.perf_counter() - start, inserted
+
+
+def page_through():
+    ids = []
+    query = select(Place.id).order_by(Place.id).limit(PAGE_SIZE)
+    start = time.perf_counter()
+    page = db.session.execute(query).scalars().all()
+    while page:
+        ids.extend(page)
+        page = db.session.execute(query.where(Place.id > page[-1])).scalars().all()
+    return time.perf_counter() - start, ids
+
+
+def run(strategy, storage, count, batch):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(make_profile(path, strategy, storage))
+    with app.app_context():
+        db.create_all()
+        owner_ids, amenity_ids = seed_references(10)
+        insert_seconds, inserted = insert_places(count, batch, owner_ids, amenity_ids)
+        sizes = dict(db.session.execute(
+            text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')
+        ).all())
+        page_seconds, paged = page_through()
+
+    kib = 1024
+    print('{:<6} {:<7} insert {:>9.0f} rows/s  places pk {:>7.0f} KiB  links {:>7.0f} KiB  '
+          'pages {:>6.0f} ms  creation order {}'.format(
+              strategy, storage,
+              count / insert_seconds,
+              sizes.get('sqlite_autoindex_places_1', 0) / kib,
+              (sizes.get('place_amenity', 0) + sizes.get('sqlite_autoindex_place_amenity_1', 0)) / kib,
+              page_seconds * 1000,
+              'yes' if paged == inserted else 'no'))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for strategy, storage in VARIANTS:
+        run(strategy, storage, count, batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Fetching 100 places: 100 GET /places/<id> vs one GET /places/?ids=.
+
+Seeds a file database, then for a number of rounds fetches a random
+selection of place ids both ways through the Flask test client and
+reports the median time per round. Single GETs are measured with the
+detail response cache warm, which is their best case.
+
+    python benchmarks/bench_multi_get.py [places] [ids] [rounds]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+class Profile(config.DevelopmentConfig):
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    PURGE_INTERVAL = None
+
+
+def seed(count):
+    owner = User('Bench', 'Owner', 'owner@example.com', 'password')
+    amenities = [Amenity('Amenity {}'.format(i)) for i in range(5)]
+    db.session.add_all([owner] + amenities)
+    db.session.flush()
+    places = []
+    for i in range(count):
+        place = Place('Place {}'.format(i), 'Bench place', 10.0 + i % 90, 0.0, 0.0, user_id=owner.id)
+        place.amenities = amenities[: i % 3]
+        places.append(place)
+    db.session.add_all(places)
+    db.session.commit()
+    return [place.id for place in places]
+
+
+def single(client, ids):
+    for place_id in ids:
+        assert client.get('/api/v1/places/{}'.format(place_id)).status_code == 200
+
+
+def multi(client, ids):
+    response = client.get('/api/v1/places/?ids={}&include=owner,amenities'.format(','.join(ids)))
+    assert len(response.get_json()['items']) == len(ids)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    per_round = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    app = create_app(Profile)
+    with app.app_context():
+        db.create_all()
+        place_ids = seed(count)
+    client = app.test_client()
+    single(client, place_ids)
+
+    timings = {'single': [], 'ids': []}
+    for _ in range(rounds):
+        ids = random.sample(place_ids, per_round)
+        for name, fetch in (('single', single), ('ids', multi)):
+            start = time.perf_counter()
+            fetch(client, ids)
+            timings[name].append(time.perf_counter() - start)
+
+    for name, values in timings.items():
+        print('{:<7} {:>8.1f} ms per {} places'.format(name, statistics.median(values) * 1000, per_round))
+    print('speedup {:.1f}x'.format(statistics.median(timings['single']) / statistics.median(timings['ids'])))
+
+
+if __name__ == '__main__':
+    main()
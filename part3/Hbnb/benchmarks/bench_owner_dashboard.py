@@ -0,0 +1,118 @@
+"""Owner dashboard from one grouped query vs a request per listing.
+
+Seeds ``hosts`` hosts with ``places_per_host`` places each and
+``reviews_per_place`` reviews per place, then times for one host:
+
+- per-listing: what the dashboard took before, listing the host's places
+  and fetching the reviews of each one
+- grouped: the single grouped query behind GET /users/<id>/dashboard
+- hit: the same request served from the response cache
+
+    python benchmarks/bench_owner_dashboard.py [hosts] [places_per_host] [reviews_per_place]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.geohash import encode_geohash  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import facade  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(hosts, places_per_host, reviews_per_place):
+    now = datetime.utcnow()
+    rng = random.Random(5)
+    # One bcrypt hash shared by every host keeps seeding fast
+    password = User('Host', '0', 'host@example.com', 'password').password
+    user_ids = [new_id() for _ in range(hosts)]
+    db.session.execute(insert(User.__table__), [{
+        'id': user_id, 'first_name': 'Host', 'last_name': str(i), 'email': 'host{}@example.com'.format(i),
+        'password': password, 'is_admin': False, 'created_at': now, 'updated_at': now,
+    } for i, user_id in enumerate(user_ids)])
+
+    place_rows = []
+    for i in range(hosts * places_per_host):
+        latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        place_rows.append({
+            'id': new_id(), 'title': 'Place {}'.format(i), 'description': '', 'price': 80.0,
+            'latitude': latitude, 'longitude': longitude, 'user_id': user_ids[i % hosts],
+            'geohash': encode_geohash(latitude, longitude), 'created_at': now, 'updated_at': now,
+        })
+    review_rows = [{
+        'id': new_id(), 'text': 'Stay', 'rating': rng.randint(1, 5),
+        'user_id': user_ids[(i + 1 + k) % hosts], 'place_id': row['id'],
+        'created_at': now - timedelta(minutes=rng.randint(0, 100000)), 'updated_at': now,
+    } for i, row in enumerate(place_rows) for k in range(reviews_per_place)]
+    for rows, table in ((place_rows, Place.__table__), (review_rows, Review.__table__)):
+        for start in range(0, len(rows), 10000):
+            db.session.execute(insert(table), rows[start:start + 10000])
+    db.session.commit()
+    return user_ids[0]
+
+
+def per_listing(owner_id):
+    rows = []
+    for place in Place.query.filter_by(user_id=owner_id):
+        ratings = [(review.rating, review.created_at) for review in facade.get_reviews_by_place(place.id)]
+        rows.append((place.id, len(ratings), max(ratings, key=lambda r: r[1])[1] if ratings else None))
+    return rows
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        db.session.expunge_all()
+    return best * 1000
+
+
+def main():
+    hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    places_per_host = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    reviews_per_place = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'dashboard.db')))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            owner_id = seed(hosts, places_per_host, reviews_per_place)
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity=owner_id)}
+            print('{} places, {} reviews'.format(
+                hosts * places_per_host, hosts * places_per_host * reviews_per_place))
+
+            url = '/api/v1/users/{}/dashboard'.format(owner_id)
+            assert client.get(url, headers=headers).headers['X-Cache'] == 'MISS'
+            print('per-listing {:>9.2f} ms'.format(timed(lambda: per_listing(owner_id))))
+            print('grouped     {:>9.2f} ms'.format(timed(lambda: facade.get_owner_dashboard(owner_id))))
+            print('hit         {:>9.2f} ms'.format(timed(lambda: client.get(url, headers=headers))))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Price-filtered place search pages vs downloading every place.
+
+Seeds ``places`` places over a few hundred hosts, then times:
+
+- download: GET /places/?fields=id,price, then filtering and sorting on
+  the client, what a price filter used to cost
+- first: the first page of each sort
+- deep: a page resumed from a cursor halfway through each sort
+- filtered: the first and a deep page within a price range
+
+and prints the query plan of the deep filtered page, which should be a
+range search on the live price index starting at the cursor.
+
+    python benchmarks/bench_place_search.py [places] [limit]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, insert  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.api.v1.cursors import encode_cursor  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.geohash import encode_geohash  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import facade  # noqa: E402
+
+MIN_PRICE, MAX_PRICE = 80, 150
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        PURGE_INTERVAL = None
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(places):
+    start = datetime.utcnow() - timedelta(days=365)
+    rng = random.Random(5)
+    hosts = [User('Host', str(i), 'host{}@example.com'.format(i), 'password') for i in range(200)]
+    db.session.add_all(hosts)
+    db.session.commit()
+    host_ids = [host.id for host in hosts]
+    for first in range(0, places, 10000):
+        rows = []
+        for i in range(first, min(first + 10000, places)):
+            latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+            created_at = start + timedelta(seconds=i * 30)
+            rows.append({
+                'id': new_id(), 'title': 'Place {}'.format(i), 'description': '',
+                # Whole prices, so many places share a key and the id breaks ties
+                'price': float(rng.randint(20, 500)), 'latitude': latitude, 'longitude': longitude,
+                'user_id': host_ids[i % len(host_ids)], 'geohash': encode_geohash(latitude, longitude),
+                'created_at': created_at, 'updated_at': created_at,
+            })
+        db.session.execute(insert(Place.__table__), rows)
+    db.session.commit()
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        db.session.expunge_all()
+    return best * 1000
+
+
+def download(client):
+    items = client.get('/api/v1/places/?fields=id,price').get_json()
+    return sorted((item for item in items if MIN_PRICE <= item['price'] <= MAX_PRICE),
+                  key=lambda item: (item['price'], item['id']))
+
+
+def halfway(sort, min_price=None, max_price=None):
+    """Cursor of the place halfway through ``sort``"""
+    name, descending = facade.place_repo.SORTS[sort]
+    column = getattr(Place, name)
+    query = db.session.query(column, Place.id)
+    if min_price is not None:
+        query = query.filter(Place.price.between(min_price, max_price))
+    order = (column.desc(), Place.id.desc()) if descending else (column, Place.id)
+    return encode_cursor(sort, tuple(query.order_by(*order).offset(query.count() // 2).first()))
+
+
+def main():
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'search.db')))
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            seed(places)
+            print('{} places, pages of {}'.format(places, limit))
+
+            def get(url):
+                response = client.get(url)
+                assert response.status_code == 200, response.get_json()
+                return response
+
+            print('download + filter   {:>9.1f} ms'.format(timed(lambda: download(client), repeat=1)))
+            for sort in facade.place_repo.SORTS:
+                url = '/api/v1/places/?sort={}&limit={}'.format(sort, limit)
+                print('first  {:<12} {:>9.2f} ms'.format(sort, timed(lambda: get(url))))
+                deep = url + '&cursor=' + halfway(sort)
+                print('deep   {:<12} {:>9.2f} ms'.format(sort, timed(lambda: get(deep))))
+
+            filtered = '/api/v1/places/?sort=price&limit={}&min_price={}&max_price={}'.format(
+                limit, MIN_PRICE, MAX_PRICE)
+            deep = filtered + '&cursor=' + halfway('price', MIN_PRICE, MAX_PRICE)
+            print('filtered first      {:>9.2f} ms'.format(timed(lambda: get(filtered))))
+            print('filtered deep       {:>9.2f} ms'.format(timed(lambda: get(deep))))
+            assert [item['id'] for item in get(filtered).get_json()['items']] == [
+                item['id'] for item in download(client)][:limit]
+
+            statements = []
+
+            def record(connection, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+            event.listen(db.engine, 'before_cursor_execute', record)
+            get(deep)
+            event.remove(db.engine, 'before_cursor_execute', record)
+            statement, parameters = next(item for item in statements if 'ORDER BY' in item[0])
+            plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            print('plan of the page query:', [row[-1] for row in plan])
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Place statistics from the NumPy columns vs a Python pass over the models.
+
+Seeds ``places`` places spread over a few hundred hosts, each with a few
+reviews, then times:
+
+- load: building the columns from one grouped query
+- patch: refreshing the columns after a handful of places changed
+- report: each metric and grouping served from the columns
+- python: the same figures computed by iterating over the loaded places
+
+    python benchmarks/bench_place_stats.py [places] [reviews_per_place]
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert, update  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.geohash import encode_geohash  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.persistence.versioning import get_table_versions  # noqa: E402
+from app.services import facade  # noqa: E402
+from app.services.place_stats import TABLES  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(places, reviews_per_place):
+    now = datetime.utcnow()
+    rng = random.Random(7)
+    hosts = [User('Host', str(i), 'host{}@example.com'.format(i), 'password') for i in range(500)]
+    db.session.add_all(hosts)
+    db.session.commit()
+
+    place_rows = []
+    for i in range(places):
+        latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        place_rows.append({
+            'id': new_id(), 'title': 'Place {}'.format(i), 'description': '',
+            'price': round(rng.uniform(20, 500), 2), 'latitude': latitude, 'longitude': longitude,
+            'user_id': hosts[i % len(hosts)].id, 'geohash': encode_geohash(latitude, longitude),
+            'created_at': now, 'updated_at': now,
+        })
+    for start in range(0, places, 10000):
+        db.session.execute(insert(Place.__table__), place_rows[start:start + 10000])
+    review_rows = [{
+        'id': new_id(), 'text': 'Stay', 'rating': rng.randint(1, 5),
+        'user_id': hosts[(i + 1 + k) % len(hosts)].id, 'place_id': row['id'],
+        'created_at': now, 'updated_at': now,
+    } for i, row in enumerate(place_rows) for k in range(reviews_per_place)]
+    for start in range(0, len(review_rows), 10000):
+        db.session.execute(insert(Review.__table__), review_rows[start:start + 10000])
+    db.session.commit()
+    return [row['id'] for row in place_rows]
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def python_report(group_by):
+    groups = {}
+    for place in facade.get_all_places():
+        key = place.geohash[:4] if group_by == 'geocell' else (place.user_id if group_by else None)
+        groups.setdefault(key, []).append(place.price)
+    return {key: (len(prices), statistics.fmean(prices), min(prices), max(prices))
+            for key, prices in groups.items()}
+
+
+def main():
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    reviews_per_place = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'stats.db')))
+        stats = facade.place_stats
+        with app.app_context():
+            db.create_all()
+            place_ids = seed(places, reviews_per_place)
+            print('{} places, {} reviews'.format(places, places * reviews_per_place))
+
+            version = get_table_versions(*TABLES)
+            print('load      {:>9.1f} ms'.format(timed(lambda: stats._load(version, 0.0), repeat=3)))
+            columns = stats._load(version, 0.0)
+            changed = place_ids[:50]
+            db.session.execute(update(Place).where(Place.id.in_(changed)).values(price=999.0))
+            db.session.commit()
+            print('patch 50  {:>9.1f} ms'.format(timed(lambda: stats._patch(columns, changed, version, 0.0))))
+
+            app.extensions['place_stats'] = stats._load(version, time.monotonic())
+            stats.check_interval = float('inf')
+            for metric in ('price', 'rating', 'reviews'):
+                for group_by in (None, 'geocell', 'owner'):
+                    elapsed = timed(lambda: stats.report(metric, group_by, limit=1000))
+                    print('report {:<7} by {:<7} {:>8.1f} ms'.format(metric, group_by or 'all', elapsed))
+
+            for group_by in (None, 'geocell', 'owner'):
+                elapsed = timed(lambda: python_report(group_by), repeat=1)
+                db.session.expunge_all()
+                print('python price   by {:<7} {:>8.1f} ms'.format(group_by or 'all', elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Encoded bytes per second for 10k-item list responses.
+
+Compares the hand-built dicts + stdlib json previously used by the
+resources with the shared serializers and encoder (orjson if installed).
+
+    python benchmarks/bench_serializers.py [count]
+"""
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.serializers import PLACE_LIST, REVIEW_LIST, dumps, orjson  # noqa: E402
+
+
+def build_places(count):
+    owner_id = str(uuid.uuid4())
+    places = []
+    for i in range(count):
+        place = Place(
+            title='Place {}'.format(i),
+            description='A nice place to stay',
+            price=50.0 + i % 200,
+            latitude=(i % 180) - 90.0,
+            longitude=(i % 360) - 180.0,
+            user_id=owner_id,
+        )
+        place.id = str(uuid.uuid4())
+        places.append(place)
+    return places
+
+
+def build_reviews(places):
+    reviews = []
+    for i, place in enumerate(places):
+        review = Review(
+            text='Review number {}'.format(i),
+            rating=1 + i % 5,
+            place_id=place.id,
+            user_id=place.user_id,
+        )
+        review.id = str(uuid.uuid4())
+        reviews.append(review)
+    return reviews
+
+
+def legacy_places(places):
+    payload = [
+        {'id': p.id, 'title': p.title, 'latitude': p.latitude, 'longitude': p.longitude}
+        for p in places
+    ]
+    return (json.dumps(payload) + '\n').encode('utf-8')
+
+
+def legacy_reviews(reviews):
+    payload = [
+        {'id': r.id, 'text': r.text, 'rating': r.rating,
+         'user_id': r.user_id, 'place_id': r.place_id}
+        for r in reviews
+    ]
+    return (json.dumps(payload) + '\n').encode('utf-8')
+
+
+def measure(label, func, items, rounds=20):
+    best = float('inf')
+    size = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        size = len(func(items))
+        best = min(best, time.perf_counter() - start)
+    print('{:<28} {:>8.2f} ms  {:>8.1f} MB/s'.format(label, best * 1000, size / best / 1e6))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    places = build_places(count)
+    reviews = build_reviews(places)
+    print('{} items, encoder: {}'.format(count, 'orjson' if orjson else 'json'))
+    measure('places  legacy', legacy_places, places)
+    measure('places  serializers', lambda items: dumps(PLACE_LIST.dump_many(items)), places)
+    measure('reviews legacy', legacy_reviews, reviews)
+    measure('reviews serializers', lambda items: dumps(REVIEW_LIST.dump_many(items)), reviews)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Cache miss storms on one place, with and without single-flight loads.
+
+Seeds a place with ``reviews`` reviews, then for a number of rounds
+empties the response cache and releases ``threads`` threads together on
+GET /places/<id>?include=owner,amenities and GET /places/<id>/reviews,
+as when a listing goes viral. Reports the SQL statements run and the
+median round time, with coalescing on and with SINGLE_FLIGHT_TIMEOUT at
+0, where every request runs its own load. Each request still reads
+the table versions for its ETag before joining a load.
+
+    python benchmarks/bench_single_flight.py [threads] [reviews] [rounds]
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, insert  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import facade  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        PURGE_INTERVAL = None
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(reviews):
+    now = datetime.utcnow()
+    host = User('Host', 'One', 'host@example.com', 'password')
+    db.session.add(host)
+    db.session.commit()
+    place = Place('Viral', 'Everyone wants it', 120.0, 48.85, 2.35, owner_id=host.id)
+    db.session.add(place)
+    db.session.commit()
+    # One bcrypt hash shared by every guest keeps seeding fast
+    guest_ids = [new_id() for _ in range(reviews)]
+    db.session.execute(insert(User.__table__), [{
+        'id': guest_id, 'first_name': 'Guest', 'last_name': str(i), 'email': 'guest{}@example.com'.format(i),
+        'password': host.password, 'is_admin': False, 'created_at': now, 'updated_at': now,
+    } for i, guest_id in enumerate(guest_ids)])
+    db.session.execute(insert(Review.__table__), [{
+        'id': new_id(), 'text': 'Great stay', 'rating': 5, 'user_id': guest_id, 'place_id': place.id,
+        'created_at': now, 'updated_at': now,
+    } for guest_id in guest_ids])
+    db.session.commit()
+    return place.id
+
+
+def storm(app, urls, threads):
+    barrier = threading.Barrier(threads)
+
+    def request(url):
+        client = app.test_client()
+        barrier.wait()
+        assert client.get(url).status_code == 200
+
+    workers = [threading.Thread(target=request, args=(urls[i % len(urls)],)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    reviews = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'flight.db')))
+        with app.app_context():
+            db.create_all()
+            place_id = seed(reviews)
+            engine = db.engine
+        urls = [
+            '/api/v1/places/{}?include=owner,amenities'.format(place_id),
+            '/api/v1/places/{}/reviews'.format(place_id),
+        ]
+        print('{} threads, {} reviews, {} rounds'.format(threads, reviews, rounds))
+
+        statements = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(1))
+        for name, timeout in (('single-flight', 5.0), ('uncoalesced', 0)):
+            facade.single_flight.timeout = timeout
+            loads = facade.single_flight.stats()['loads']
+            times = []
+            del statements[:]
+            for _ in range(rounds):
+                facade.response_cache.clear()
+                times.append(storm(app, urls, threads))
+            loads = facade.single_flight.stats()['loads'] - loads
+            print('{:<14} {:>5} loads {:>6} statements/round {:>9.1f} ms'.format(
+                name, loads // rounds, len(statements) // rounds, statistics.median(times) * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
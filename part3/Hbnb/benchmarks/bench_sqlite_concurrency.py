@@ -0,0 +1,124 @@
+"""Read latency while a writer keeps committing, per engine profile.
+
+Runs the same workload against the development engine defaults
+(rollback journal) and ProductionConfig (WAL + pragmas + pool): one
+thread commits batches of places in a loop while reader threads fetch
+places by id. In WAL mode readers never wait for the writer.
+
+    python benchmarks/bench_sqlite_concurrency.py [seconds] [readers]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def make_profile(base, path):
+    class Profile(base):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(app, count):
+    with app.app_context():
+        db.create_all()
+        owner = User('Bench', 'Owner', 'bench@example.com', 'password')
+        db.session.add(owner)
+        db.session.flush()
+        places = [
+            Place('Place {}'.format(i), '', 10.0 + i % 90, 0.0, 0.0, user_id=owner.id)
+            for i in range(count)
+        ]
+        db.session.add_all(places)
+        db.session.commit()
+        return [place.id for place in places]
+
+
+# Copies a slice of the table in one statement: the write lock is held
+# inside SQLite (without the GIL) for as long as a large transaction would
+COPY_PLACES = text(
+    "INSERT INTO places (id, title, description, price, latitude, longitude, "
+    "user_id, geohash, created_at, updated_at) "
+    "SELECT lower(hex(randomblob(16))), title, description, price, latitude, "
+    "longitude, user_id, geohash, created_at, updated_at FROM places LIMIT :batch"
+)
+
+
+def writer(app, stop, commits, batch):
+    with app.app_context():
+        while not stop.is_set():
+            db.session.execute(COPY_PLACES, {'batch': batch})
+            db.session.commit()
+            commits.append(1)
+            time.sleep(0.005)
+
+
+def reader(app, place_ids, stop, latencies, errors):
+    with app.app_context():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                db.session.get(Place, random.choice(place_ids))
+                db.session.rollback()
+            except Exception:
+                errors.append(1)
+                db.session.rollback()
+                continue
+            latencies.append(time.perf_counter() - start)
+            db.session.expunge_all()
+
+
+def run(name, base, seconds, readers):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(make_profile(base, path))
+    place_ids = seed(app, 50000)
+    with app.app_context():
+        journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+
+    stop = threading.Event()
+    commits, latencies, errors = [], [], []
+    threads = [threading.Thread(target=writer, args=(app, stop, commits, 20000))]
+    threads += [
+        threading.Thread(target=reader, args=(app, place_ids, stop, latencies, errors))
+        for _ in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else float('nan')
+    print('{:<12} {:<8} reads/s {:>8.0f}  p50 {:>7.2f} ms  p99 {:>8.2f} ms  max {:>8.2f} ms  '
+          'errors {:>4}  commits {:>4}'.format(
+              name, journal_mode, len(latencies) / seconds,
+              statistics.median(latencies) * 1000 if latencies else float('nan'),
+              p99 * 1000, (latencies[-1] if latencies else float('nan')) * 1000,
+              len(errors), len(commits)))
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run('development', config.DevelopmentConfig, seconds, readers)
+    run('production', config.ProductionConfig, seconds, readers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Top-k popular places from the popularity index vs scoring every place.
+
+Seeds ``places`` places with up to ``reviews_per_place`` reviews each,
+fills their scores with one rescore pass, then times:
+
+- scan: loading every place and its reviews and ranking them in Python,
+  which is what answering the query took without stored scores
+- index: GET /places/top through the facade, which walks the popularity index
+- bbox: the same with a bounding box covering about a tenth of the places
+- refresh: re-scoring one place after a review write
+
+    python benchmarks/bench_top_places.py [places] [reviews_per_place]
+"""
+import heapq
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.geohash import encode_geohash  # noqa: E402
+from app.models.ids import new_id  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.serializers import PLACE_TOP_COLUMNS  # noqa: E402
+from app.services import facade  # noqa: E402
+
+
+def make_profile(path):
+    class Profile(config.DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+    return Profile
+
+
+def seed(places, reviews_per_place):
+    now = datetime.utcnow()
+    rng = random.Random(3)
+    users = [User('User', str(i), 'user{}@example.com'.format(i), 'password') for i in range(reviews_per_place + 1)]
+    db.session.add_all(users)
+    db.session.commit()
+
+    place_rows = []
+    for i in range(places):
+        latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        place_rows.append({
+            'id': new_id(), 'title': 'Place {}'.format(i), 'description': '', 'price': 80.0,
+            'latitude': latitude, 'longitude': longitude, 'user_id': users[0].id,
+            'geohash': encode_geohash(latitude, longitude), 'created_at': now, 'updated_at': now,
+        })
+    review_rows = [{
+        'id': new_id(), 'text': 'Stay', 'rating': rng.randint(1, 5), 'user_id': users[k + 1].id,
+        'place_id': row['id'], 'created_at': now, 'updated_at': now,
+    } for row in place_rows for k in range(rng.randint(0, reviews_per_place))]
+    for rows, table in ((place_rows, Place.__table__), (review_rows, Review.__table__)):
+        for start in range(0, len(rows), 10000):
+            db.session.execute(insert(table), rows[start:start + 10000])
+    db.session.commit()
+    return len(review_rows)
+
+
+def scan_top(k):
+    prior = facade.popularity.prior_weight * facade.popularity.prior_mean
+    scored = []
+    for place in Place.query.options(selectinload(Place.reviews)):
+        if place.reviews:
+            ratings = [review.rating for review in place.reviews]
+            scored.append(((prior + sum(ratings)) / (facade.popularity.prior_weight + len(ratings)), place.id))
+    return [place_id for _, place_id in heapq.nlargest(k, scored)]
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        db.session.expunge_all()
+    return best * 1000
+
+
+def main():
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    reviews_per_place = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    directory = tempfile.mkdtemp()
+    try:
+        app = create_app(make_profile(os.path.join(directory, 'top.db')))
+        with app.app_context():
+            db.create_all()
+            reviews = seed(places, reviews_per_place)
+            start = time.perf_counter()
+            facade.popularity.rescore(rated_only=False)
+            print('{} places, {} reviews, scores filled in {:.1f} s'.format(
+                places, reviews, time.perf_counter() - start))
+
+            indexed = [place.id for place in facade.get_top_places(10, None, PLACE_TOP_COLUMNS)]
+            assert indexed == scan_top(10)
+            print('scan      {:>9.1f} ms'.format(timed(lambda: scan_top(10), repeat=1)))
+            print('index     {:>9.2f} ms'.format(timed(lambda: facade.get_top_places(10, None, PLACE_TOP_COLUMNS))))
+            bbox = (-20.0, 30.0, 40.0, 60.0)
+            print('bbox      {:>9.2f} ms'.format(timed(lambda: facade.get_top_places(10, bbox, PLACE_TOP_COLUMNS))))
+            print('refresh   {:>9.2f} ms'.format(timed(lambda: facade.popularity.refresh(indexed[:1]))))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,121 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this-32chars')
     JWT_SECRET_KEY = SECRET_KEY
     DEBUG = False
+    # Server-Sent Events stream of review changes for place owners
+    REVIEW_STREAM_HEARTBEAT = 15
+    REVIEW_STREAM_BUFFER_SIZE = 100
+    # Memory cap of the encoded place detail / amenity list cache
+    RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+    # Concurrent identical place / review list reads share one load; a
+    # request waits this many seconds for it before loading on its own
+    SINGLE_FLIGHT_TIMEOUT = 5.0
+    # Bind key (in SQLALCHEMY_BINDS) of a read replica; None routes
+    # everything to the primary
+    DATABASE_REPLICA_BIND = None
+    # Deletes cascade in the database (ON DELETE CASCADE), which SQLite
+    # only enforces with foreign keys switched on for each connection
+    SQLITE_PRAGMAS = {'foreign_keys': 'ON'}
+    # Bind keys of the place/review shards; None keeps a single database
+    SHARD_BINDS = None
+    SHARD_GEOHASH_PRECISION = 2
+    SHARD_MAP_REFRESH_INTERVAL = 5.0
+    # Time-ordered keys (uuid7 or ulid) keep index inserts sequential;
+    # 'binary' storage needs `python -m app.persistence.id_migration`
+    ID_STRATEGY = 'uuid7'
+    ID_STORAGE = 'string'
+    # Deletes only set deleted_at; a background thread removes tombstones
+    # older than the grace period in small batches. Off (None) unless the
+    # profile serving requests sets the seconds between passes
+    PURGE_INTERVAL = None
+    PURGE_GRACE_SECONDS = 3600
+    PURGE_BATCH_SIZE = 500
+    PURGE_BATCH_PAUSE = 0.05
+    # Largest JSON array accepted by the POST .../batch endpoints
+    BULK_MAX_ITEMS = 5000
+    # POST /api/v1/batch/: sub-requests per call, threads for runs of GETs
+    BATCH_MAX_REQUESTS = 20
+    BATCH_MAX_WORKERS = 4
+    # Longest ?ids= list accepted by the multi-get of places, users, amenities
+    MULTI_GET_MAX_IDS = 500
+    # Seconds between checks of the amenities table version by each
+    # worker's in-memory catalog; its own writes refresh it at once
+    AMENITY_CATALOG_CHECK_INTERVAL = 1.0
+    # GET /api/v1/stats/places: seconds between table version checks of
+    # each worker's NumPy columns, and most groups one report may return
+    PLACE_STATS_CHECK_INTERVAL = 1.0
+    PLACE_STATS_MAX_GROUPS = 1000
+    # GET /api/v1/places/top: Bayesian prior (mean rating and its weight in
+    # reviews) and largest k; with a half-life in days older reviews count
+    # less and scores are recomputed every POPULARITY_RESCORE_INTERVAL seconds
+    POPULARITY_PRIOR_MEAN = 3.0
+    POPULARITY_PRIOR_WEIGHT = 5.0
+    POPULARITY_HALF_LIFE_DAYS = None
+    POPULARITY_RESCORE_INTERVAL = 3600
+    TOP_PLACES_MAX_K = 100
+    # Page size of place searches (?sort=, ?min_price=...) and its maximum
+    PLACE_SEARCH_DEFAULT_LIMIT = 20
+    PLACE_SEARCH_MAX_LIMIT = 100
+    # Seconds between table version checks of the cached owner dashboards;
+    # this worker's own writes drop the dashboards they change at once
+    OWNER_DASHBOARD_CHECK_INTERVAL = 1.0
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    PURGE_INTERVAL = 60
     SQLALCHEMY_DATABASE_URI = 'sqlite:///development.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+class ReplicaDevelopmentConfig(DevelopmentConfig):
+    # Local read replica refreshed from development.db by the replication
+    # stand-in every SQLITE_REPLICATION_INTERVAL seconds
+    SQLALCHEMY_BINDS = {'replica': 'sqlite:///development-replica.db'}
+    DATABASE_REPLICA_BIND = 'replica'
+    SQLITE_REPLICATION_INTERVAL = 1.0
+
+class ShardedDevelopmentConfig(DevelopmentConfig):
+    # Places and reviews spread over local SQLite files by geohash prefix;
+    # create them with `python -m app.persistence.sharding init`
+    SQLALCHEMY_BINDS = {
+        'shard_0': 'sqlite:///development-shard-0.db',
+        'shard_1': 'sqlite:///development-shard-1.db',
+        'shard_2': 'sqlite:///development-shard-2.db',
+    }
+    SHARD_BINDS = ('shard_0', 'shard_1', 'shard_2')
+
+class ProductionConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///production.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    PURGE_INTERVAL = 60
+    if os.getenv('DATABASE_REPLICA_URL'):
+        SQLALCHEMY_BINDS = {'replica': os.getenv('DATABASE_REPLICA_URL')}
+        DATABASE_REPLICA_BIND = 'replica'
+
+    # One pooled connection per WSGI worker thread, plus some headroom
+    WSGI_THREADS = int(os.getenv('WSGI_THREADS', '8'))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': WSGI_THREADS,
+        'max_overflow': WSGI_THREADS // 2,
+        'pool_timeout': 10,
+        'pool_pre_ping': True,
+        'connect_args': {'check_same_thread': False, 'timeout': 5},
+    }
+
+    # WAL lets readers proceed while a writer commits; NORMAL sync is
+    # durable across application crashes in WAL mode
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'cache_size': -64000,  # 64 MiB
+        'mmap_size': 268435456,  # 256 MiB
+        'temp_store': 'MEMORY',
+    }
+
 config = {
     'development': DevelopmentConfig,
+    'replica': ReplicaDevelopmentConfig,
+    'sharded': ShardedDevelopmentConfig,
+    'production': ProductionConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,69 @@
+# conftest.py
+
+import pytest
+
+import config
+from app import create_app
+from app.extensions import db
+from app.services import facade
+
+
+def make_config(directory, sharded=False):
+    class TestConfig(config.Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///{}'.format(directory / 'global.db')
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        SHARD_MAP_REFRESH_INTERVAL = 0
+        if sharded:
+            SQLALCHEMY_BINDS = {
+                'shard_{}'.format(i): 'sqlite:///{}'.format(directory / 'shard-{}.db'.format(i))
+                for i in range(3)
+            }
+            SHARD_BINDS = ('shard_0', 'shard_1', 'shard_2')
+    return TestConfig
+
+
+def build_app(directory, sharded=False):
+    app = create_app(make_config(directory, sharded))
+    with app.app_context():
+        # Shard binds get their own schema; an earlier sharded app also
+        # left its bind keys in the shared metadata registry
+        db.create_all(bind_key=None)
+        if sharded:
+            app.extensions['shard_router'].create_all()
+        for name in ('admin', 'host', 'guest'):
+            facade.create_user({
+                'first_name': name.title(), 'last_name': 'Test', 'email': '{}@example.com'.format(name),
+                'password': 'password', 'is_admin': name == 'admin',
+            })
+    facade.response_cache.clear()
+    return app
+
+
+@pytest.fixture(params=['single', 'sharded'])
+def app(request, tmp_path):
+    """An application on a fresh database, and on three shards"""
+    app = build_app(tmp_path, sharded=request.param == 'sharded')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, name):
+    response = client.post('/api/v1/auth/login', json={'email': '{}@example.com'.format(name), 'password': 'password'})
+    return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+
+def create_place(client, headers, title='Place', price=100.0, latitude=48.85, longitude=2.35):
+    response = client.post('/api/v1/places/', json={
+        'title': title, 'price': price, 'latitude': latitude, 'longitude': longitude,
+    }, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
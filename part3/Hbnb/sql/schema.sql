@@ -1,5 +1,8 @@
 PRAGMA foreign_keys = ON;
 
+DROP TABLE IF EXISTS shard_map;
+DROP TABLE IF EXISTS table_versions;
+DROP TABLE IF EXISTS amenity_place_counts;
 DROP TABLE IF EXISTS place_amenity;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS places;
@@ -14,7 +17,8 @@ CREATE TABLE users (
     password VARCHAR(255) NOT NULL,
     is_admin BOOLEAN NOT NULL DEFAULT 0,
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    deleted_at DATETIME
 );
 
 CREATE TABLE places (
@@ -25,8 +29,13 @@ CREATE TABLE places (
     latitude FLOAT NOT NULL CHECK (latitude >= -90.0 AND latitude <= 90.0),
     longitude FLOAT NOT NULL CHECK (longitude >= -180.0 AND longitude <= 180.0),
     owner_id CHAR(36) NOT NULL,
+    geohash VARCHAR(12),
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    popularity FLOAT NOT NULL DEFAULT 0,
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    deleted_at DATETIME,
     CONSTRAINT fk_places_owner
         FOREIGN KEY (owner_id) REFERENCES users(id)
         ON UPDATE CASCADE
@@ -41,6 +50,7 @@ CREATE TABLE reviews (
     place_id CHAR(36) NOT NULL,
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    deleted_at DATETIME,
     CONSTRAINT uq_reviews_user_place UNIQUE (user_id, place_id),
     CONSTRAINT fk_reviews_user
         FOREIGN KEY (user_id) REFERENCES users(id)
@@ -56,7 +66,8 @@ CREATE TABLE amenities (
     id CHAR(36) PRIMARY KEY,
     name VARCHAR(255) NOT NULL UNIQUE,
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    deleted_at DATETIME
 );
 
 CREATE TABLE place_amenity (
@@ -73,6 +84,35 @@ CREATE TABLE place_amenity (
         ON DELETE CASCADE
 );
 
+CREATE TABLE amenity_place_counts (
+    amenity_id CHAR(36) PRIMARY KEY,
+    place_count INT NOT NULL DEFAULT 0,
+    CONSTRAINT fk_amenity_place_counts_amenity
+        FOREIGN KEY (amenity_id) REFERENCES amenities(id)
+        ON UPDATE CASCADE
+        ON DELETE CASCADE
+);
+
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE shard_map (
+    geohash_prefix VARCHAR(12) PRIMARY KEY,
+    shard VARCHAR(64) NOT NULL
+);
+
 CREATE INDEX idx_places_owner_id ON places(owner_id);
+CREATE INDEX idx_places_geohash ON places(geohash);
+CREATE INDEX idx_places_popularity ON places(deleted_at, popularity, id);
+CREATE INDEX idx_places_live_geohash ON places(deleted_at, geohash);
+CREATE INDEX idx_places_live_price ON places(deleted_at, price, id);
+CREATE INDEX idx_places_live_created_at ON places(deleted_at, created_at, id);
 CREATE INDEX idx_reviews_user_id ON reviews(user_id);
-CREATE INDEX idx_reviews_place_id ON reviews(place_id);
+CREATE INDEX idx_reviews_place_id ON reviews(place_id, deleted_at);
+CREATE INDEX idx_place_amenity_amenity_id ON place_amenity(amenity_id);
+CREATE INDEX idx_users_deleted_at ON users(deleted_at);
+CREATE INDEX idx_places_deleted_at ON places(deleted_at);
+CREATE INDEX idx_reviews_deleted_at ON reviews(deleted_at);
+CREATE INDEX idx_amenities_deleted_at ON amenities(deleted_at);
@@ -0,0 +1,123 @@
+# test_amenity_counts.py
+
+from sqlalchemy import delete
+
+from app.extensions import db
+from app.models.amenity_count import AmenityPlaceCount
+from conftest import login
+from test_sharding import CITIES
+from test_soft_delete import user_id
+
+
+def create_amenities(client, headers, *names):
+    ids = []
+    for name in names:
+        response = client.post('/api/v1/amenities/', json={'name': name}, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def create_place(client, headers, amenity_ids, city=0):
+    latitude, longitude = CITIES[city]
+    response = client.post('/api/v1/places/', json={
+        'title': 'City {}'.format(city), 'price': 100.0, 'latitude': latitude, 'longitude': longitude,
+        'amenities': amenity_ids,
+    }, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+
+def counts(client, **params):
+    """Place count of each amenity, from ?with_counts=true"""
+    response = client.get('/api/v1/amenities/', query_string=dict(params, with_counts='true'))
+    assert response.status_code == 200, response.get_json()
+    return {item['id']: item['place_count'] for item in response.get_json()}
+
+
+def stored_counts(app):
+    """The counter rows themselves"""
+    with app.app_context():
+        return dict(db.session.query(AmenityPlaceCount.amenity_id, AmenityPlaceCount.place_count))
+
+
+# ─── COUNTER TESTS ────────────────────────────────────────────
+
+def test_counts_follow_links(app, client):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    wifi, pool, sauna = create_amenities(client, admin, 'Wifi', 'Pool', 'Sauna')
+    assert counts(client) == stored_counts(app) == {wifi: 0, pool: 0, sauna: 0}
+
+    first = create_place(client, host, [wifi, pool], city=0)
+    create_place(client, host, [wifi], city=1)
+    assert counts(client) == stored_counts(app) == {wifi: 2, pool: 1, sauna: 0}
+
+    response = client.put('/api/v1/places/{}'.format(first), json={'amenities': [wifi, sauna]}, headers=host)
+    assert response.status_code == 200, response.get_json()
+    assert counts(client) == stored_counts(app) == {wifi: 2, pool: 0, sauna: 1}
+
+    client.delete('/api/v1/places/{}'.format(first), headers=host)
+    assert counts(client) == stored_counts(app) == {wifi: 1, pool: 0, sauna: 0}
+    print("✅ test_counts_follow_links passed")
+
+
+def test_deleted_owner_stops_counting(app, client):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    wifi, pool = create_amenities(client, admin, 'Wifi', 'Pool')
+    create_place(client, host, [wifi, pool], city=0)
+    create_place(client, host, [wifi], city=2)
+    create_place(client, admin, [wifi], city=1)
+    assert counts(client) == {wifi: 3, pool: 1}
+
+    assert client.delete('/api/v1/users/{}'.format(user_id(app, 'host')), headers=admin).status_code == 200
+    assert counts(client) == stored_counts(app) == {wifi: 1, pool: 0}
+    print("✅ test_deleted_owner_stops_counting passed")
+
+
+def test_missing_counter_is_recounted(app, client):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    wifi, pool = create_amenities(client, admin, 'Wifi', 'Pool')
+    create_place(client, host, [wifi], city=0)
+    create_place(client, host, [wifi], city=1)
+    # As for an amenity older than the counter table
+    with app.app_context():
+        db.session.execute(delete(AmenityPlaceCount.__table__).where(AmenityPlaceCount.amenity_id == wifi))
+        db.session.commit()
+    assert stored_counts(app) == {pool: 0}
+
+    create_place(client, host, [wifi, pool], city=2)
+    assert counts(client) == stored_counts(app) == {wifi: 3, pool: 1}
+    print("✅ test_missing_counter_is_recounted passed")
+
+
+# ─── BBOX TESTS ───────────────────────────────────────────────
+
+def test_counts_inside_bbox(app, client):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    wifi, pool = create_amenities(client, admin, 'Wifi', 'Pool')
+    create_place(client, host, [wifi, pool], city=0)
+    create_place(client, host, [wifi], city=1)
+    create_place(client, host, [wifi], city=2)
+
+    # CITIES[0] is (50.0, 10.0), CITIES[1] (10.0, 10.0), CITIES[2] (-10.0, -60.0)
+    assert counts(client, bbox='5,45,15,55') == {wifi: 1, pool: 1}
+    assert counts(client, bbox='0,0,20,60') == {wifi: 2, pool: 1}
+    assert counts(client, bbox='-180,-90,180,90') == counts(client) == {wifi: 3, pool: 1}
+    assert counts(client, bbox='100,-5,120,5') == {wifi: 0, pool: 0}
+    print("✅ test_counts_inside_bbox passed")
+
+
+def test_invalid_count_parameters(client):
+    admin = login(client, 'admin')
+    wifi, = create_amenities(client, admin, 'Wifi')
+    for params in (
+        {'with_counts': 'maybe'}, {'bbox': '0,0,10,10'},
+        {'with_counts': 'true', 'ids': wifi},
+        {'with_counts': 'true', 'bbox': '0,0,10'}, {'with_counts': 'true', 'bbox': 'a,b,c,d'},
+        {'with_counts': 'true', 'bbox': '0,10,10,0'}, {'with_counts': 'true', 'bbox': '0,-100,10,10'},
+        {'with_counts': 'true', 'bbox': '-200,0,10,10'},
+    ):
+        response = client.get('/api/v1/amenities/', query_string=params)
+        assert response.status_code == 400, params
+        assert 'message' in response.get_json()
+    print("✅ test_invalid_count_parameters passed")
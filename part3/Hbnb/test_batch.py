@@ -0,0 +1,58 @@
+# test_batch.py
+
+import pytest
+
+from app.services import facade
+from conftest import create_place, login
+
+
+def break_review(monkeypatch, review_id):
+    """Make every read of one review raise an unhandled error"""
+    get_review_version = facade.get_review_version
+
+    def failing(requested_id, *args, **kwargs):
+        if requested_id == review_id:
+            raise RuntimeError('Broken review')
+        return get_review_version(requested_id, *args, **kwargs)
+
+    monkeypatch.setattr(facade, 'get_review_version', failing)
+
+
+# ─── BATCH TESTS ──────────────────────────────────────────────
+
+@pytest.mark.parametrize('propagate', [None, False])
+def test_failed_sub_request_gets_its_own_500(app, client, monkeypatch, propagate):
+    app.config['PROPAGATE_EXCEPTIONS'] = propagate
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id, other_id = create_place(client, host, 'First'), create_place(client, host, 'Second')
+    review_id = client.post('/api/v1/reviews/', json={'text': 'Nice', 'rating': 4, 'place_id': place_id},
+                            headers=guest).get_json()['id']
+    break_review(monkeypatch, 'broken')
+
+    response = client.post('/api/v1/batch/', json=[
+        {'method': 'GET', 'path': '/api/v1/reviews/{}'.format(review_id)},
+        {'method': 'GET', 'path': '/api/v1/reviews/broken'},
+        {'method': 'POST', 'path': '/api/v1/reviews/', 'body': {'text': 'Fine', 'rating': 3, 'place_id': other_id}},
+        {'method': 'GET', 'path': '/api/v1/reviews/broken'},
+        {'method': 'DELETE', 'path': '/api/v1/reviews/{}'.format(review_id)},
+    ], headers=guest)
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [result['status'] for result in results] == [200, 500, 201, 500, 200]
+    assert results[0]['body']['id'] == review_id
+    assert results[1]['body'] == results[3]['body'] == {'message': 'Internal Server Error'}
+
+    # The writes around the failures went through
+    reviews = client.get('/api/v1/reviews/').get_json()
+    assert [review['place_id'] for review in reviews] == [other_id]
+    print("✅ test_failed_sub_request_gets_its_own_500 passed")
+
+
+def test_batch_route_and_validation(client):
+    guest = login(client, 'guest')
+    response = client.post('/api/v1/batch/', json=[{'method': 'GET', 'path': '/api/v1/places/'}], headers=guest)
+    assert response.status_code == 200 and response.get_json() == [{'status': 200, 'body': []}]
+    for payload in ([], {}, [{'method': 'PATCH', 'path': '/api/v1/places/'}], [{'method': 'GET', 'path': '/x'}],
+                    [{'method': 'POST', 'path': '/api/v1/batch/', 'body': []}]):
+        assert client.post('/api/v1/batch/', json=payload, headers=guest).status_code == 400
+    print("✅ test_batch_route_and_validation passed")
@@ -0,0 +1,141 @@
+# test_owner_dashboard.py
+
+import json
+from datetime import datetime
+
+from sqlalchemy import func, update
+
+from app.extensions import db
+from app.models.place import Place
+from app.models.review import Review
+from app.models.table_version import TableVersion
+from app.serializers import dumps
+from app.services import facade
+from conftest import login
+from test_sharding import CITIES
+from test_soft_delete import post_review, user_id
+
+
+def create_places(client, headers, *titles):
+    place_ids = []
+    for i, title in enumerate(titles):
+        latitude, longitude = CITIES[i % len(CITIES)]
+        response = client.post('/api/v1/places/', json={
+            'title': title, 'price': 100.0, 'latitude': latitude, 'longitude': longitude,
+        }, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        place_ids.append(response.get_json()['id'])
+    return place_ids
+
+
+def dashboard(client, app, name, headers):
+    """The dashboard of a user and whether it came from the cache"""
+    response = client.get('/api/v1/users/{}/dashboard'.format(user_id(app, name)), headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json(), response.headers['X-Cache']
+
+
+def latest_review_at(app, place_id):
+    """Creation time of the newest live review of a place, as the API encodes it"""
+    with app.app_context():
+        # One row per shard when sharded
+        latest = max(row[0] for row in db.session.query(func.max(Review.created_at)).filter(
+            Review.place_id == place_id
+        ) if row[0] is not None)
+    return json.loads(dumps([latest]))[0]
+
+
+# ─── DASHBOARD TESTS ──────────────────────────────────────────
+
+def test_dashboard_groups_live_reviews(app, client):
+    admin, host, guest = login(client, 'admin'), login(client, 'host'), login(client, 'guest')
+    first, second, quiet = create_places(client, host, 'First', 'Second', 'Quiet')
+    # Created last, listed first: ids do not give the order
+    with app.app_context():
+        db.session.get(Place, quiet).created_at = datetime(2020, 1, 1)
+        db.session.commit()
+    post_review(client, guest, first, rating=5)
+    post_review(client, admin, first, rating=2)
+    post_review(client, guest, second, rating=4)
+    removed = post_review(client, admin, second, rating=1)
+    assert client.delete('/api/v1/reviews/{}'.format(removed), headers=admin).status_code == 200
+
+    body, _ = dashboard(client, app, 'host', host)
+    assert [place['id'] for place in body['places']] == [quiet, first, second]
+    assert [(place['review_count'], place['average_rating']) for place in body['places']] == [
+        (0, None), (2, 3.5), (1, 4.0),
+    ]
+    assert body['places'][0]['latest_review_at'] is None
+    assert body['places'][1]['latest_review_at'] == latest_review_at(app, first)
+    assert body['places'][2]['latest_review_at'] == latest_review_at(app, second)
+    assert body['totals'] == {
+        'places': 3, 'reviews': 3, 'average_rating': 11 / 3,
+        'latest_review_at': max(latest_review_at(app, first), latest_review_at(app, second)),
+    }
+    assert dashboard(client, app, 'guest', guest)[0]['totals'] == {
+        'places': 0, 'reviews': 0, 'average_rating': None, 'latest_review_at': None,
+    }
+    print("✅ test_dashboard_groups_live_reviews passed")
+
+
+# ─── CACHE TESTS ──────────────────────────────────────────────
+
+def test_change_drops_only_its_owner(app, client):
+    admin, host, guest = login(client, 'admin'), login(client, 'host'), login(client, 'guest')
+    place_id, = create_places(client, host, 'Hosted')
+    create_places(client, admin, 'Admin place')
+    assert dashboard(client, app, 'host', host)[1] == 'MISS'
+    assert dashboard(client, app, 'admin', admin)[1] == 'MISS'
+    assert dashboard(client, app, 'host', host)[1] == 'HIT'
+
+    post_review(client, guest, place_id, rating=5)
+    body, cache = dashboard(client, app, 'host', host)
+    assert cache == 'MISS' and body['totals']['reviews'] == 1
+    assert dashboard(client, app, 'admin', admin)[1] == 'HIT'
+
+    client.put('/api/v1/places/{}'.format(place_id), json={'title': 'Renamed'}, headers=host)
+    body, cache = dashboard(client, app, 'host', host)
+    assert cache == 'MISS' and body['places'][0]['title'] == 'Renamed'
+    assert dashboard(client, app, 'admin', admin)[1] == 'HIT'
+    print("✅ test_change_drops_only_its_owner passed")
+
+
+def test_unexpected_versions_drop_every_dashboard(app, client, monkeypatch):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    create_places(client, host, 'Hosted')
+    create_places(client, admin, 'Admin place')
+    monkeypatch.setattr(facade.owner_dashboards, 'check_interval', 0)
+    dashboard(client, app, 'host', host)
+    dashboard(client, app, 'admin', admin)
+    assert dashboard(client, app, 'host', host)[1] == 'HIT'
+
+    # A commit from another worker, seen only through the table versions
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(update(TableVersion).where(TableVersion.table_name == 'places').values(
+                version=TableVersion.version + 1
+            ))
+    assert dashboard(client, app, 'host', host)[1] == 'MISS'
+    assert dashboard(client, app, 'admin', admin)[1] == 'MISS'
+    assert dashboard(client, app, 'admin', admin)[1] == 'HIT'
+    print("✅ test_unexpected_versions_drop_every_dashboard passed")
+
+
+def test_store_skips_dashboards_older_than_a_change(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id, = create_places(client, host, 'Hosted')
+    owner_id = user_id(app, 'host')
+    dashboards = facade.owner_dashboards
+    with app.app_context():
+        generation = dashboards.check()
+    # A change processed while the dashboard was being built
+    post_review(client, guest, place_id)
+    with app.app_context():
+        assert dashboards.check() != generation
+        dashboards.store(owner_id, b'{"stale": true}', generation)
+        assert dashboards.get(owner_id) is None
+
+        current = dashboards.check()
+        dashboards.store(owner_id, b'{"fresh": true}', current)
+        assert dashboards.get(owner_id) == b'{"fresh": true}'
+    print("✅ test_store_skips_dashboards_older_than_a_change passed")
@@ -0,0 +1,117 @@
+# test_place_search.py
+
+from datetime import datetime
+
+import pytest
+
+from app.extensions import db
+from app.models.place import Place
+from conftest import login
+from test_sharding import CITIES
+
+# Prices with ties, so pages end inside runs of equal keys
+PRICES = [50.0, 80.0, 50.0, 120.0, 80.0, 50.0, 200.0, 80.0, 35.0, 120.0, 50.0]
+
+
+def create_places(client, headers, prices):
+    items = [{
+        'title': 'Place {}'.format(i), 'price': price,
+        'latitude': CITIES[i % len(CITIES)][0], 'longitude': CITIES[i % len(CITIES)][1],
+    } for i, price in enumerate(prices)]
+    response = client.post('/api/v1/places/batch', json=items, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return [item['data']['id'] for item in response.get_json()]
+
+
+def tie_created_at(app, place_ids):
+    """Give places one creation time, ties for the created_at sorts"""
+    moment = datetime(2024, 1, 1, 12, 0, 0)
+    with app.app_context():
+        for place in Place.query.filter(Place.id.in_(place_ids)):
+            place.created_at = moment
+        db.session.commit()
+
+
+def expected(app, sort, min_price=None, max_price=None):
+    """Ids of every live place in ``sort`` order, sorted in memory"""
+    name = sort.lstrip('-')
+    with app.app_context():
+        rows = [(getattr(place, name), place.id, place.price) for place in Place.query.all()]
+    rows = [row for row in rows if (min_price is None or row[2] >= min_price)
+            and (max_price is None or row[2] <= max_price)]
+    return [row[1] for row in sorted(rows, reverse=sort.startswith('-'))]
+
+
+def pages(client, limit, **params):
+    """Every page of a search, following next_cursor"""
+    params = dict(params, limit=limit)
+    while True:
+        response = client.get('/api/v1/places/', query_string=params)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body['items']) <= limit
+        yield [item['id'] for item in body['items']]
+        if body['next_cursor'] is None:
+            return
+        params['cursor'] = body['next_cursor']
+
+
+# ─── ORDER TESTS ──────────────────────────────────────────────
+
+@pytest.mark.parametrize('sort', ['price', '-price', 'created_at', '-created_at'])
+def test_pages_follow_sort_order_with_ties(app, client, sort):
+    place_ids = create_places(client, login(client, 'host'), PRICES)
+    tie_created_at(app, place_ids[2:7])
+    for limit in (1, 3, 4, len(PRICES)):
+        found = [place_id for page in pages(client, limit, sort=sort) for place_id in page]
+        assert found == expected(app, sort)
+    print("✅ test_pages_follow_sort_order_with_ties passed")
+
+
+def test_price_bounds(app, client):
+    create_places(client, login(client, 'host'), PRICES)
+    found = [place_id for page in pages(client, 2, sort='-price', min_price=50, max_price=120) for place_id in page]
+    assert found == expected(app, '-price', 50.0, 120.0)
+    assert len(found) == len([price for price in PRICES if 50.0 <= price <= 120.0])
+    body = client.get('/api/v1/places/', query_string={'min_price': 500}).get_json()
+    assert body == {'items': [], 'next_cursor': None}
+    print("✅ test_price_bounds passed")
+
+
+# ─── CURSOR STABILITY TESTS ───────────────────────────────────
+
+def test_writes_between_pages(app, client):
+    host = login(client, 'host')
+    place_ids = create_places(client, host, PRICES)
+    walk = pages(client, 4, sort='price')
+    seen = next(walk) + next(walk)
+    # Pages [35, 50, 50, 50], [50, 80, 80, 80]: a new 80.0 place has a
+    # greater id than the cursor's and still comes after it
+    before, tied, after = create_places(client, host, [40.0, 80.0, 150.0])
+    unseen = [place_id for place_id in expected(app, 'price') if place_id not in seen + [before, tied, after]]
+    deleted = unseen[-1]
+    assert client.delete('/api/v1/places/{}'.format(deleted), headers=host).status_code == 200
+
+    rest = [place_id for page in walk for place_id in page]
+    assert len(set(seen + rest)) == len(seen + rest)
+    assert before not in rest and deleted not in rest
+    assert tied in rest and after in rest
+    assert set(seen + rest) == (set(place_ids) - {deleted}) | {tied, after}
+    print("✅ test_writes_between_pages passed")
+
+
+# ─── VALIDATION TESTS ─────────────────────────────────────────
+
+def test_invalid_search_parameters(client):
+    create_places(client, login(client, 'host'), PRICES[:3])
+    cursor = client.get('/api/v1/places/', query_string={'sort': 'price', 'limit': 1}).get_json()['next_cursor']
+    for params in (
+        {'sort': 'rating'}, {'limit': 0}, {'limit': 101}, {'limit': 'many'},
+        {'min_price': -1}, {'max_price': 'cheap'}, {'min_price': 90, 'max_price': 10},
+        {'sort': 'price', 'cursor': 'not-a-cursor'}, {'sort': '-price', 'cursor': cursor},
+        {'sort': 'created_at', 'cursor': cursor},
+    ):
+        response = client.get('/api/v1/places/', query_string=params)
+        assert response.status_code == 400, params
+        assert 'error' in response.get_json()
+    print("✅ test_invalid_search_parameters passed")
@@ -0,0 +1,47 @@
+# test_place_stats.py
+
+import pytest
+
+from app.geohash import BASE32, encode_geohash
+from conftest import create_place, login
+
+# The stats endpoint answers 501 without NumPy
+pytest.importorskip('numpy')
+
+
+def owner_counts(client):
+    report = client.get('/api/v1/stats/places?group_by=owner').get_json()
+    return report['places'], sorted(group['count'] for group in report['groups'])
+
+
+# ─── SNAPSHOT TESTS ───────────────────────────────────────────
+
+def test_patch_leaves_published_columns_untouched(app, client):
+    admin, host = login(client, 'admin'), login(client, 'host')
+    gone_id = create_place(client, host, 'Gone')
+    create_place(client, host, 'Kept')
+    assert owner_counts(client) == (2, [2])
+    published = app.extensions['place_stats']
+    index, owners, owner_index = dict(published.index), list(published.owners), dict(published.owner_index)
+
+    added_id = create_place(client, admin, 'Added', latitude=-33.9, longitude=151.2)
+    client.delete('/api/v1/places/{}'.format(gone_id), headers=host)
+    assert owner_counts(client) == (2, [1, 1])
+
+    patched = app.extensions['place_stats']
+    assert patched is not published and patched.dead == 1
+    assert gone_id not in patched.index and added_id in patched.index
+    assert len(patched.owners) == 2
+    # Reports still holding the older columns see them as they were
+    assert published.index == index and published.owners == owners and published.owner_index == owner_index
+    assert published.alive.all()
+    print("✅ test_patch_leaves_published_columns_untouched passed")
+
+
+def test_geocells_use_geohash_digits(app, client):
+    host = login(client, 'host')
+    create_place(client, host, latitude=48.85, longitude=2.35)
+    groups = client.get('/api/v1/stats/places?group_by=geocell&precision=5').get_json()['groups']
+    assert [group['key'] for group in groups] == [encode_geohash(48.85, 2.35, 5)]
+    assert all(char in BASE32 for char in groups[0]['key'])
+    print("✅ test_geocells_use_geohash_digits passed")
@@ -0,0 +1,68 @@
+# test_popularity.py
+
+import pytest
+
+from app.extensions import db
+from app.services import facade
+from conftest import create_place, login
+from test_sharding import stored_reviews, two_shards
+from test_soft_delete import post_review, user_id
+
+
+def totals(app, *place_ids):
+    """(review_count, rating_sum, popularity) stored for each place"""
+    with app.app_context():
+        db.session.expire_all()
+        return [
+            (place.review_count, place.rating_sum, place.popularity)
+            for place in (facade.get_place(place_id) for place_id in place_ids)
+        ]
+
+
+def scored(*ratings):
+    return len(ratings), sum(ratings), facade.popularity.score(len(ratings), sum(ratings))
+
+
+# ─── REFRESH TESTS ────────────────────────────────────────────
+
+def test_scores_follow_review_writes(app, client):
+    admin, host, guest = login(client, 'admin'), login(client, 'host'), login(client, 'guest')
+    source, target = two_shards(app, client, host)
+    review_id = post_review(client, guest, source, rating=5)
+    post_review(client, admin, source, rating=2)
+    assert totals(app, source, target) == [scored(5, 2), scored()]
+
+    client.put('/api/v1/reviews/{}'.format(review_id), json={'rating': 3}, headers=guest)
+    assert totals(app, source) == [scored(3, 2)]
+    client.put('/api/v1/reviews/{}'.format(review_id), json={'place_id': target}, headers=guest)
+    assert totals(app, source, target) == [scored(2), scored(3)]
+    client.delete('/api/v1/reviews/{}'.format(review_id), headers=guest)
+    assert totals(app, target) == [scored()]
+
+    response = client.post('/api/v1/reviews/batch', json=[
+        {'text': 'One', 'rating': 4, 'place_id': target},
+    ], headers=guest)
+    assert response.status_code == 201, response.get_json()
+    assert totals(app, target) == [scored(4)]
+    client.delete('/api/v1/users/{}'.format(user_id(app, 'guest')), headers=admin)
+    assert totals(app, source, target) == [scored(2), scored()]
+    print("✅ test_scores_follow_review_writes passed")
+
+
+def test_failed_refresh_rolls_back_the_review(app, client, monkeypatch):
+    host = login(client, 'host')
+    place_id = create_place(client, host)
+
+    def broken(scores, commit=True):
+        raise RuntimeError('Scores not stored')
+
+    monkeypatch.setattr(facade.place_repo, 'set_popularity', broken)
+    with app.app_context():
+        guest_id = user_id(app, 'guest')
+        with pytest.raises(RuntimeError):
+            facade.create_review({'text': 'Lost', 'rating': 5, 'user_id': guest_id, 'place_id': place_id})
+        db.session.rollback()
+    # No review without its score
+    assert sum(stored_reviews(app, place_id).values()) == 0
+    assert totals(app, place_id) == [scored()]
+    print("✅ test_failed_refresh_rolls_back_the_review passed")
@@ -0,0 +1,126 @@
+# test_sharding.py
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.place import Place
+from app.models.review import Review
+from app.services import facade
+from conftest import create_place, login
+
+# Geohash prefixes hashed to each of three shards
+CITIES = [(50.0, 10.0), (10.0, 10.0), (-10.0, -60.0), (1.0, 1.0), (60.0, -100.0), (30.0, 30.0)]
+
+
+def shard_of(app, place_id):
+    router = app.extensions.get('shard_router')
+    if router is None:
+        return None
+    with app.app_context():
+        return router.locate_place(db.session, place_id)
+
+
+def two_shards(app, client, headers):
+    """Ids of two places stored on different shards when sharded"""
+    place_ids = [create_place(client, headers, 'City {}'.format(i), 50.0 + i, *city) for i, city in enumerate(CITIES)]
+    first = place_ids[0]
+    other = next((place_id for place_id in place_ids[1:] if shard_of(app, place_id) != shard_of(app, first)), place_ids[1])
+    return first, other
+
+
+def stored_reviews(app, place_id):
+    """Review count of a place on each database holding reviews"""
+    router = app.extensions.get('shard_router')
+    with app.app_context():
+        counts = {}
+        for shard_id in router.shard_ids if router else (None,):
+            with db.engines[shard_id].connect() as connection:
+                counts[shard_id] = connection.execute(
+                    select(func.count()).select_from(Review.__table__).where(Review.__table__.c.place_id == place_id)
+                ).scalar()
+        return counts
+
+
+# ─── FAN-OUT TESTS ────────────────────────────────────────────
+
+def test_places_spread_over_shards_and_merge(app, client):
+    host = login(client, 'host')
+    place_ids = [create_place(client, host, 'City {}'.format(i), 50.0 + i, *city) for i, city in enumerate(CITIES)]
+    listed = {place['id'] for place in client.get('/api/v1/places/').get_json()}
+    assert listed == set(place_ids)
+    for place_id in place_ids:
+        assert client.get('/api/v1/places/{}'.format(place_id)).get_json()['id'] == place_id
+    router = app.extensions.get('shard_router')
+    if router is not None:
+        assert len({shard_of(app, place_id) for place_id in place_ids}) > 1
+    print("✅ test_places_spread_over_shards_and_merge passed")
+
+
+def test_place_moves_with_its_reviews(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id, other = two_shards(app, client, host)
+    client.post('/api/v1/reviews/', json={'text': 'Nice', 'rating': 4, 'place_id': place_id}, headers=guest)
+    with app.app_context():
+        target = facade.get_place(other)
+        latitude, longitude = target.latitude, target.longitude
+
+    response = client.put('/api/v1/places/{}'.format(place_id), json={'latitude': latitude, 'longitude': longitude},
+                          headers=host)
+    assert response.status_code == 200
+    assert shard_of(app, place_id) == shard_of(app, other)
+    reviews = client.get('/api/v1/places/{}/reviews'.format(place_id)).get_json()
+    assert [review['text'] for review in reviews] == ['Nice']
+    print("✅ test_place_moves_with_its_reviews passed")
+
+
+# ─── REVIEW MOVE TESTS ────────────────────────────────────────
+
+def test_review_moved_to_place_on_another_shard(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    source, target = two_shards(app, client, host)
+    response = client.post('/api/v1/reviews/', json={'text': 'Great', 'rating': 5, 'place_id': source}, headers=guest)
+    review_id = response.get_json()['id']
+
+    response = client.put('/api/v1/reviews/{}'.format(review_id), json={'text': 'Moved', 'place_id': target},
+                          headers=guest)
+    assert response.status_code == 200, response.get_json()
+
+    review = client.get('/api/v1/reviews/{}'.format(review_id)).get_json()
+    assert review['place_id'] == target and review['text'] == 'Moved'
+    assert client.get('/api/v1/places/{}/reviews'.format(source)).get_json() == []
+    assert [item['id'] for item in client.get('/api/v1/places/{}/reviews'.format(target)).get_json()] == [review_id]
+    # One row left, on the target's shard
+    assert sum(stored_reviews(app, source).values()) == 0
+    counts = stored_reviews(app, target)
+    assert sum(counts.values()) == 1
+    if shard_of(app, target) is not None:
+        assert counts[shard_of(app, target)] == 1
+
+    with app.app_context():
+        scores = {place.id: place.review_count for place in facade.get_all_places() if place.id in (source, target)}
+    assert scores == {source: 0, target: 1}
+    print("✅ test_review_moved_to_place_on_another_shard passed")
+
+
+def test_review_move_to_missing_place(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id = create_place(client, host)
+    review_id = client.post('/api/v1/reviews/', json={'text': 'Ok', 'rating': 3, 'place_id': place_id},
+                            headers=guest).get_json()['id']
+    response = client.put('/api/v1/reviews/{}'.format(review_id), json={'place_id': 'missing'}, headers=guest)
+    assert response.status_code == 404
+    with app.app_context():
+        assert facade.get_review(review_id).place_id == place_id
+    print("✅ test_review_move_to_missing_place passed")
+
+
+# ─── ROUTING TESTS ────────────────────────────────────────────
+
+def test_lookup_by_id_reaches_every_shard(app, client):
+    host = login(client, 'host')
+    place_ids = [create_place(client, host, 'City {}'.format(i), 50.0 + i, *city) for i, city in enumerate(CITIES)]
+    with app.app_context():
+        found, missing = facade.place_repo.get_many(place_ids + ['missing'])
+        assert [place.id for place in found] == place_ids and missing == ['missing']
+        assert len(db.session.query(Place.id).all()) == len(place_ids)
+    print("✅ test_lookup_by_id_reaches_every_shard passed")
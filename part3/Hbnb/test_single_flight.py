@@ -0,0 +1,122 @@
+# test_single_flight.py
+
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class Load:
+    """A load blocking until released, counting its runs"""
+
+    def __init__(self, result='loaded', error=None):
+        self.result = result
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.runs += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def call(flight, key, load, outcomes, timeout=None):
+    def run():
+        try:
+            outcomes.append(flight.do(key, load, timeout))
+        except Exception as err:
+            outcomes.append(err)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def join_behind(flight, leader, load, key, count, outcomes, **kwargs):
+    """Start the leader, then ``count`` callers waiting on its load"""
+    threads = [call(flight, key, leader, outcomes)]
+    assert leader.started.wait(5)
+    threads += [call(flight, key, load, outcomes, **kwargs) for _ in range(count)]
+    # Let the followers reach the wait
+    time.sleep(0.2)
+    return threads
+
+
+# ─── COALESCING TESTS ─────────────────────────────────────────
+
+def test_followers_share_the_leader_result():
+    flight = SingleFlight(timeout=5)
+    leader, follower = Load(['body']), Load('own')
+    outcomes = []
+    threads = join_behind(flight, leader, follower, 'place:1', 5, outcomes)
+    assert flight.stats()['in_flight'] == 1
+    leader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert leader.runs == 1 and follower.runs == 0
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * 5
+    assert all(result is leader.result for result, _ in outcomes)
+    assert flight.stats() == {'loads': 1, 'coalesced': 5, 'timeouts': 0, 'failures': 0, 'in_flight': 0}
+    print("✅ test_followers_share_the_leader_result passed")
+
+
+def test_finished_and_other_keys_load_again():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('a', lambda: 2) == (2, False)
+    assert flight.do('b', lambda: 3) == (3, False)
+    assert flight.stats()['loads'] == 3 and flight.stats()['in_flight'] == 0
+    print("✅ test_finished_and_other_keys_load_again passed")
+
+
+# ─── FALLBACK TESTS ───────────────────────────────────────────
+
+def test_slow_load_times_followers_out():
+    flight = SingleFlight(timeout=5)
+    leader, follower = Load('slow'), Load('own')
+    follower.release.set()
+    outcomes = []
+    threads = join_behind(flight, leader, follower, 'place:1', 2, outcomes, timeout=0.05)
+    for thread in threads[1:]:
+        thread.join()
+    # The followers loaded for themselves while the leader still runs
+    assert outcomes == [('own', False), ('own', False)] and follower.runs == 2
+    leader.release.set()
+    threads[0].join()
+    assert outcomes[-1] == ('slow', False)
+    assert flight.stats() == {'loads': 3, 'coalesced': 0, 'timeouts': 2, 'failures': 0, 'in_flight': 0}
+    print("✅ test_slow_load_times_followers_out passed")
+
+
+def test_failed_load_raises_for_the_leader_only():
+    flight = SingleFlight(timeout=5)
+    leader, follower = Load(error=RuntimeError('database gone')), Load('own')
+    follower.release.set()
+    outcomes = []
+    threads = join_behind(flight, leader, follower, 'place:1', 3, outcomes)
+    leader.release.set()
+    for thread in threads:
+        thread.join()
+
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    assert len(errors) == 1 and str(errors[0]) == 'database gone'
+    assert sorted(outcome for outcome in outcomes if not isinstance(outcome, Exception)) == [('own', False)] * 3
+    assert flight.stats() == {'loads': 4, 'coalesced': 0, 'timeouts': 0, 'failures': 3, 'in_flight': 0}
+
+    # Nothing of the failed flight is left behind
+    def fail():
+        raise ValueError('again')
+
+    with pytest.raises(ValueError):
+        flight.do('place:1', fail)
+    assert flight.do('place:1', lambda: 'fresh') == ('fresh', False)
+    print("✅ test_failed_load_raises_for_the_leader_only passed")
@@ -0,0 +1,98 @@
+# test_soft_delete.py
+
+import config
+from app.extensions import db
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.soft_delete import TombstonePurger
+from conftest import create_place, login
+from test_sharding import stored_reviews
+
+
+def post_review(client, headers, place_id, text='Nice', rating=4):
+    response = client.post('/api/v1/reviews/', json={'text': text, 'rating': rating, 'place_id': place_id},
+                           headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+
+def user_id(app, name):
+    with app.app_context():
+        return User.query.filter_by(email='{}@example.com'.format(name)).one().id
+
+
+# ─── TOMBSTONE TESTS ──────────────────────────────────────────
+
+def test_deleted_place_hides_its_reviews(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id, kept_id = create_place(client, host, 'Gone'), create_place(client, host, 'Kept')
+    review_id = post_review(client, guest, place_id)
+    kept_review_id = post_review(client, guest, kept_id)
+
+    assert client.delete('/api/v1/places/{}'.format(place_id), headers=host).status_code == 200
+    assert client.get('/api/v1/places/{}'.format(place_id)).status_code == 404
+    assert client.get('/api/v1/reviews/{}'.format(review_id)).status_code == 404
+    assert [place['id'] for place in client.get('/api/v1/places/').get_json()] == [kept_id]
+    assert [review['id'] for review in client.get('/api/v1/reviews/').get_json()] == [kept_review_id]
+
+    # The rows are still there, tombstoned
+    with app.app_context():
+        place = Place.query.execution_options(include_deleted=True).filter(Place.id == place_id).one()
+        assert place.deleted_at is not None
+        assert Review.query.execution_options(include_deleted=True).filter(Review.id == review_id).one()
+    assert sum(stored_reviews(app, place_id).values()) == 1
+    print("✅ test_deleted_place_hides_its_reviews passed")
+
+
+def test_deleted_owner_hides_places_and_reviews(app, client):
+    admin, host, guest = login(client, 'admin'), login(client, 'host'), login(client, 'guest')
+    place_id = create_place(client, host)
+    admin_place_id = create_place(client, admin, 'Admin place')
+    post_review(client, guest, place_id)
+    guest_review_id = post_review(client, guest, admin_place_id)
+    host_review_id = post_review(client, host, admin_place_id, 'Also nice', 5)
+
+    response = client.delete('/api/v1/users/{}'.format(user_id(app, 'host')), headers=admin)
+    assert response.status_code == 200
+    assert client.get('/api/v1/places/{}'.format(place_id)).status_code == 404
+    assert [place['id'] for place in client.get('/api/v1/places/').get_json()] == [admin_place_id]
+    reviews = client.get('/api/v1/places/{}/reviews'.format(admin_place_id)).get_json()
+    assert [review['id'] for review in reviews] == [guest_review_id]
+    assert client.get('/api/v1/reviews/{}'.format(host_review_id)).status_code == 404
+
+    with app.app_context():
+        assert db.session.query(Place.id).execution_options(include_deleted=True).filter(
+            Place.id == place_id
+        ).all() == [(place_id,)]
+    print("✅ test_deleted_owner_hides_places_and_reviews passed")
+
+
+# ─── PURGE TESTS ──────────────────────────────────────────────
+
+def test_purge_removes_expired_tombstones(app, client):
+    host, guest = login(client, 'host'), login(client, 'guest')
+    place_id, kept_id = create_place(client, host, 'Gone'), create_place(client, host, 'Kept')
+    post_review(client, guest, place_id)
+    kept_review_id = post_review(client, guest, kept_id)
+    client.delete('/api/v1/places/{}'.format(place_id), headers=host)
+
+    # Within the grace period nothing goes
+    assert TombstonePurger(app, grace=3600, interval=None).purge()
+    assert sum(stored_reviews(app, place_id).values()) == 1
+
+    purger = TombstonePurger(app, batch_size=1, pause=0, grace=0, interval=None)
+    assert purger.purge()
+    assert purger.purged == 2
+    assert sum(stored_reviews(app, place_id).values()) == 0
+    with app.app_context():
+        assert Place.query.execution_options(include_deleted=True).filter(Place.id == place_id).all() == []
+    assert client.get('/api/v1/reviews/{}'.format(kept_review_id)).status_code == 200
+    print("✅ test_purge_removes_expired_tombstones passed")
+
+
+def test_purger_only_runs_where_enabled(app):
+    assert 'tombstone_purger' not in app.extensions
+    assert config.Config.PURGE_INTERVAL is None
+    assert config.DevelopmentConfig.PURGE_INTERVAL and config.ProductionConfig.PURGE_INTERVAL
+    print("✅ test_purger_only_runs_where_enabled passed")